@@ -1,15 +1,18 @@
 """Account management for multiple YouTube accounts."""
 import json
-import pickle
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Optional
 from dataclasses import dataclass, asdict
 
-from config import CONFIG_DIR, get_client_secret_path
-from google.auth.transport.requests import Request
+from config import CONFIG_DIR, get_client_secret_path, load_config
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+from credential_manager import CredentialManager
+from transport import build_youtube_service
+
 SCOPES = [
     'openid',
     'https://www.googleapis.com/auth/youtube.readonly',
@@ -34,11 +37,30 @@ class Account:
 class AccountManager:
     """Manages multiple YouTube accounts."""
 
-    def __init__(self):
-        """Initialize account manager."""
+    def __init__(self, warm_accounts: Optional[int] = None):
+        """
+        Initialize account manager.
+
+        Args:
+            warm_accounts: Most accounts kept signed in with a ready API client,
+                defaults to the warm_accounts setting
+        """
         self.accounts: List[Account] = []
+        config = load_config()
+        self.warm_accounts = config["warm_accounts"] if warm_accounts is None else warm_accounts
+        self.credentials = CredentialManager(
+            refresh_margin=config["token_refresh_margin"],
+            check_interval=config["token_check_interval"]
+        )
+        # Ready clients by account ID, least recently used first
+        self._pool: "OrderedDict[str, object]" = OrderedDict()
+        self._pool_lock = threading.Lock()
         self.load_accounts()
 
+    def close(self) -> None:
+        """Stop refreshing credentials in the background and wait for pending token writes."""
+        self.credentials.stop()
+
     def load_accounts(self):
         """Load accounts from file."""
         if ACCOUNTS_FILE.exists():
@@ -116,8 +138,7 @@ class AccountManager:
             logger.info(f"CONFIG_DIR exists: {CONFIG_DIR.exists()}")
 
             try:
-                with open(token_path, 'wb') as f:
-                    pickle.dump(credentials, f)
+                self.credentials.store(token_path, credentials).result()
                 logger.info(f"Credentials saved successfully")
                 logger.info(f"Token file size: {token_path.stat().st_size} bytes")
             except Exception as e:
@@ -164,14 +185,71 @@ class AccountManager:
             logger.error(traceback.format_exc())
             raise
 
+    def pooled_api(self, account_id: str):
+        """Get the ready client for an account, if it is warm."""
+        with self._pool_lock:
+            api = self._pool.get(account_id)
+            if api is not None:
+                self._pool.move_to_end(account_id)
+            return api
+
+    def pool_api(self, api) -> None:
+        """Keep a client ready for its account, evicting the least recently used over the cap."""
+        with self._pool_lock:
+            self._pool[api.account_id] = api
+            self._pool.move_to_end(api.account_id)
+            evicted = self._evict_locked()
+        for old in evicted:
+            old.close()
+
+    def _evict_locked(self) -> list:
+        """Drop idle clients beyond warm_accounts; the active account's is never dropped."""
+        active = self.get_active_account()
+        evicted = []
+        for account_id in list(self._pool):
+            if len(self._pool) <= max(1, self.warm_accounts):
+                break
+            if active is not None and account_id == active.id:
+                continue
+            evicted.append(self._pool.pop(account_id))
+        return evicted
+
+    def get_api(self, account: Account, base):
+        """
+        Get a ready client for an account, signing it in if it is not warm.
+
+        Signing in reads (and may refresh) the token and builds the service,
+        so call this off the UI thread when the account may not be warm.
+
+        Args:
+            account: Account to get a client for
+            base: Client whose index, scheduler and limits the new one shares
+
+        Returns:
+            YouTubeAPI for the account, or None if it has no usable token
+        """
+        api = self.pooled_api(account.id)
+        if api is not None:
+            return api
+
+        creds = self.get_credentials(account)
+        if not creds:
+            return None
+        api = base.for_account(build_youtube_service(creds), account.id)
+        self.pool_api(api)
+        return api
+
     def remove_account(self, account_id: str) -> bool:
         """Remove an account."""
+        with self._pool_lock:
+            api = self._pool.pop(account_id, None)
+        if api is not None:
+            api.close()
+
         for i, account in enumerate(self.accounts):
             if account.id == account_id:
                 # Delete token file
-                token_path = CONFIG_DIR / account.token_file
-                if token_path.exists():
-                    token_path.unlink()
+                self.credentials.remove(CONFIG_DIR / account.token_file)
 
                 # Remove from list
                 self.accounts.pop(i)
@@ -207,60 +285,16 @@ class AccountManager:
                 return account
         return None
 
-    def get_credentials(self, account: Account) -> Optional[Credentials]:
-        """Get credentials for an account."""
-        token_path = CONFIG_DIR / account.token_file
-        if not token_path.exists():
-            return None
+    def get_credentials(self, account: Account, refresh: bool = True) -> Optional[Credentials]:
+        """
+        Get credentials for an account, from memory after the first call.
 
-        try:
-            with open(token_path, 'rb') as f:
-                creds = pickle.load(f)
-
-            # Check if scopes match current requirements
-            if creds and creds.scopes:
-                # Normalize scopes for comparison (Google may add/reorder scopes)
-                current_scopes = set(SCOPES)
-                token_scopes = set(creds.scopes)
-
-                # Both should have the same scopes (allowing for Google's auto-additions)
-                # Check if all required scopes are present
-                required_scopes = {
-                    'https://www.googleapis.com/auth/youtube.readonly',
-                    'https://www.googleapis.com/auth/youtube.force-ssl',
-                    'https://www.googleapis.com/auth/userinfo.email',
-                    'https://www.googleapis.com/auth/userinfo.profile'
-                }
-
-                if not required_scopes.issubset(token_scopes):
-                    print(f"Token missing required scopes. Deleting old token...")
-                    print(f"  Required: {sorted(required_scopes)}")
-                    print(f"  Got: {sorted(token_scopes)}")
-                    # Delete incompatible token
-                    token_path.unlink()
-                    return None
-
-            # Refresh if expired
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    creds.refresh(Request())
-                    # Save refreshed credentials
-                    with open(token_path, 'wb') as f:
-                        pickle.dump(creds, f)
-                except Exception as e:
-                    print(f"Failed to refresh credentials: {e}")
-                    # Delete failed token
-                    if token_path.exists():
-                        token_path.unlink()
-                    return None
-
-            return creds
-        except (pickle.PickleError, IOError, Exception) as e:
-            print(f"Error loading credentials: {e}")
-            # Delete corrupted token
-            if token_path.exists():
-                token_path.unlink()
-            return None
+        Args:
+            account: Account to get credentials for
+            refresh: Refresh them now if they have already expired; they are
+                otherwise refreshed in the background before they expire
+        """
+        return self.credentials.get(CONFIG_DIR / account.token_file, refresh=refresh)
 
     def authenticate_new_account(self) -> Optional[tuple[Account, Credentials]]:
         """Authenticate a new account."""
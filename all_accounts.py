@@ -0,0 +1,143 @@
+"""Subscription feed across every signed-in account."""
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Any, Dict, Iterator, List
+
+from cache import bypass_cache, cache_bypassed
+from cancellation import cancel_scope, current_token
+from scheduler import current_priority, request_priority
+from youtube_api import YouTubeAPIError
+
+
+def assign_channels(subscriptions: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Pick one account to fetch each channel through.
+
+    A channel several accounts subscribe to goes to whichever of them has
+    the fewest channels so far, so the work is spread evenly.
+
+    Args:
+        subscriptions: Channel IDs subscribed to, by account ID
+
+    Returns:
+        Channel IDs to fetch, by account ID
+    """
+    subscribers: Dict[str, List[str]] = {}
+    for account_id, channel_ids in subscriptions.items():
+        for channel_id in channel_ids:
+            subscribers.setdefault(channel_id, []).append(account_id)
+
+    assigned: Dict[str, List[str]] = {account_id: [] for account_id in subscriptions}
+    for channel_id, account_ids in subscribers.items():
+        account_id = min(account_ids, key=lambda candidate: len(assigned[candidate]))
+        assigned[account_id].append(channel_id)
+    return assigned
+
+
+def merge_feeds(streams: List[List[Dict[str, Any]]], max_results: int) -> List[Dict[str, Any]]:
+    """Merge feeds each sorted newest first into one, with a k-way heap merge."""
+    merged = heapq.merge(*streams, key=lambda video: video.get('published_ts', 0.0), reverse=True)
+    return list(islice(merged, max_results))
+
+
+class AllAccountsFeed:
+    """
+    The subscription feed of several accounts, loaded concurrently.
+
+    Each account's subscriptions are read with its own credentials, and
+    each channel is fetched once through one of the accounts subscribed
+    to it. Channels are read through their uploads playlist (one quota
+    unit each). As each account's share finishes, the merged feed so far
+    is yielded, so it can be shown before the slowest account is done.
+    """
+
+    def __init__(self, apis: List[Any], max_results: int = 50, uploads_per_channel: int = 2,
+                 max_age_days: int = 30):
+        """
+        Initialize the feed.
+
+        Args:
+            apis: YouTubeAPI (or DaemonClient) of each account
+            max_results: Maximum number of videos in the feed
+            uploads_per_channel: Latest uploads read from each channel
+            max_age_days: Uploads older than this are left out
+        """
+        self.apis = {api.account_id: api for api in apis}
+        self.max_results = max_results
+        self.uploads_per_channel = uploads_per_channel
+        self.max_age_days = max_age_days
+        self.failed_accounts: List[str] = []
+        self.pending = len(self.apis)
+
+    def _subscriptions(self, api) -> List[str]:
+        """Get every channel an account subscribes to, reading all pages."""
+        return [sub['channel_id'] for sub in api.get_subscriptions(max_results=None)]
+
+    def _account_feed(self, api, channel_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch an account's share of the channels, newest first."""
+        cutoff = time.time() - self.max_age_days * 86400
+        video_ids = []
+        for channel_id in channel_ids:
+            try:
+                uploads = api.get_channel_uploads(
+                    channel_id, max_results=self.uploads_per_channel, if_changed=False
+                )
+            except YouTubeAPIError:
+                # A channel without public uploads should not sink the account
+                continue
+            video_ids.extend(upload['id'] for upload in uploads or [] if upload['published_ts'] >= cutoff)
+
+        videos = api.get_videos(video_ids) if video_ids else []
+        videos.sort(key=lambda video: video.get('published_ts', 0.0), reverse=True)
+        return videos
+
+    def phases(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Load the feed, yielding the merged feed each time an account finishes.
+
+        Raises:
+            YouTubeAPIError: If no account could be loaded.
+        """
+        # Workers inherit the caller's cancel token, priority and cache bypass
+        token, priority, bypass = current_token(), current_priority(), cache_bypassed()
+
+        def in_scope(fn, *args):
+            with cancel_scope(token), request_priority(priority), bypass_cache(bypass):
+                return fn(*args)
+
+        streams: List[List[Dict[str, Any]]] = []
+        last_error = None
+        with ThreadPoolExecutor(max_workers=max(1, len(self.apis)), thread_name_prefix="all-accounts") as pool:
+            futures = {
+                pool.submit(in_scope, self._subscriptions, api): account_id
+                for account_id, api in self.apis.items()
+            }
+            subscriptions = {}
+            for future in as_completed(futures):
+                account_id = futures[future]
+                try:
+                    subscriptions[account_id] = future.result()
+                except YouTubeAPIError as e:
+                    last_error = e
+                    self.failed_accounts.append(account_id)
+                    self.pending -= 1
+
+            assigned = assign_channels(subscriptions)
+            futures = {
+                pool.submit(in_scope, self._account_feed, self.apis[account_id], channel_ids): account_id
+                for account_id, channel_ids in assigned.items()
+            }
+            for future in as_completed(futures):
+                self.pending -= 1
+                try:
+                    streams.append(future.result())
+                except YouTubeAPIError as e:
+                    last_error = e
+                    self.failed_accounts.append(futures[future])
+                    continue
+                yield merge_feeds(streams, self.max_results)
+
+        if not streams and last_error is not None:
+            raise last_error
@@ -7,9 +7,9 @@ from typing import Optional, Tuple
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 
 from config import TOKEN_FILE, get_client_secret_path, CONFIG_DIR
+from transport import build_youtube_service
 from account_manager import AccountManager, Account
 
 # OAuth2 scopes required for the app
@@ -68,7 +68,9 @@ def get_authenticated_service_multi_account(account_manager: AccountManager) ->
     if account:
         # Try to use existing credentials
         creds = account_manager.get_credentials(account)
-        if creds and creds.valid:
+        # Expired credentials that could not be refreshed for lack of network
+        # are still usable: requests refresh them once it is back
+        if creds and (creds.valid or creds.refresh_token):
             # Check if scopes match
             if creds.scopes and set(creds.scopes) != set(SCOPES):
                 print(f"Warning: Token scopes changed, need to re-authenticate...")
@@ -76,7 +78,7 @@ def get_authenticated_service_multi_account(account_manager: AccountManager) ->
                 creds = None
             else:
                 try:
-                    service = build('youtube', 'v3', credentials=creds)
+                    service = build_youtube_service(creds)
                     return service, account
                 except Exception as e:
                     print(f"Failed to build service with existing creds: {e}")
@@ -93,7 +95,7 @@ def get_authenticated_service_multi_account(account_manager: AccountManager) ->
         # Set as active
         account_manager.switch_account(account.id)
 
-        service = build('youtube', 'v3', credentials=creds)
+        service = build_youtube_service(creds)
         return service, account
     except Exception as e:
         raise AuthenticationError(f"Failed to authenticate new account: {e}")
@@ -152,7 +154,7 @@ def get_authenticated_service_legacy():
             print(f"Warning: Could not save credentials: {e}")
 
     try:
-        return build('youtube', 'v3', credentials=creds)
+        return build_youtube_service(creds)
     except Exception as e:
         raise AuthenticationError(f"Failed to build YouTube service: {e}")
 
@@ -171,8 +173,9 @@ def is_authenticated(account_manager: Optional[AccountManager] = None) -> bool:
         account = account_manager.get_active_account()
         if not account:
             return False
-        creds = account_manager.get_credentials(account)
-        return creds is not None and creds.valid
+        # Only a check: expired credentials are refreshed in the background
+        creds = account_manager.get_credentials(account, refresh=False)
+        return creds is not None and (creds.valid or bool(creds.refresh_token))
 
     # Legacy check
     if not TOKEN_FILE.exists():
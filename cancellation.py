@@ -0,0 +1,93 @@
+"""Cancellation tokens and deadlines for API calls made on behalf of a screen."""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class RequestCancelled(Exception):
+    """Raised when a request is abandoned because its token was cancelled."""
+    pass
+
+
+class DeadlineExceeded(RequestCancelled):
+    """Raised when a request is abandoned because its deadline passed."""
+    pass
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag with an optional overall deadline.
+
+    A screen creates one token per load and cancels it when the user
+    navigates away or starts a new load; every request made under the token
+    checks it first, so remaining pages and fan-out are skipped.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        """
+        Initialize the token.
+
+        Args:
+            deadline: Seconds from now after which the token expires, or None
+        """
+        self._event = threading.Event()
+        self.expires_at = time.monotonic() + deadline if deadline is not None else None
+
+    def cancel(self) -> None:
+        """Cancel every request made under this token."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token was cancelled or its deadline passed."""
+        return self._event.is_set() or self.expired
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline passed."""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def remaining(self) -> Optional[float]:
+        """Get seconds left until the deadline, or None if there is none."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self) -> None:
+        """
+        Raise if the token is no longer live.
+
+        Raises:
+            RequestCancelled: If the token was cancelled.
+            DeadlineExceeded: If the deadline passed.
+        """
+        if self._event.is_set():
+            raise RequestCancelled("Request cancelled")
+        if self.expired:
+            raise DeadlineExceeded("Request timed out")
+
+
+# Token for code that never set one; it is never cancelled
+NEVER_CANCELLED = CancelToken()
+
+_context = threading.local()
+
+
+def current_token() -> CancelToken:
+    """Get the token governing requests made from the current thread."""
+    return getattr(_context, 'token', NEVER_CANCELLED)
+
+
+@contextmanager
+def cancel_scope(token: CancelToken):
+    """Make requests inside the block abort once token is cancelled."""
+    previous = getattr(_context, 'token', None)
+    _context.token = token
+    try:
+        yield token
+    finally:
+        if previous is None:
+            del _context.token
+        else:
+            _context.token = previous
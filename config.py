@@ -9,11 +9,72 @@ CREDENTIALS_FILE = CONFIG_DIR / "credentials.json"
 TOKEN_FILE = CONFIG_DIR / "token.json"
 CLIENT_SECRET_FILE = CONFIG_DIR / "client_secret.json"
 CONFIG_FILE = CONFIG_DIR / "config.json"
+SEARCH_INDEX_FILE = CONFIG_DIR / "search_index.db"
+SNAPSHOT_DIR = CONFIG_DIR / "snapshots"
+LIBRARY_FILE = CONFIG_DIR / "library.db"
+THUMBNAIL_DIR = CONFIG_DIR / "thumbnails"
+DAEMON_SOCKET = CONFIG_DIR / "daemon.sock"
+WATCH_LOG_FILE = CONFIG_DIR / "watch_log.jsonl"
+SEEN_DIR = CONFIG_DIR / "seen"
+PLAYER_SOCKET = CONFIG_DIR / "mpv.sock"
 
 DEFAULT_CONFIG = {
     "results_per_page": 25,
     "last_section": "search",
-    "max_results": 50
+    "max_results": 50,
+    "local_index_max_videos": 20000,
+    "local_index_max_age_days": 180,
+    "search_as_you_type": False,
+    "search_debounce_ms": 400,
+    "search_cache_ttl": 600,
+    "requests_per_second": 10,
+    "request_burst": 20,
+    "max_request_attempts": 5,
+    "http_pool_size": 16,
+    "http_timeout": 30,
+    "request_timeouts": {
+        "search": 10,
+        "videos": 10,
+        "activities": 10,
+        "playlists": 10,
+        "playlistItems": 15,
+        "subscriptions": 15
+    },
+    "screen_load_deadline": 60,
+    "offline_probe_interval": 60,
+    "quota_probe_interval": 900,
+    "daemon_refresh_interval": 300,
+    "daemon_cache_ttl": 600,
+    "background_refresh": True,
+    "background_refresh_tick": 60,
+    "background_quota_per_hour": 100,
+    "channel_poll_min_interval": 600,
+    "channel_poll_max_interval": 86400,
+    "trending_refresh_interval": 1800,
+    "trending_regions": ["US"],
+    "trending_categories": ["", "10", "20"],
+    "trending_max_results": 50,
+    "trending_chart_ttl": 1800,
+    "trending_category_ttl": 7200,
+    "playlists_refresh_interval": 1800,
+    "warm_accounts": 3,
+    "token_refresh_margin": 600,
+    "token_check_interval": 60,
+    "thumbnail_preview": False,
+    "thumbnail_cache_mb": 50,
+    "thumbnail_download_workers": 4,
+    "new_badges": True,
+    "seen_set_capacity": 100000,
+    "player": "mpv",
+    "player_command": "mpv",
+    "player_args": [],
+    "playlist_stats": True,
+    "playlist_stats_max_items": 1000,
+    "playlist_stats_ttl": 86400,
+    "playlist_prefetch": True,
+    "playlist_prefetch_ttl": 300,
+    "prefetch_quota_per_hour": 60,
+    "video_details_ttl": 86400
 }
 
 
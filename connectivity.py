@@ -0,0 +1,95 @@
+"""Whether YouTube is reachable, for falling back to locally saved data."""
+import threading
+import time
+from typing import Optional
+
+# Why the app is offline
+FORCED = "forced"
+NETWORK = "network"
+QUOTA = "quota"
+
+
+class Connectivity:
+    """
+    Online/offline state shared by every YouTubeAPI instance.
+
+    The app goes offline for the whole session with --offline, or on its
+    own when a request finds the network unreachable or the daily quota
+    spent. While offline, YouTubeAPI answers from the library and search
+    index. The app probes YouTube now and then, and goes back online once
+    a probe succeeds.
+    """
+
+    def __init__(self, forced: bool = False, probe_interval: float = 60.0,
+                 quota_probe_interval: float = 900.0):
+        """
+        Initialize the state.
+
+        Args:
+            forced: Stay offline for the whole session and never probe
+            probe_interval: Seconds between probes after a network failure
+            quota_probe_interval: Seconds between probes after running out of quota
+        """
+        self.probe_interval = probe_interval
+        self.quota_probe_interval = quota_probe_interval
+        self.reason: Optional[str] = FORCED if forced else None
+        self.since: Optional[float] = time.time() if forced else None
+
+        self._lock = threading.Lock()
+        self._last_probe = time.monotonic()
+
+    @property
+    def offline(self) -> bool:
+        """Whether requests should be answered from local data."""
+        return self.reason is not None
+
+    def go_offline(self, reason: str) -> bool:
+        """
+        Switch to local data.
+
+        Returns:
+            True if the app was online until now
+        """
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            self.since = time.time()
+            self._last_probe = time.monotonic()
+            return True
+
+    def go_online(self) -> bool:
+        """
+        Switch back to YouTube, unless offline was forced.
+
+        Returns:
+            True if the app was offline until now
+        """
+        with self._lock:
+            if self.reason is None or self.reason == FORCED:
+                return False
+            self.reason = None
+            self.since = None
+            return True
+
+    def probe_due(self) -> bool:
+        """Check whether it is time to probe YouTube, and if so count the probe as started."""
+        with self._lock:
+            if self.reason is None or self.reason == FORCED:
+                return False
+            interval = self.quota_probe_interval if self.reason == QUOTA else self.probe_interval
+            now = time.monotonic()
+            if now - self._last_probe < interval:
+                return False
+            self._last_probe = now
+            return True
+
+    def describe(self) -> str:
+        """Describe why the app is offline, for the status bar."""
+        if self.reason == FORCED:
+            return "Offline mode"
+        if self.reason == QUOTA:
+            cause = "API quota used up"
+        else:
+            cause = "YouTube unreachable"
+        return f"Offline: {cause} since {time.strftime('%H:%M', time.localtime(self.since))}"
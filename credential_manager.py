@@ -0,0 +1,248 @@
+"""In-memory OAuth credentials, refreshed in the background before they expire."""
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from google.auth.exceptions import RefreshError, TransportError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+# Refreshes run while the TUI owns the terminal, so nothing here may print;
+# messages reach a log file only if the application configures one
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Scopes a saved token must have; Google may add others (such as openid)
+REQUIRED_SCOPES = {
+    'https://www.googleapis.com/auth/youtube.readonly',
+    'https://www.googleapis.com/auth/youtube.force-ssl',
+    'https://www.googleapis.com/auth/userinfo.email',
+    'https://www.googleapis.com/auth/userinfo.profile'
+}
+
+
+def _expires_within(creds: Credentials, seconds: float) -> bool:
+    """Check whether credentials expire within the given time (expiry is naive UTC)."""
+    if creds.expiry is None:
+        return not creds.valid
+    return creds.expiry - datetime.utcnow() < timedelta(seconds=seconds)
+
+
+def _revoked(error: RefreshError) -> bool:
+    """Whether a refresh failed for good (such as invalid_grant) rather than for now (a 5xx)."""
+    retryable = getattr(error, 'retryable', None)
+    if retryable is not None:
+        return not retryable
+    # Versions of google-auth without retryable errors: only trust an explicit revocation
+    return 'invalid_grant' in str(error)
+
+
+class CredentialManager:
+    """
+    Keeps each account's credentials in memory, keyed by token file.
+
+    Token files are read once. A background thread refreshes credentials
+    refresh_margin seconds before they expire, so requests never wait for
+    a refresh, and concurrent refreshes of one account share a single
+    round trip. Refreshed tokens are written to disk atomically on a
+    writer thread.
+    """
+
+    def __init__(self, refresh_margin: float = 600.0, check_interval: float = 60.0):
+        """
+        Initialize the manager; the refresh thread starts with the first token loaded.
+
+        Args:
+            refresh_margin: Seconds before expiry at which credentials are refreshed
+            check_interval: Seconds between checks for credentials due a refresh
+        """
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+
+        self._creds: Dict[Path, Credentials] = {}
+        self._refresh_locks: Dict[Path, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="token-writer")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, token_path: Path, refresh: bool = True) -> Optional[Credentials]:
+        """
+        Get an account's credentials, reading its token file the first time.
+
+        Args:
+            token_path: The account's token file
+            refresh: Refresh the credentials now if they have already expired
+
+        Returns:
+            Credentials, or None if there is no usable token (a token that is
+            unreadable, lacks scopes or can no longer be refreshed is deleted)
+        """
+        with self._lock:
+            creds = self._creds.get(token_path)
+
+        if creds is None:
+            creds = self._load(token_path)
+            if creds is None:
+                return None
+            with self._lock:
+                creds = self._creds.setdefault(token_path, creds)
+            self._start()
+
+        if refresh and creds.expired and creds.refresh_token:
+            return self.refresh(token_path, creds)
+        return creds
+
+    def _load(self, token_path: Path) -> Optional[Credentials]:
+        """Read a token file, deleting it if it cannot be used."""
+        if not token_path.exists():
+            return None
+
+        try:
+            with open(token_path, 'rb') as f:
+                creds = pickle.load(f)
+        except Exception as e:
+            logger.warning("Error loading credentials from %s: %s", token_path, e)
+            # Delete corrupted token
+            self._delete(token_path)
+            return None
+
+        if creds and creds.scopes and not REQUIRED_SCOPES.issubset(set(creds.scopes)):
+            logger.warning("Token %s is missing required scopes (required %s, got %s); deleting it",
+                           token_path, sorted(REQUIRED_SCOPES), sorted(creds.scopes))
+            self._delete(token_path)
+            return None
+        return creds
+
+    def refresh(self, token_path: Path, creds: Credentials, margin: float = 0.0) -> Optional[Credentials]:
+        """
+        Refresh credentials unless they are good for another margin seconds.
+
+        Callers refreshing the same account at once share one refresh.
+
+        Returns:
+            The credentials; None if they were revoked, in which case the
+            token is deleted. After a failure that may pass (no network, a
+            token endpoint error) they are returned unrefreshed, to be
+            refreshed on the next check.
+        """
+        with self._lock:
+            refresh_lock = self._refresh_locks.setdefault(token_path, threading.Lock())
+
+        with refresh_lock:
+            # Someone else may have refreshed while we waited
+            if not _expires_within(creds, margin):
+                return creds
+            try:
+                creds.refresh(Request())
+            except TransportError:
+                return creds
+            except RefreshError as e:
+                if not _revoked(e):
+                    logger.warning("Refreshing %s failed, will retry: %s", token_path, e)
+                    return creds
+                logger.warning("Credentials in %s were revoked; deleting them: %s", token_path, e)
+                self.remove(token_path)
+                return None
+            except Exception as e:
+                logger.warning("Refreshing %s failed, will retry: %s", token_path, e)
+                return creds
+
+        with self._lock:
+            # Removed while refreshing; writing would bring the token file back
+            if self._creds.get(token_path) is not creds:
+                return creds
+            self.save(token_path, creds)
+        return creds
+
+    def store(self, token_path: Path, creds: Credentials) -> Future:
+        """
+        Keep new credentials in memory and write them to disk.
+
+        Returns:
+            Future for the write, raising if the token could not be saved
+        """
+        with self._lock:
+            self._creds[token_path] = creds
+        self._start()
+        return self.save(token_path, creds)
+
+    def save(self, token_path: Path, creds: Credentials) -> Future:
+        """Write credentials to their token file on the writer thread; a failed write is logged."""
+        future = self._writer.submit(self._write, token_path, creds)
+        future.add_done_callback(lambda done: self._log_failed_write(token_path, done))
+        return future
+
+    @staticmethod
+    def _log_failed_write(token_path: Path, future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Failed to save credentials to %s: %s", token_path, future.exception())
+
+    def _write(self, token_path: Path, creds: Credentials) -> None:
+        """Replace a token file atomically, so a crash never leaves half a token."""
+        token_path.parent.mkdir(parents=True, exist_ok=True)
+        # mkstemp creates the file readable by the owner only
+        fd, tmp_path = tempfile.mkstemp(dir=token_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(creds, f)
+            os.replace(tmp_path, token_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def forget(self, token_path: Path) -> None:
+        """Drop credentials from memory."""
+        with self._lock:
+            self._creds.pop(token_path, None)
+
+    def remove(self, token_path: Path) -> None:
+        """
+        Drop credentials and delete their token file, e.g. when their account is removed.
+
+        A refresh finishing afterwards sees they are gone and writes nothing,
+        and a write it queued before is done by the time the file is deleted.
+        """
+        self.forget(token_path)
+        self._delete(token_path)
+
+    def _delete(self, token_path: Path) -> None:
+        """Delete a token file once pending writes to it are done."""
+        self._writer.submit(lambda: token_path.unlink(missing_ok=True)).result()
+
+    def refresh_due(self) -> None:
+        """Refresh every credential expiring within refresh_margin."""
+        with self._lock:
+            due = [(path, creds) for path, creds in self._creds.items()
+                   if creds.refresh_token and _expires_within(creds, self.refresh_margin)]
+        for token_path, creds in due:
+            if self._stop.is_set():
+                return
+            self.refresh(token_path, creds, margin=self.refresh_margin)
+
+    def _start(self) -> None:
+        """Start the refresh thread if it is not running."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, name="token-refresh", daemon=True)
+        self._thread.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh_due()
+            except Exception:
+                # Never let one bad token stop the others being refreshed
+                pass
+
+    def stop(self) -> None:
+        """Stop refreshing and wait for pending token writes."""
+        self._stop.set()
+        self._writer.shutdown(wait=True)
@@ -0,0 +1,557 @@
+"""Background sync daemon serving YouTube data to TUI instances over a Unix socket."""
+import inspect
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from cache import TTLCache, cache_bypassed
+from cancellation import DeadlineExceeded, current_token
+from config import DAEMON_SOCKET
+from refresher import BackgroundRefresher, QuotaBudget, RefreshResult
+from scheduler import Priority, current_priority, request_priority
+from transport import build_youtube_service
+from youtube_api import YouTubeAPI, YouTubeAPIError, OfflineResult
+
+# Frames are a 4-byte big-endian length followed by that many bytes of JSON
+_HEADER = struct.Struct('>I')
+MAX_FRAME = 64 * 1024 * 1024
+
+# Methods clients may call, and those whose results the daemon keeps warm
+REMOTE_METHODS = {
+    'search_videos', 'search_videos_progressive', 'get_subscriptions', 'get_subscription_videos',
+    'get_playlists', 'get_playlist_videos', 'get_trending_videos', 'get_stats',
+    'get_videos', 'get_channel_uploads', 'get_playlist_stats',
+}
+STREAMING_METHODS = {'search_videos_progressive'}
+CACHED_METHODS = {
+    'get_subscriptions', 'get_subscription_videos',
+    'get_playlists', 'get_playlist_videos', 'get_trending_videos',
+}
+
+# Videos kept in the feed, as the Subscriptions screen asks for
+FEED_SIZE = 50
+
+
+class DaemonError(YouTubeAPIError):
+    """Custom exception for daemon and daemon connection errors; screens treat them as API errors."""
+    pass
+
+
+def send_frame(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Send one message as a length-prefixed JSON frame."""
+    data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    if len(data) > MAX_FRAME:
+        raise DaemonError(f"Message too large: {len(data)} bytes")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly size bytes, or None if the peer closed before sending any."""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise DaemonError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Receive one frame, or None if the peer closed the connection."""
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise DaemonError(f"Frame too large: {size} bytes")
+    data = _recv_exactly(sock, size) if size else b''
+    if data is None:
+        raise DaemonError("Connection closed mid-frame")
+    return json.loads(data.decode('utf-8'))
+
+
+def _cache_key(api: YouTubeAPI, method: str, args: List[Any], kwargs: Dict[str, Any]) -> tuple:
+    """Key a call by its full arguments, so calls spelling out a default share an entry."""
+    bound = inspect.signature(getattr(api, method)).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return (api.account_id, method, json.dumps(bound.arguments, sort_keys=True))
+
+
+def _encode_result(result: Any) -> Dict[str, Any]:
+    """Encode a method result, keeping whether it was served offline."""
+    if isinstance(result, OfflineResult):
+        return {'result': list(result), 'offline': True, 'synced_at': result.synced_at}
+    return {'result': result}
+
+
+def _decode_result(frame: Dict[str, Any]) -> Any:
+    """Decode a result frame from _encode_result."""
+    if frame.get('offline'):
+        return OfflineResult(frame['result'], frame.get('synced_at'))
+    return frame['result']
+
+
+class SyncDaemon:
+    """
+    Long-running process that keeps data warm for TUI instances.
+
+    It keeps each account's credentials refreshed and answers clients from
+    recent results, so a TUI launch needs no authentication. Each sync runs
+    a BackgroundRefresher per account, all spending one QuotaBudget: new
+    uploads are found by polling channels' uploads playlists (one unit a
+    poll) and merged into the cached feed, and subscriptions, playlists and
+    trending are re-fetched on their own intervals.
+    """
+
+    def __init__(self, api: YouTubeAPI, account_manager, socket_path: Optional[Path] = None, refresh_interval: float = 300.0,
+                 cache_ttl: float = 600.0, budget: Optional[QuotaBudget] = None,
+                 refresher_options: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the daemon.
+
+        Args:
+            api: YouTubeAPI for the active account; other accounts share its infrastructure
+            account_manager: AccountManager whose credentials the daemon keeps refreshed
+            socket_path: Unix socket to listen on, defaults to DAEMON_SOCKET
+            refresh_interval: Seconds between scheduled syncs
+            cache_ttl: Seconds a synced or fetched result is served to clients
+            budget: Quota scheduled syncs may spend, across all accounts;
+                defaults to 100 units an hour
+            refresher_options: Other BackgroundRefresher arguments (see
+                refresher.refresher_options)
+        """
+        self.account_manager = account_manager
+        self.socket_path = Path(socket_path) if socket_path is not None else DAEMON_SOCKET
+        self.refresh_interval = refresh_interval
+        self.cache = TTLCache(maxsize=512, ttl=cache_ttl)
+        self.budget = budget if budget is not None else QuotaBudget(100)
+        self.refresher_options = refresher_options or {}
+        self._refreshers: Dict[Optional[str], BackgroundRefresher] = {}
+
+        self._lock = threading.Lock()
+        self._apis: Dict[Optional[str], YouTubeAPI] = {api.account_id: api}
+        self._stop = threading.Event()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    @property
+    def default_account(self) -> Optional[str]:
+        """Get the account the daemon was started for."""
+        return next(iter(self._apis))
+
+    def api_for(self, account_id: Optional[str]) -> YouTubeAPI:
+        """
+        Get the client for an account, signing it in from its saved token if needed.
+
+        Raises:
+            YouTubeAPIError: If the account is unknown or has no usable token.
+        """
+        if account_id is None:
+            account_id = self.default_account
+
+        with self._lock:
+            api = self._apis.get(account_id)
+            if api is not None:
+                return api
+
+            account = self.account_manager.get_account_by_id(account_id)
+            creds = self.account_manager.get_credentials(account) if account else None
+            if creds is None:
+                raise YouTubeAPIError(f"Account {account_id} is not signed in; sign in from the TUI first.")
+
+            base = self._apis[self.default_account]
+            api = base.for_account(build_youtube_service(creds), account_id)
+            self._apis[account_id] = api
+            return api
+
+    def call(self, account_id: Optional[str], method: str, args: List[Any], kwargs: Dict[str, Any],
+             fresh: bool = False) -> Any:
+        """
+        Call a YouTubeAPI method for an account, answering from the cache when possible.
+
+        Args:
+            account_id: Account to call for, or None for the daemon's own
+            method: Name of the method
+            args: Positional arguments
+            kwargs: Keyword arguments
+            fresh: Skip the cache (an explicit refresh); the result still replaces the cached one
+
+        Returns:
+            The method's result
+        """
+        if method not in REMOTE_METHODS or method in STREAMING_METHODS:
+            raise YouTubeAPIError(f"Unknown method: {method}")
+
+        api = self.api_for(account_id)
+        if method not in CACHED_METHODS:
+            return getattr(api, method)(*args, **kwargs)
+
+        key = _cache_key(api, method, args, kwargs)
+        result = None if fresh else self.cache.get(key)
+        if result is None:
+            result = getattr(api, method)(*args, **kwargs)
+            if not isinstance(result, OfflineResult):
+                self.cache.set(key, result)
+        return result
+
+    def stream(self, account_id: Optional[str], method: str, args: List[Any],
+               kwargs: Dict[str, Any]) -> Iterator[Any]:
+        """Call a YouTubeAPI generator method for an account."""
+        if method not in STREAMING_METHODS:
+            raise YouTubeAPIError(f"Unknown method: {method}")
+        return getattr(self.api_for(account_id), method)(*args, **kwargs)
+
+    def _cache_result(self, api: YouTubeAPI, method: str, kwargs: Dict[str, Any], result: Any) -> None:
+        """Serve a synced result to clients making the same call."""
+        self.cache.set(_cache_key(api, method, [], kwargs), result)
+
+    def _apply_refresh(self, api: YouTubeAPI, result: RefreshResult) -> None:
+        """Put what a refresher tick found into the cache."""
+        if result.subscriptions is not None:
+            self._cache_result(api, 'get_subscriptions', {'max_results': None}, result.subscriptions)
+            self._cache_result(api, 'get_subscriptions', {'max_results': 50}, result.subscriptions[:50])
+        if result.playlists is not None:
+            self._cache_result(api, 'get_playlists', {'max_results': 50}, result.playlists)
+        if result.trending is not None:
+            refresher = self._refreshers[api.account_id]
+            self._cache_result(api, 'get_trending_videos', {
+                'max_results': refresher.trending_max_results, 'region_code': refresher.trending_region,
+                'category_id': refresher.trending_category or None
+            }, result.trending)
+
+        if result.new_videos:
+            # New uploads join the feed clients were last served, if it is still cached
+            kwargs = {'max_results': FEED_SIZE}
+            feed = self.cache.get(_cache_key(api, 'get_subscription_videos', [], kwargs))
+            if feed is not None:
+                shown = {video['id'] for video in feed}
+                merged = feed + [video for video in result.new_videos if video['id'] not in shown]
+                merged.sort(key=lambda video: video['published_at'], reverse=True)
+                self._cache_result(api, 'get_subscription_videos', kwargs, merged[:FEED_SIZE])
+
+    def refresh_once(self) -> None:
+        """Run every account's background refresher within the shared budget, and tidy the local index."""
+        with self._lock:
+            apis = list(self._apis.values())
+
+        with request_priority(Priority.BACKGROUND):
+            connectivity = apis[0].connectivity if apis else None
+            if connectivity is not None and connectivity.probe_due():
+                try:
+                    apis[0].probe()
+                except Exception:
+                    pass
+
+            for api in apis:
+                if self._stop.is_set():
+                    return
+                refresher = self._refreshers.get(api.account_id)
+                if refresher is None:
+                    refresher = BackgroundRefresher(self.budget, **self.refresher_options)
+                    self._refreshers[api.account_id] = refresher
+                try:
+                    result = refresher.tick(api)
+                except Exception:
+                    # The next sync tries again
+                    continue
+                self._apply_refresh(api, result)
+
+        search_index = apis[0].search_index if apis else None
+        if search_index is not None:
+            try:
+                search_index.evict()
+            except Exception:
+                pass
+
+    def _sync_loop(self) -> None:
+        """Run scheduled syncs until stopped."""
+        while not self._stop.is_set():
+            self.refresh_once()
+            self._stop.wait(self.refresh_interval)
+
+    def serve_forever(self) -> None:
+        """
+        Listen on the socket and sync in the background until shutdown.
+
+        Raises:
+            DaemonError: If another daemon is already listening.
+        """
+        if self.socket_path.exists():
+            if ping(self.socket_path):
+                raise DaemonError(f"A daemon is already running on {self.socket_path}")
+            # Left over from a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                daemon._handle_connection(self.request)
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+        threading.Thread(target=self._sync_loop, name="yt-tui-sync", daemon=True).start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()
+            except OSError:
+                pass
+
+    def shutdown(self) -> None:
+        """Stop syncing and serving."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _handle_connection(self, sock: socket.socket) -> None:
+        """Answer a client's requests, one at a time, until it disconnects."""
+        while True:
+            try:
+                request = recv_frame(sock)
+            except (DaemonError, OSError, ValueError):
+                return
+            if request is None:
+                return
+
+            request_id = request.get('id')
+            method = request.get('method', '')
+            try:
+                if method == 'hello':
+                    send_frame(sock, {'id': request_id, 'result': {'account_id': self.default_account}})
+                    continue
+
+                args = request.get('args', [])
+                kwargs = request.get('kwargs', {})
+                priority = Priority(request.get('priority', Priority.VISIBLE))
+                with request_priority(priority):
+                    if method in STREAMING_METHODS:
+                        for result in self.stream(request.get('account'), method, args, kwargs):
+                            send_frame(sock, {'id': request_id, 'more': True, **_encode_result(result)})
+                        send_frame(sock, {'id': request_id, 'result': None})
+                    else:
+                        result = self.call(request.get('account'), method, args, kwargs,
+                                           fresh=bool(request.get('fresh')))
+                        frame = {'id': request_id, **_encode_result(result)}
+                        if method == 'get_subscription_videos':
+                            frame['failed_channels'] = self.api_for(request.get('account')).last_failed_channels
+                        send_frame(sock, frame)
+            except OSError:
+                return
+            except Exception as e:
+                try:
+                    send_frame(sock, {'id': request_id, 'error': str(e), 'kind': type(e).__name__})
+                except OSError:
+                    return
+
+
+def ping(socket_path: Optional[Path] = None, timeout: float = 1.0) -> bool:
+    """Check whether a daemon is answering on the socket."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path or DAEMON_SOCKET))
+            send_frame(sock, {'id': 0, 'method': 'hello'})
+            return recv_frame(sock) is not None
+    except (OSError, DaemonError, ValueError):
+        return False
+
+
+class DaemonClient:
+    """
+    Stand-in for YouTubeAPI that forwards calls to a running SyncDaemon.
+
+    Each thread keeps its own connection, so calls from several workers
+    run side by side. Local search reads the shared search index directly.
+    """
+
+    # The daemon refreshes in the background, so its clients need not
+    background_sync = True
+
+    def __init__(self, socket_path: Optional[Path] = None, account_id: Optional[str] = None,
+                 search_index=None, timeout: float = 120.0):
+        """
+        Connect to the daemon.
+
+        Args:
+            socket_path: Daemon socket, defaults to DAEMON_SOCKET
+            account_id: Account to act for, defaults to the daemon's
+            search_index: Optional LocalSearchIndex for search_local
+            timeout: Seconds to wait for an answer when the caller has no deadline
+
+        Raises:
+            DaemonError: If no daemon answers.
+        """
+        self.socket_path = Path(socket_path) if socket_path is not None else DAEMON_SOCKET
+        self.search_index = search_index
+        self.timeout = timeout
+        self.connectivity = None
+        self.last_failed_channels: List[str] = []
+        self._local = threading.local()
+        self._next_id = 0
+        self._id_lock = threading.Lock()
+
+        self.account_id = None
+        daemon_account = self._call('hello')['account_id']
+        self.account_id = account_id if account_id is not None else daemon_account
+
+    def for_account(self, service, account_id: Optional[str]) -> 'DaemonClient':
+        """Get a client acting for another account; the daemon signs it in from its saved token."""
+        return DaemonClient(self.socket_path, account_id, self.search_index, self.timeout)
+
+    def _connection(self) -> socket.socket:
+        """Get this thread's connection, opening it if needed."""
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(str(self.socket_path))
+            except OSError as e:
+                sock.close()
+                raise DaemonError(f"Cannot reach the daemon at {self.socket_path}: {e}")
+            self._local.sock = sock
+        return sock
+
+    def _discard_connection(self) -> None:
+        """Drop this thread's connection, e.g. after giving up mid-answer."""
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def close(self) -> None:
+        """Close this thread's connection to the daemon."""
+        self._discard_connection()
+
+    def _send(self, method: str, args: tuple = (), kwargs: Optional[Dict[str, Any]] = None) -> int:
+        """Send a request on this thread's connection."""
+        token = current_token()
+        token.check()
+        with self._id_lock:
+            self._next_id += 1
+            request_id = self._next_id
+
+        remaining = token.remaining()
+        if remaining is not None and remaining <= 0:
+            # A zero timeout would make the socket non-blocking rather than time out
+            raise DeadlineExceeded("Request timed out")
+        sock = self._connection()
+        sock.settimeout(self.timeout if remaining is None else remaining)
+        try:
+            send_frame(sock, {
+                'id': request_id,
+                'method': method,
+                'account': self.account_id,
+                'args': list(args),
+                'kwargs': kwargs or {},
+                'priority': int(current_priority()),
+                'fresh': cache_bypassed(),
+            })
+        except OSError as e:
+            self._discard_connection()
+            raise DaemonError(f"Lost connection to the daemon: {e}")
+        return request_id
+
+    def _receive(self, request_id: int) -> Dict[str, Any]:
+        """Receive the next frame answering request_id."""
+        sock = self._connection()
+        try:
+            frame = recv_frame(sock)
+        except socket.timeout:
+            self._discard_connection()
+            raise DeadlineExceeded("Request timed out")
+        except (OSError, DaemonError, ValueError) as e:
+            self._discard_connection()
+            raise DaemonError(f"Lost connection to the daemon: {e}")
+
+        if frame is None or frame.get('id') != request_id:
+            self._discard_connection()
+            raise DaemonError("Lost connection to the daemon")
+        if 'error' in frame:
+            raise YouTubeAPIError(frame['error'])
+        return frame
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a daemon method and wait for its result."""
+        frame = self._receive(self._send(method, args, kwargs))
+        if 'failed_channels' in frame:
+            self.last_failed_channels = frame['failed_channels']
+        return _decode_result(frame)
+
+    def search_videos(self, query: str, max_results: int = 25) -> List[Dict[str, Any]]:
+        """Search for videos (see YouTubeAPI.search_videos)."""
+        return self._call('search_videos', query, max_results=max_results)
+
+    def search_videos_progressive(self, query: str, max_results: int = 25) -> Iterator[List[Dict[str, Any]]]:
+        """Search for videos in phases (see YouTubeAPI.search_videos_progressive)."""
+        request_id = self._send('search_videos_progressive', (query,), {'max_results': max_results})
+        while True:
+            frame = self._receive(request_id)
+            if not frame.get('more'):
+                return
+            yield _decode_result(frame)
+
+    def search_local(self, query: str, max_results: int = 25) -> List[Dict[str, Any]]:
+        """Search videos already seen (see YouTubeAPI.search_local)."""
+        if self.search_index is None:
+            raise YouTubeAPIError("Local search index is not available.")
+        try:
+            return self.search_index.search(query, max_results=max_results)
+        except Exception as e:
+            raise YouTubeAPIError(f"Local search failed: {e}")
+
+    def get_subscriptions(self, max_results: Optional[int] = 50) -> List[Dict[str, Any]]:
+        """Get user's subscriptions (see YouTubeAPI.get_subscriptions)."""
+        return self._call('get_subscriptions', max_results=max_results)
+
+    def get_subscription_videos(self, max_results: int = 50) -> List[Dict[str, Any]]:
+        """Get recent videos from subscribed channels (see YouTubeAPI.get_subscription_videos)."""
+        return self._call('get_subscription_videos', max_results=max_results)
+
+    def get_playlists(self, max_results: int = 50) -> List[Dict[str, Any]]:
+        """Get user's playlists (see YouTubeAPI.get_playlists)."""
+        return self._call('get_playlists', max_results=max_results)
+
+    def get_playlist_videos(self, playlist_id: str, max_results: int = 50) -> List[Dict[str, Any]]:
+        """Get videos from a playlist (see YouTubeAPI.get_playlist_videos)."""
+        return self._call('get_playlist_videos', playlist_id, max_results=max_results)
+
+    def get_trending_videos(self, max_results: int = 25, region_code: str = "US",
+                            category_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get trending videos (see YouTubeAPI.get_trending_videos)."""
+        return self._call('get_trending_videos', max_results=max_results, region_code=region_code,
+                          category_id=category_id)
+
+    def get_videos(self, video_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get full details of videos by ID (see YouTubeAPI.get_videos)."""
+        return self._call('get_videos', list(video_ids))
+
+    def get_channel_uploads(self, channel_id: str, max_results: int = 5,
+                            if_changed: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """Get a channel's latest uploads (see YouTubeAPI.get_channel_uploads)."""
+        return self._call('get_channel_uploads', channel_id, max_results=max_results, if_changed=if_changed)
+
+    def get_playlist_stats(self, playlist_id: str, etag: Optional[str] = None,
+                           max_items: int = 1000, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Get aggregate statistics of a playlist (see YouTubeAPI.get_playlist_stats)."""
+        return self._call('get_playlist_stats', playlist_id, etag=etag, max_items=max_items, max_age=max_age)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the daemon's request counters (see YouTubeAPI.get_stats)."""
+        return self._call('get_stats')
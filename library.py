@@ -0,0 +1,465 @@
+"""Local SQLite library of the user's channels, subscriptions and playlists."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+from config import LIBRARY_FILE, ensure_config_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    thumbnail TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    account_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    published_at TEXT NOT NULL,
+    PRIMARY KEY (account_id, channel_id)
+);
+CREATE INDEX IF NOT EXISTS subscriptions_channel ON subscriptions(channel_id);
+
+CREATE TABLE IF NOT EXISTS playlists (
+    id TEXT PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    thumbnail TEXT NOT NULL,
+    video_count INTEGER NOT NULL,
+    published_at TEXT NOT NULL,
+    etag TEXT
+);
+CREATE INDEX IF NOT EXISTS playlists_account ON playlists(account_id, position);
+
+CREATE TABLE IF NOT EXISTS playlist_items (
+    playlist_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, position)
+);
+CREATE INDEX IF NOT EXISTS playlist_items_video ON playlist_items(video_id);
+
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    published_ts REAL NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_channel ON videos(channel_id, published_ts);
+CREATE INDEX IF NOT EXISTS videos_published ON videos(published_ts);
+
+CREATE TABLE IF NOT EXISTS listings (
+    account_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (account_id, name, position)
+);
+CREATE INDEX IF NOT EXISTS listings_video ON listings(video_id);
+
+CREATE TABLE IF NOT EXISTS playlist_stats (
+    account_id TEXT NOT NULL,
+    playlist_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (account_id, playlist_id)
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    account_id TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    etag TEXT,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (account_id, resource)
+);
+"""
+
+
+def playlist_items_resource(playlist_id: str, max_results: Any) -> str:
+    """Get the sync_state name of a playlist's item listing."""
+    return f"playlistItems:{playlist_id}:{max_results}"
+
+
+class LibraryError(Exception):
+    """Custom exception for local library errors."""
+    pass
+
+
+class Library:
+    """
+    Normalized local copy of the user's subscriptions and playlists.
+
+    YouTubeAPI writes each listing it fetches here along with the response
+    ETag, and sends that ETag back next time; when YouTube answers
+    304 Not Modified the listing is read from here instead. The latest
+    feed, history and trending lists are kept too, so that every tab can be
+    served from here while offline. Listings are kept per account;
+    channels and videos are shared between accounts.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Open (or create) the library.
+
+        Args:
+            path: Database file, defaults to LIBRARY_FILE
+
+        Raises:
+            LibraryError: If the database cannot be opened.
+        """
+        if path is None:
+            ensure_config_dir()
+            path = LIBRARY_FILE
+
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        try:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+        except sqlite3.Error as e:
+            raise LibraryError(f"Failed to open local library: {e}")
+
+    def _migrate(self) -> None:
+        """Add columns that libraries created by earlier versions lack."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(playlists)")}
+        if 'etag' not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE playlists ADD COLUMN etag TEXT")
+                # Forget the listings' ETags so the next sync fetches the playlists' own
+                self._conn.execute("DELETE FROM sync_state WHERE resource LIKE 'playlists:%'")
+
+    def etag(self, account_id: Optional[str], resource: str) -> Optional[str]:
+        """Get the ETag a listing had when it was last synced, if it was."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag FROM sync_state WHERE account_id = ? AND resource = ?",
+                (account_id or '', resource)
+            ).fetchone()
+        return row[0] if row else None
+
+    def synced_at(self, account_id: Optional[str], resource: str) -> Optional[float]:
+        """Get when a listing was last synced, if it was."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM sync_state WHERE account_id = ? AND resource = ?",
+                (account_id or '', resource)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _mark_synced(self, account_id: Optional[str], resource: str, etag: Optional[str]) -> None:
+        """Record a listing's ETag; the caller holds the lock and transaction."""
+        self._conn.execute(
+            """
+            INSERT INTO sync_state (account_id, resource, etag, synced_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(account_id, resource) DO UPDATE SET
+                etag = excluded.etag,
+                synced_at = excluded.synced_at
+            """,
+            (account_id or '', resource, etag, time.time())
+        )
+
+    def save_etag(self, account_id: Optional[str], resource: str, etag: Optional[str]) -> None:
+        """Record the ETag of a listing whose contents are kept elsewhere."""
+        with self._lock, self._conn:
+            self._mark_synced(account_id, resource, etag)
+
+    def save_subscriptions(self, account_id: Optional[str], subscriptions: List[Dict[str, Any]],
+                           resource: str = 'subscriptions', etag: Optional[str] = None) -> None:
+        """Replace an account's subscriptions with a freshly fetched list."""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT INTO channels (id, title, description, thumbnail, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        title = excluded.title,
+                        description = excluded.description,
+                        thumbnail = excluded.thumbnail,
+                        updated_at = excluded.updated_at
+                    """,
+                    [(sub['channel_id'], sub['title'], sub['description'], sub['thumbnail'], now)
+                     for sub in subscriptions]
+                )
+                self._conn.execute("DELETE FROM subscriptions WHERE account_id = ?", (account_id or '',))
+                self._conn.executemany(
+                    "INSERT INTO subscriptions (account_id, channel_id, position, published_at) VALUES (?, ?, ?, ?)",
+                    [(account_id or '', sub['channel_id'], position, sub['published_at'])
+                     for position, sub in enumerate(subscriptions)]
+                )
+                self._mark_synced(account_id, resource, etag)
+
+    def subscriptions(self, account_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Get an account's subscriptions in the order they were fetched."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT c.id, c.title, c.description, c.thumbnail, s.published_at
+                FROM subscriptions s JOIN channels c ON c.id = s.channel_id
+                WHERE s.account_id = ?
+                ORDER BY s.position
+                """,
+                (account_id or '',)
+            ).fetchall()
+
+        return [
+            {'channel_id': channel_id, 'title': title, 'description': description,
+             'thumbnail': thumbnail, 'published_at': published_at}
+            for channel_id, title, description, thumbnail, published_at in rows
+        ]
+
+    def save_playlists(self, account_id: Optional[str], playlists: List[Dict[str, Any]],
+                       resource: str = 'playlists', etag: Optional[str] = None) -> None:
+        """Replace an account's playlists, dropping the items of any that are gone."""
+        account_id = account_id or ''
+        with self._lock:
+            with self._conn:
+                current = {playlist['id'] for playlist in playlists}
+                known = {row[0] for row in self._conn.execute(
+                    "SELECT id FROM playlists WHERE account_id = ?", (account_id,)
+                )}
+                for playlist_id in known - current:
+                    self._replace_playlist_items(playlist_id, [])
+                    self._conn.execute(
+                        "DELETE FROM playlist_stats WHERE account_id = ? AND playlist_id = ?",
+                        (account_id, playlist_id)
+                    )
+                    self._conn.execute(
+                        "DELETE FROM sync_state WHERE account_id = ? AND resource LIKE ?",
+                        (account_id, playlist_items_resource(playlist_id, '%'))
+                    )
+
+                self._conn.execute("DELETE FROM playlists WHERE account_id = ?", (account_id,))
+                self._conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO playlists
+                        (id, account_id, position, title, description, thumbnail, video_count, published_at, etag)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [(playlist['id'], account_id, position, playlist['title'], playlist['description'],
+                      playlist['thumbnail'], playlist['video_count'], playlist['published_at'],
+                      playlist.get('etag'))
+                     for position, playlist in enumerate(playlists)]
+                )
+                self._mark_synced(account_id, resource, etag)
+
+    def playlists(self, account_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Get an account's playlists in the order they were fetched."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT id, title, description, thumbnail, video_count, published_at, etag
+                FROM playlists WHERE account_id = ?
+                ORDER BY position
+                """,
+                (account_id or '',)
+            ).fetchall()
+
+        return [
+            {'id': playlist_id, 'title': title, 'description': description,
+             'thumbnail': thumbnail, 'video_count': video_count, 'published_at': published_at,
+             'etag': etag}
+            for playlist_id, title, description, thumbnail, video_count, published_at, etag in rows
+        ]
+
+    def _replace_playlist_items(self, playlist_id: str, video_ids: List[str]) -> None:
+        """
+        Replace a playlist's items, dropping videos nothing refers to any more.
+
+        The caller holds the lock and transaction.
+        """
+        previous = [row[0] for row in self._conn.execute(
+            "SELECT video_id FROM playlist_items WHERE playlist_id = ?", (playlist_id,)
+        )]
+        self._conn.execute("DELETE FROM playlist_items WHERE playlist_id = ?", (playlist_id,))
+        self._conn.executemany(
+            "INSERT INTO playlist_items (playlist_id, position, video_id) VALUES (?, ?, ?)",
+            [(playlist_id, position, video_id) for position, video_id in enumerate(video_ids)]
+        )
+        self._drop_orphans(set(previous) - set(video_ids))
+
+    def _drop_orphans(self, video_ids) -> None:
+        """Delete those of video_ids no playlist or listing refers to; the caller holds the lock."""
+        self._conn.executemany(
+            """
+            DELETE FROM videos
+            WHERE id = ?
+              AND NOT EXISTS (SELECT 1 FROM playlist_items WHERE video_id = videos.id)
+              AND NOT EXISTS (SELECT 1 FROM listings WHERE video_id = videos.id)
+            """,
+            [(video_id,) for video_id in video_ids]
+        )
+
+    def save_playlist_items(self, account_id: Optional[str], playlist_id: str, video_ids: List[str],
+                            resource: str, etag: Optional[str] = None) -> None:
+        """Replace a playlist's items with a freshly fetched list of video IDs."""
+        with self._lock:
+            with self._conn:
+                self._replace_playlist_items(playlist_id, video_ids)
+                self._mark_synced(account_id, resource, etag)
+
+    def playlist_videos(self, playlist_id: str) -> List[Dict[str, Any]]:
+        """Get a playlist's videos in playlist order, skipping any with no stored details."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT v.data FROM playlist_items i JOIN videos v ON v.id = i.video_id
+                WHERE i.playlist_id = ?
+                ORDER BY i.position
+                """,
+                (playlist_id,)
+            ).fetchall()
+
+        return [json.loads(data) for (data,) in rows]
+
+    def save_playlist_stats(self, account_id: Optional[str], playlist_id: str, stats: Dict[str, Any]) -> None:
+        """Replace a playlist's aggregate statistics."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO playlist_stats (account_id, playlist_id, data, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    (account_id or '', playlist_id, json.dumps(stats), time.time())
+                )
+
+    def playlist_stats(self, account_id: Optional[str], playlist_id: str,
+                       max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a playlist's stored aggregate statistics, if any.
+
+        Args:
+            account_id: Account the stats were stored for
+            playlist_id: ID of the playlist
+            max_age: Ignore stats computed longer ago than this many seconds
+
+        Returns:
+            The stats, or None
+        """
+        cutoff = time.time() - max_age if max_age is not None else 0.0
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM playlist_stats WHERE account_id = ? AND playlist_id = ? AND updated_at >= ?",
+                (account_id or '', playlist_id, cutoff)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def known_videos(self, video_ids: List[str], max_age: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the stored videos among video_ids, by ID.
+
+        Args:
+            video_ids: IDs to look up
+            max_age: Leave out videos whose details are older than this many seconds
+
+        Returns:
+            Video dictionaries by ID
+        """
+        cutoff = time.time() - max_age if max_age is not None else 0.0
+        videos = {}
+        with self._lock:
+            # Stay well under SQLite's limit on bound parameters
+            for i in range(0, len(video_ids), 500):
+                batch = video_ids[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                for video_id, data in self._conn.execute(
+                    f"SELECT id, data FROM videos WHERE id IN ({placeholders}) AND updated_at >= ?",
+                    batch + [cutoff]
+                ):
+                    videos[video_id] = json.loads(data)
+        return videos
+
+    def stale_playlist_videos(self, playlist_id: str, max_age: float) -> List[str]:
+        """Get the IDs of a playlist's stored videos whose details are older than max_age seconds."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT v.id FROM playlist_items i JOIN videos v ON v.id = i.video_id
+                WHERE i.playlist_id = ? AND v.updated_at < ?
+                ORDER BY i.position
+                """,
+                (playlist_id, time.time() - max_age)
+            ).fetchall()
+        return [video_id for (video_id,) in rows]
+
+    def _upsert_videos(self, videos: List[Dict[str, Any]]) -> None:
+        """Insert or refresh video details; the caller holds the lock and transaction."""
+        now = time.time()
+        self._conn.executemany(
+            """
+            INSERT INTO videos (id, channel_id, published_ts, data, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                channel_id = excluded.channel_id,
+                published_ts = excluded.published_ts,
+                data = excluded.data,
+                updated_at = excluded.updated_at
+            """,
+            [(video['id'], video['channel_id'], video['published_ts'], json.dumps(video), now)
+             for video in videos]
+        )
+        # Channels seen only through videos get a row with what the video tells us
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO channels (id, title, updated_at) VALUES (?, ?, ?)",
+            [(video['channel_id'], video['channel'], now) for video in videos]
+        )
+
+    def save_videos(self, videos: List[Dict[str, Any]]) -> None:
+        """Insert or refresh video details."""
+        if not videos:
+            return
+
+        with self._lock:
+            with self._conn:
+                self._upsert_videos(videos)
+
+    def save_listing(self, account_id: Optional[str], name: str, videos: List[Dict[str, Any]]) -> None:
+        """Replace a named list of videos (feed, history, trending) with a freshly fetched one."""
+        account_id = account_id or ''
+        with self._lock:
+            with self._conn:
+                previous = [row[0] for row in self._conn.execute(
+                    "SELECT video_id FROM listings WHERE account_id = ? AND name = ?", (account_id, name)
+                )]
+                self._upsert_videos(videos)
+                self._conn.execute("DELETE FROM listings WHERE account_id = ? AND name = ?", (account_id, name))
+                self._conn.executemany(
+                    "INSERT INTO listings (account_id, name, position, video_id) VALUES (?, ?, ?, ?)",
+                    [(account_id, name, position, video['id']) for position, video in enumerate(videos)]
+                )
+                self._drop_orphans(set(previous) - {video['id'] for video in videos})
+                self._mark_synced(account_id, name, None)
+
+    def listing(self, account_id: Optional[str], name: str) -> List[Dict[str, Any]]:
+        """Get a named list of videos in the order it was fetched."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT v.data FROM listings l JOIN videos v ON v.id = l.video_id
+                WHERE l.account_id = ? AND l.name = ?
+                ORDER BY l.position
+                """,
+                (account_id or '', name)
+            ).fetchall()
+
+        return [json.loads(data) for (data,) in rows]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
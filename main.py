@@ -3,14 +3,24 @@
 YT-TUI - YouTube Terminal User Interface
 A TUI client for browsing YouTube in the terminal.
 """
+import argparse
 import sys
 from pathlib import Path
 
 from auth import get_authenticated_service, AuthenticationError, is_authenticated
 from youtube_api import YouTubeAPI
 from ui.app import YouTubeApp
-from config import ensure_config_dir, get_client_secret_path
+from config import ensure_config_dir, get_client_secret_path, load_config, DAEMON_SOCKET
+from search_index import LocalSearchIndex, SearchIndexError
+from library import Library, LibraryError
+from connectivity import Connectivity
+from scheduler import RequestScheduler
+from ratelimit import TokenBucket, RetryPolicy
+from singleflight import SingleFlight
+from refresher import QuotaBudget, refresher_options
 from account_manager import AccountManager
+from daemon import SyncDaemon, DaemonClient, DaemonError
+from transport import build_youtube_service
 
 
 def print_setup_instructions():
@@ -42,29 +52,170 @@ def print_setup_instructions():
     print("=" * 70 + "\n")
 
 
+def open_search_index():
+    """Open the local search index, or return None if it is unavailable."""
+    config = load_config()
+    try:
+        return LocalSearchIndex(
+            max_videos=config["local_index_max_videos"],
+            max_age_days=config["local_index_max_age_days"]
+        )
+    except SearchIndexError as e:
+        print(f"Warning: {e}")
+        return None
+
+
+def open_library():
+    """Open the local library, or return None if it is unavailable."""
+    try:
+        return Library()
+    except LibraryError as e:
+        print(f"Warning: {e}")
+        return None
+
+
+def build_api(youtube_service, account, scheduler: RequestScheduler, offline: bool = False) -> YouTubeAPI:
+    """Build the YouTube API client with the configured limits and local stores."""
+    config = load_config()
+    return YouTubeAPI(
+        youtube_service,
+        search_index=open_search_index(),
+        scheduler=scheduler,
+        account_id=account.id if account else None,
+        rate_limiter=TokenBucket(config["requests_per_second"], config["request_burst"]),
+        retry_policy=RetryPolicy(max_attempts=config["max_request_attempts"]),
+        single_flight=SingleFlight(),
+        endpoint_timeouts=config["request_timeouts"],
+        library=open_library(),
+        video_details_ttl=config["video_details_ttl"],
+        connectivity=Connectivity(
+            forced=offline,
+            probe_interval=config["offline_probe_interval"],
+            quota_probe_interval=config["quota_probe_interval"]
+        )
+    )
+
+
+def connect_daemon(account_manager: AccountManager):
+    """Connect to a running sync daemon, or return None if there is none."""
+    if not DAEMON_SOCKET.exists():
+        return None
+    account = account_manager.get_active_account()
+    try:
+        return DaemonClient(
+            account_id=account.id if account else None,
+            search_index=open_search_index()
+        )
+    except DaemonError:
+        return None
+
+
+def run_daemon() -> None:
+    """Run the sync daemon for the signed-in accounts until interrupted."""
+    account_manager = AccountManager()
+    account = account_manager.get_active_account()
+    creds = account_manager.get_credentials(account) if account else None
+    if creds is None:
+        # The daemon runs unattended, so it never opens a browser to sign in
+        print("❌ No signed-in account. Run yt-tui once to sign in, then start the daemon.")
+        sys.exit(1)
+
+    config = load_config()
+    scheduler = RequestScheduler()
+    youtube_api = build_api(build_youtube_service(creds), account, scheduler)
+    daemon = SyncDaemon(
+        youtube_api,
+        account_manager,
+        refresh_interval=config["daemon_refresh_interval"],
+        cache_ttl=config["daemon_cache_ttl"],
+        budget=QuotaBudget(config["background_quota_per_hour"]),
+        refresher_options=refresher_options(config)
+    )
+
+    print(f"✓ Sync daemon for {account.name} ({account.email}) listening on {daemon.socket_path}")
+    try:
+        daemon.serve_forever()
+    except DaemonError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\nStopping daemon...")
+    finally:
+        scheduler.shutdown()
+        account_manager.close()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Browse YouTube in the terminal.")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["daemon"],
+        help="'daemon' runs the background sync daemon instead of the TUI"
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="talk to YouTube directly even if a sync daemon is running"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="never contact YouTube; show subscriptions, playlists, feed, history "
+             "and search from locally saved data"
+    )
+    return parser.parse_args(argv)
+
+
 def main():
     """Main entry point."""
+    args = parse_args()
+
     # Ensure config directory exists
     ensure_config_dir()
 
+    if args.command == "daemon":
+        run_daemon()
+        return
+
+    if not args.offline and not args.no_daemon:
+        account_manager = AccountManager()
+        client = connect_daemon(account_manager)
+        if client is not None:
+            # The daemon holds the credentials and fresh data; no sign-in needed
+            print("✓ Connected to sync daemon")
+            print("Starting YT-TUI...\n")
+            YouTubeApp(client, account_manager).run()
+            return
+
     # Check if client secret exists
     client_secret = get_client_secret_path()
-    if not client_secret:
+    if not client_secret and not args.offline:
         print_setup_instructions()
         sys.exit(1)
 
-    print("Authenticating with YouTube...")
-    print("A browser window will open for authentication if needed.\n")
+    if not args.offline:
+        print("Authenticating with YouTube...")
+        print("A browser window will open for authentication if needed.\n")
 
     try:
         # Initialize account manager
         account_manager = AccountManager()
 
-        # Authenticate and get YouTube service
-        youtube_service, account = get_authenticated_service(account_manager)
-        youtube_api = YouTubeAPI(youtube_service)
+        if args.offline:
+            # Saved data is keyed by account, so only the active one is needed
+            youtube_service, account = None, account_manager.ensure_active_account()
+        else:
+            # Authenticate and get YouTube service
+            youtube_service, account = get_authenticated_service(account_manager)
+        scheduler = RequestScheduler()
+        youtube_api = build_api(youtube_service, account, scheduler, offline=args.offline)
 
-        print("✓ Authentication successful!")
+        if args.offline:
+            print("✓ Offline mode: showing locally saved data")
+        else:
+            print("✓ Authentication successful!")
         if account:
             print(f"✓ Logged in as: {account.name} ({account.email})")
         print("Starting YT-TUI...\n")
@@ -72,6 +223,7 @@ def main():
         # Run the app with account manager
         app = YouTubeApp(youtube_api, account_manager)
         app.run()
+        scheduler.shutdown()
 
     except AuthenticationError as e:
         print(f"\n❌ Authentication failed: {e}")
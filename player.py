@@ -0,0 +1,281 @@
+"""Long-running external player (mpv) driven over its JSON IPC socket."""
+import json
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import webbrowser
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import PLAYER_SOCKET
+
+
+class PlayerError(Exception):
+    """Custom exception for player launch and IPC errors."""
+    pass
+
+
+class MpvPlayer:
+    """
+    One mpv process, kept running and reused for every video.
+
+    mpv is started idle with its IPC server on socket_path, and videos are
+    loaded into it with loadfile commands. An mpv already listening on the
+    socket (say, from an earlier run) is reused rather than started again.
+    If the user quits mpv, the next command starts a new one.
+    """
+
+    def __init__(self, socket_path: Optional[Path] = None, command: str = "mpv",
+                 args: Optional[List[str]] = None, spawn: bool = True,
+                 start_timeout: float = 5.0, timeout: float = 5.0):
+        """
+        Initialize the player; nothing is started until the first command.
+
+        Args:
+            socket_path: IPC socket, defaults to PLAYER_SOCKET
+            command: mpv executable
+            args: Extra mpv arguments
+            spawn: Start mpv when nothing listens on the socket; with False,
+                only an existing server (such as a stub) is used
+            start_timeout: Seconds to wait for a started mpv to listen
+            timeout: Seconds to wait for a reply to a command
+        """
+        self.socket_path = Path(socket_path) if socket_path is not None else PLAYER_SOCKET
+        self.command = command
+        self.args = list(args or [])
+        self.spawn = spawn
+        self.start_timeout = start_timeout
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._process: Optional[subprocess.Popen] = None
+        self._request_id = 0
+
+    @property
+    def available(self) -> bool:
+        """Whether commands can reach a player: mpv is installed, or spawning is off."""
+        return not self.spawn or shutil.which(self.command) is not None
+
+    def _try_connect(self) -> bool:
+        """Connect to the socket if something listens on it."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            return False
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+        return True
+
+    def _start(self) -> None:
+        """Start mpv idle with its IPC server, and wait until it listens."""
+        # A socket file left by an mpv that has exited would block the new one
+        self.socket_path.unlink(missing_ok=True)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._process = subprocess.Popen(
+                [self.command, "--idle=yes", f"--input-ipc-server={self.socket_path}"] + self.args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                # Keep playing after the TUI exits, and out of its terminal
+                start_new_session=True
+            )
+        except OSError as e:
+            raise PlayerError(f"Failed to start {self.command}: {e}")
+
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            if self._try_connect():
+                return
+            if self._process.poll() is not None:
+                raise PlayerError(f"{self.command} exited with status {self._process.returncode}")
+            time.sleep(0.05)
+        raise PlayerError(f"{self.command} did not open its IPC socket")
+
+    def _ensure_connected(self) -> None:
+        if self._sock is not None:
+            return
+        if self._try_connect():
+            return
+        if not self.spawn:
+            raise PlayerError(f"No player listening on {self.socket_path}")
+        self._start()
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def _send(self, commands: List[List[Any]]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Write commands back to back; returns the request IDs awaiting a reply."""
+        pending = {}
+        lines = []
+        for command in commands:
+            self._request_id += 1
+            pending[self._request_id] = None
+            lines.append(json.dumps({'command': command, 'request_id': self._request_id}) + '\n')
+        self._sock.sendall(''.join(lines).encode('utf-8'))
+        return pending
+
+    def _receive(self, pending: Dict[int, Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Read the replies to sent commands, skipping events."""
+        remaining = len(pending)
+        while remaining:
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError("player closed the connection")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            request_id = message.get('request_id')
+            if 'event' in message or request_id not in pending or pending[request_id] is not None:
+                continue
+            pending[request_id] = message
+            remaining -= 1
+        return list(pending.values())
+
+    def execute(self, *commands: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Send IPC commands, pipelined, starting or reconnecting to mpv if needed.
+
+        Commands are resent only if they could not be written. Once written
+        they may have run (appending to the playlist is not idempotent), so
+        a failure reading the replies is reported rather than retried.
+
+        Returns:
+            mpv's replies, in order
+
+        Raises:
+            PlayerError: If mpv cannot be reached or rejects a command
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    self._ensure_connected()
+                    pending = self._send(list(commands))
+                    break
+                except (OSError, ConnectionError) as e:
+                    # The user may have quit mpv; reconnect (or restart it) once
+                    self._disconnect()
+                    if attempt:
+                        raise PlayerError(f"Player connection failed: {e}")
+
+            try:
+                replies = self._receive(pending)
+            except (OSError, ConnectionError) as e:
+                self._disconnect()
+                raise PlayerError(f"No reply from player: {e}")
+
+        for reply in replies:
+            if reply.get('error') != 'success':
+                raise PlayerError(f"Player error: {reply.get('error')}")
+        return replies
+
+    def play(self, url: str) -> None:
+        """Play a URL now, replacing whatever is playing."""
+        self.execute(["loadfile", url, "replace"])
+
+    def enqueue(self, urls: List[str], play: bool = False) -> None:
+        """
+        Add URLs to the end of the playlist in one round trip.
+
+        Args:
+            urls: URLs to queue, in order
+            play: Replace what is playing with the first of them
+        """
+        if not urls:
+            return
+        commands = [["loadfile", url, "append-play"] for url in urls]
+        if play:
+            commands[0] = ["loadfile", urls[0], "replace"]
+        self.execute(*commands)
+
+    def close(self) -> None:
+        """Drop the connection; mpv keeps playing."""
+        with self._lock:
+            self._disconnect()
+
+
+class PlayerLauncher:
+    """
+    Opens videos without blocking the caller.
+
+    Commands run in order on a single worker thread. When there is no
+    player, or it cannot be reached, videos open in the web browser instead.
+    """
+
+    def __init__(self, player: Optional[MpvPlayer] = None):
+        """
+        Initialize the launcher.
+
+        Args:
+            player: Player to use, or None to always use the browser
+        """
+        self.player = player
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="player")
+
+    def _use_player(self) -> bool:
+        return self.player is not None and self.player.available
+
+    def play(self, url: str) -> Future:
+        """
+        Open a URL in the player, or the browser.
+
+        Returns:
+            Future resolving to "player" or "browser", whichever opened it
+        """
+        return self._executor.submit(self._play, url)
+
+    def enqueue(self, urls: List[str], play: bool = False) -> Future:
+        """
+        Queue URLs in the player; the browser can only open the first of them.
+
+        Returns:
+            Future resolving to "player" or "browser", whichever was used
+        """
+        return self._executor.submit(self._enqueue, list(urls), play)
+
+    def browse(self, url: str) -> Future:
+        """Open a URL in the browser, never the player (for pages that are not videos)."""
+        return self._executor.submit(webbrowser.open, url)
+
+    def _play(self, url: str) -> str:
+        if self._use_player():
+            try:
+                self.player.play(url)
+                return "player"
+            except PlayerError:
+                pass
+        webbrowser.open(url)
+        return "browser"
+
+    def _enqueue(self, urls: List[str], play: bool) -> str:
+        if self._use_player():
+            try:
+                self.player.enqueue(urls, play=play)
+                return "player"
+            except PlayerError:
+                pass
+        if urls:
+            webbrowser.open(urls[0])
+        return "browser"
+
+    def close(self) -> None:
+        """Stop taking commands and drop the player connection."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.player is not None:
+            self.player.close()
@@ -0,0 +1,36 @@
+"""Aggregate statistics of a playlist's videos."""
+from typing import Any, Dict, List
+
+
+def aggregate(videos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Sum up a playlist's videos.
+
+    Args:
+        videos: The playlist's videos with details (deleted and private ones left out)
+
+    Returns:
+        Dict with count, total_seconds, average_seconds, total_views,
+        newest_ts and newest_title (of the most recently published video)
+    """
+    total_seconds = sum(video.get('duration_seconds', 0) for video in videos)
+    newest = max(videos, key=lambda video: video.get('published_ts', 0.0), default=None)
+    return {
+        'count': len(videos),
+        'total_seconds': total_seconds,
+        'average_seconds': total_seconds // len(videos) if videos else 0,
+        'total_views': sum(video.get('views', 0) for video in videos),
+        'newest_ts': newest.get('published_ts', 0.0) if newest else None,
+        'newest_title': newest.get('title', '') if newest else '',
+    }
+
+
+def format_runtime(seconds: int) -> str:
+    """Format a running time compactly, e.g. '3h 05m' or '12m'."""
+    minutes = int(seconds) // 60
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 100:
+        return f"{hours}h {minutes:02d}m"
+    return f"{hours}h"
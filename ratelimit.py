@@ -0,0 +1,150 @@
+"""Client-side rate limiting and retry policy for YouTube API requests."""
+import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from googleapiclient.errors import HttpError
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Error reasons worth retrying, even when sent with a 403
+RETRYABLE_REASONS = {
+    'backendError',
+    'internalError',
+    'rateLimitExceeded',
+    'userRateLimitExceeded',
+}
+
+# Error reasons that will not go away by retrying
+PERMANENT_REASONS = {
+    'quotaExceeded',
+    'dailyLimitExceeded',
+    'forbidden',
+    'insufficientPermissions',
+    'notFound',
+    'playlistNotFound',
+    'subscriptionForbidden',
+}
+
+
+def error_reason(error: HttpError) -> Optional[str]:
+    """Get the reason code from an API error response, if it has one."""
+    try:
+        content = error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content
+        details = json.loads(content)['error']
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+    errors = details.get('errors') or []
+    if errors and errors[0].get('reason'):
+        return errors[0]['reason']
+    return None
+
+
+def retry_after(error: HttpError) -> Optional[float]:
+    """Get the delay asked for by a Retry-After header, in seconds."""
+    try:
+        value = error.resp.get('retry-after')
+    except AttributeError:
+        return None
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the sustained request rate."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket, full.
+
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum burst size, defaults to one second's worth
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens, sleeping until they are available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+
+                delay = (tokens - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+
+class RetryPolicy:
+    """Decides which failed requests to retry and how long to wait."""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 30.0):
+        """
+        Initialize the policy.
+
+        Args:
+            max_attempts: Total attempts per request, including the first
+            base_delay: Backoff before the first retry, in seconds
+            max_delay: Upper bound on any single backoff, in seconds
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Check whether a request that failed with error may succeed if retried."""
+        if isinstance(error, HttpError):
+            reason = error_reason(error)
+            if reason in PERMANENT_REASONS:
+                return False
+            if reason in RETRYABLE_REASONS:
+                return True
+            return error.resp.status in RETRYABLE_STATUSES
+
+        # Dropped connections, resets and socket timeouts
+        return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """
+        Get the wait before retry number attempt (0-based).
+
+        A Retry-After header wins; otherwise exponential backoff with full jitter.
+        """
+        if isinstance(error, HttpError):
+            requested = retry_after(error)
+            if requested is not None:
+                return min(requested, self.max_delay)
+
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
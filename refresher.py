@@ -0,0 +1,279 @@
+"""Quota-aware background refresh of the subscription feed, trending and playlists."""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from youtube_api import YouTubeAPIError, OfflineResult
+
+# Uploads read per channel poll, enough to catch several made between polls
+UPLOADS_PER_POLL = 5
+
+# Polls per typical gap between a channel's uploads
+POLLS_PER_UPLOAD = 4
+
+
+def refresher_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the BackgroundRefresher arguments (other than the budget) from a loaded config."""
+    return {
+        'min_interval': config["channel_poll_min_interval"],
+        'max_interval': config["channel_poll_max_interval"],
+        'trending_interval': config["trending_refresh_interval"],
+        'playlists_interval': config["playlists_refresh_interval"],
+        'trending_region': (config["trending_regions"] or ["US"])[0],
+        'trending_category': (config["trending_categories"] or [""])[0],
+        'trending_max_results': config["trending_max_results"],
+    }
+
+
+class QuotaBudget:
+    """Quota units the background refresher may spend, refilled at a steady hourly rate."""
+
+    def __init__(self, units_per_hour: float):
+        """
+        Initialize the budget, full.
+
+        Args:
+            units_per_hour: Units refilled per hour, and the most that can be saved up
+        """
+        self.capacity = float(units_per_hour)
+        self.rate = units_per_hour / 3600.0
+        self._units = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self) -> None:
+        now = time.monotonic()
+        self._units = min(self.capacity, self._units + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        """Units that can be spent right now."""
+        with self._lock:
+            self._refill_locked()
+            return self._units
+
+    def charge(self, units: float) -> None:
+        """Spend units already used, going into debt if the budget lacks them."""
+        with self._lock:
+            self._refill_locked()
+            self._units -= units
+
+    def try_spend(self, units: float = 1) -> bool:
+        """
+        Spend units if the budget has them.
+
+        Returns:
+            True if they were spent, False if the refresh should wait
+        """
+        with self._lock:
+            self._refill_locked()
+            if self._units < units:
+                return False
+            self._units -= units
+            return True
+
+
+@dataclass
+class ChannelPoll:
+    """When to next check a channel for uploads."""
+    channel_id: str
+    interval: float
+    next_poll: float = 0.0
+    # Newest upload seen; uploads from before tracking started are not new
+    latest_ts: float = field(default_factory=time.time)
+    estimated: bool = False
+
+
+@dataclass
+class RefreshResult:
+    """What one background refresh found."""
+    new_videos: List[Dict[str, Any]] = field(default_factory=list)
+    trending: Optional[List[Dict[str, Any]]] = None
+    playlists: Optional[List[Dict[str, Any]]] = None
+    subscriptions: Optional[List[Dict[str, Any]]] = None
+
+
+class BackgroundRefresher:
+    """
+    Decides what to refresh in the background, within a quota budget.
+
+    Trending and playlists are refreshed on fixed intervals. The feed is
+    kept fresh by polling each subscribed channel's uploads (one quota unit
+    a poll) on its own interval: channels that upload often are polled
+    more, and a channel is polled half as often each time it has nothing
+    new, down to once per max_interval. Anything the budget cannot cover
+    waits for a later tick. Schedules belong to one account; after
+    switching accounts, start a new refresher sharing the same budget.
+    """
+
+    def __init__(self, budget: QuotaBudget, min_interval: float = 600.0,
+                 max_interval: float = 86400.0, trending_interval: float = 1800.0,
+                 playlists_interval: float = 1800.0, trending_region: str = "US",
+                 trending_category: str = "", trending_max_results: int = 50):
+        """
+        Initialize the refresher.
+
+        Args:
+            budget: Quota the refresher may spend
+            min_interval: Shortest time between polls of one channel, in seconds
+            max_interval: Longest time between polls of one channel, in seconds
+            trending_interval: Seconds between trending refreshes
+            playlists_interval: Seconds between refreshes of playlists and subscriptions
+            trending_region: Region whose trending chart is refreshed
+            trending_category: Category of that chart, or "" for all videos
+            trending_max_results: Videos refreshed in that chart
+        """
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.trending_interval = trending_interval
+        self.playlists_interval = playlists_interval
+        self.trending_region = trending_region
+        self.trending_category = trending_category
+        self.trending_max_results = trending_max_results
+
+        now = time.time()
+        self.channels: Dict[str, ChannelPoll] = {}
+        self._pending: List[str] = []
+        # The screens load these on startup, so the first refresh can wait
+        self._trending_due = now + self.trending_interval
+        self._playlists_due = now + self.playlists_interval
+        self._subscriptions_due = 0.0
+
+    def _clamp(self, interval: float) -> float:
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def track_channels(self, channel_ids: List[str], now: Optional[float] = None) -> None:
+        """Poll exactly these channels from now on, keeping the schedules of known ones."""
+        now = time.time() if now is None else now
+        self.channels = {
+            channel_id: self.channels.get(channel_id) or ChannelPoll(channel_id, self.min_interval, now, now)
+            for channel_id in channel_ids
+        }
+
+    def due_channels(self, now: Optional[float] = None) -> List[ChannelPoll]:
+        """Get the channels due for a poll, longest overdue first."""
+        now = time.time() if now is None else now
+        due = [poll for poll in self.channels.values() if poll.next_poll <= now]
+        due.sort(key=lambda poll: poll.next_poll)
+        return due
+
+    def record_poll(self, poll: ChannelPoll, uploads: Optional[List[Dict[str, Any]]],
+                    now: Optional[float] = None) -> List[str]:
+        """
+        Reschedule a channel after polling it.
+
+        Args:
+            poll: The channel's schedule
+            uploads: Its latest uploads, newest first, or None if unchanged
+            now: Time of the poll
+
+        Returns:
+            IDs of uploads that are new since the last poll
+        """
+        now = time.time() if now is None else now
+        new_ids = [upload['id'] for upload in uploads or [] if upload['published_ts'] > poll.latest_ts]
+
+        if uploads and not poll.estimated:
+            # Start from how often the channel has uploaded lately
+            poll.estimated = True
+            times = [upload['published_ts'] for upload in uploads if upload['published_ts']]
+            if len(times) >= 2:
+                gap = (max(times) - min(times)) / (len(times) - 1)
+                poll.interval = self._clamp(gap / POLLS_PER_UPLOAD)
+            else:
+                poll.interval = self.max_interval
+        elif new_ids:
+            poll.interval = self._clamp(poll.interval / 2)
+        else:
+            poll.interval = self._clamp(poll.interval * 2)
+
+        if uploads:
+            poll.latest_ts = max([poll.latest_ts] + [upload['published_ts'] for upload in uploads])
+        poll.next_poll = now + poll.interval
+        return new_ids
+
+    def tick(self, api, now: Optional[float] = None) -> RefreshResult:
+        """
+        Run whatever refreshes are due and affordable.
+
+        Requests go through api at the caller's priority; run this at
+        BACKGROUND priority so it never holds up what the user is doing.
+
+        Args:
+            api: YouTubeAPI (or DaemonClient) to refresh through
+            now: Current time, defaults to now
+
+        Returns:
+            What was refreshed
+        """
+        now = time.time() if now is None else now
+        result = RefreshResult()
+        connectivity = getattr(api, 'connectivity', None)
+        if connectivity is not None and connectivity.offline:
+            return result
+
+        if self._playlists_due <= now and self.budget.try_spend():
+            self._playlists_due = now + self.playlists_interval
+            try:
+                result.playlists = api.get_playlists(max_results=50)
+            except YouTubeAPIError:
+                pass
+
+        # One unit per page of 50
+        trending_pages = -(-self.trending_max_results // 50)
+        if self._trending_due <= now and self.budget.try_spend(trending_pages):
+            self._trending_due = now + self.trending_interval
+            try:
+                result.trending = api.get_trending_videos(
+                    max_results=self.trending_max_results, region_code=self.trending_region,
+                    category_id=self.trending_category or None
+                )
+            except YouTubeAPIError:
+                pass
+
+        # Every page of 50 subscriptions costs a unit; the last count says how many to expect
+        subscription_pages = max(1, -(-len(self.channels) // 50))
+        if self._subscriptions_due <= now and self.budget.try_spend(subscription_pages):
+            self._subscriptions_due = now + self.playlists_interval
+            try:
+                result.subscriptions = api.get_subscriptions(max_results=None)
+                self.track_channels([sub['channel_id'] for sub in result.subscriptions], now)
+                extra_pages = -(-len(result.subscriptions) // 50) - subscription_pages
+                if extra_pages > 0:
+                    self.budget.charge(extra_pages)
+            except YouTubeAPIError:
+                pass
+
+        for poll in self.due_channels(now):
+            if connectivity is not None and connectivity.offline:
+                break
+            if not self.budget.try_spend():
+                break
+            try:
+                uploads = api.get_channel_uploads(poll.channel_id, max_results=UPLOADS_PER_POLL)
+            except YouTubeAPIError:
+                # Deleted or hidden uploads; back off like a dormant channel
+                uploads = None
+            self._pending.extend(self.record_poll(poll, uploads, now))
+
+        # New uploads wait here until the budget covers their details
+        while self._pending and self.budget.try_spend():
+            batch, self._pending = self._pending[:50], self._pending[50:]
+            try:
+                result.new_videos.extend(api.get_videos(batch))
+            except YouTubeAPIError:
+                # Put them back for the next tick
+                self._pending = batch + self._pending
+                break
+
+        # Results served from local data are not refreshes
+        if isinstance(result.trending, OfflineResult):
+            result.trending = None
+        if isinstance(result.playlists, OfflineResult):
+            result.playlists = None
+        if isinstance(result.subscriptions, OfflineResult):
+            result.subscriptions = None
+        return result
@@ -0,0 +1,231 @@
+"""Priority scheduler for YouTube API requests."""
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional
+
+
+class Priority(IntEnum):
+    """Request priority classes, most urgent first."""
+    INTERACTIVE = 0   # The user just asked for this (search, opening a playlist)
+    VISIBLE = 1       # Loading the tab the user is looking at
+    PREFETCH = 2      # Speculative loads the user may want next
+    BACKGROUND = 3    # Syncs and refreshes nobody is waiting on
+
+
+DEFAULT_LIMITS = {
+    Priority.INTERACTIVE: 4,
+    Priority.VISIBLE: 4,
+    Priority.PREFETCH: 2,
+    Priority.BACKGROUND: 2,
+}
+
+# Classes held back while the user is interacting
+DEFERRABLE = (Priority.PREFETCH, Priority.BACKGROUND)
+
+_context = threading.local()
+
+
+def current_priority() -> Priority:
+    """Get the priority of requests made from the current thread."""
+    return getattr(_context, 'priority', Priority.VISIBLE)
+
+
+@contextmanager
+def request_priority(priority: Priority):
+    """Run the requests made inside the block at the given priority."""
+    previous = getattr(_context, 'priority', None)
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _context.priority
+        else:
+            _context.priority = previous
+
+
+class _Job:
+    """A queued call and the future its result goes to."""
+
+    __slots__ = ('fn', 'future', 'priority', 'account', 'queued_at')
+
+    def __init__(self, fn: Callable[[], Any], priority: Priority, account: Optional[str]):
+        self.fn = fn
+        self.future: Future = Future()
+        self.priority = priority
+        self.account = account
+        self.queued_at = time.monotonic()
+
+
+class RequestScheduler:
+    """
+    Runs API calls by priority class with per-class concurrency limits.
+
+    Each class has its own worker slots, so interactive requests never wait
+    for a slot held by a bulk sync. Within a class, accounts are served
+    round-robin so one account's sync cannot starve another's. Prefetch and
+    background work is not started while interactive requests are queued or
+    running, or for a short grace period after the last one finished.
+    """
+
+    def __init__(self, limits: Optional[Dict[Priority, int]] = None,
+                 interactive_grace: float = 1.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            limits: Maximum concurrent requests per priority class
+            interactive_grace: Seconds after interactive activity before deferred work resumes
+        """
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.interactive_grace = interactive_grace
+
+        self._lock = threading.Lock()
+        self._queues: Dict[Priority, "OrderedDict[Optional[str], deque]"] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._running = {priority: 0 for priority in Priority}
+        self._last_interactive = 0.0
+        self._resume_timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(self.limits.values()),
+            thread_name_prefix="yt-request"
+        )
+
+        self.stats = {
+            'submitted': {priority.name: 0 for priority in Priority},
+            'completed': {priority.name: 0 for priority in Priority},
+            'max_wait': {priority.name: 0.0 for priority in Priority},
+        }
+
+    def submit(self, fn: Callable[[], Any], priority: Optional[Priority] = None,
+               account: Optional[str] = None) -> Future:
+        """
+        Queue a call.
+
+        Args:
+            fn: Callable taking no arguments
+            priority: Priority class, defaults to the current thread's priority
+            account: Account the call is made for, used for fair queuing
+
+        Returns:
+            Future for the call's result
+        """
+        if priority is None:
+            priority = current_priority()
+
+        job = _Job(fn, priority, account)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down")
+            self._queues[priority].setdefault(account, deque()).append(job)
+            self.stats['submitted'][priority.name] += 1
+            if priority == Priority.INTERACTIVE:
+                self._last_interactive = time.monotonic()
+            self._dispatch_locked()
+        return job.future
+
+    def run(self, fn: Callable[[], Any], priority: Optional[Priority] = None,
+            account: Optional[str] = None) -> Any:
+        """Queue a call and wait for its result (re-raising its exception)."""
+        return self.submit(fn, priority, account).result()
+
+    def _interactive_active(self) -> bool:
+        """Check whether deferred work should wait for the user."""
+        if self._running[Priority.INTERACTIVE] or self._queues[Priority.INTERACTIVE]:
+            return True
+        return time.monotonic() - self._last_interactive < self.interactive_grace
+
+    def _next_job_locked(self, priority: Priority) -> Optional[_Job]:
+        """Pop the next job of a class, rotating across accounts."""
+        queues = self._queues[priority]
+        if not queues:
+            return None
+
+        account, jobs = next(iter(queues.items()))
+        job = jobs.popleft()
+        del queues[account]
+        if jobs:
+            # Move this account to the back of the line
+            queues[account] = jobs
+        return job
+
+    def _dispatch_locked(self) -> None:
+        """Start every job that a free slot allows. Caller holds the lock."""
+        deferred = False
+        for priority in Priority:
+            if priority in DEFERRABLE and self._interactive_active():
+                deferred = deferred or bool(self._queues[priority])
+                continue
+
+            while self._running[priority] < self.limits[priority]:
+                job = self._next_job_locked(priority)
+                if job is None:
+                    break
+                self._running[priority] += 1
+                wait = time.monotonic() - job.queued_at
+                if wait > self.stats['max_wait'][priority.name]:
+                    self.stats['max_wait'][priority.name] = wait
+                self._executor.submit(self._run_job, job)
+
+        if deferred:
+            self._schedule_resume_locked()
+
+    def _schedule_resume_locked(self) -> None:
+        """Re-check deferred work once the interactive grace period ends."""
+        if self._resume_timer is not None or self._closed:
+            return
+
+        delay = max(0.05, self._last_interactive + self.interactive_grace - time.monotonic())
+        self._resume_timer = threading.Timer(delay, self._resume)
+        self._resume_timer.daemon = True
+        self._resume_timer.start()
+
+    def _resume(self) -> None:
+        """Timer callback for deferred work."""
+        with self._lock:
+            self._resume_timer = None
+            self._dispatch_locked()
+
+    def _run_job(self, job: _Job) -> None:
+        """Run a job on a worker thread and start whatever can follow it."""
+        if job.future.set_running_or_notify_cancel():
+            try:
+                result = job.fn()
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+
+        with self._lock:
+            self._running[job.priority] -= 1
+            self.stats['completed'][job.priority.name] += 1
+            if job.priority == Priority.INTERACTIVE:
+                self._last_interactive = time.monotonic()
+            self._dispatch_locked()
+
+    def pending(self) -> Dict[str, int]:
+        """Get the number of queued jobs per class."""
+        with self._lock:
+            return {
+                priority.name: sum(len(jobs) for jobs in self._queues[priority].values())
+                for priority in Priority
+            }
+
+    def shutdown(self) -> None:
+        """Cancel queued jobs and stop the worker threads."""
+        with self._lock:
+            self._closed = True
+            if self._resume_timer is not None:
+                self._resume_timer.cancel()
+            for queues in self._queues.values():
+                for jobs in queues.values():
+                    for job in jobs:
+                        job.future.cancel()
+                queues.clear()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,187 @@
+"""Local full-text index of every video the app has seen."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+from config import SEARCH_INDEX_FILE, ensure_config_dir
+from video_index import tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    description TEXT NOT NULL,
+    data TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_seen_at ON videos(seen_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS video_fts USING fts5(
+    title, channel, description,
+    content='videos', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS videos_ai AFTER INSERT ON videos BEGIN
+    INSERT INTO video_fts(rowid, title, channel, description)
+    VALUES (new.rowid, new.title, new.channel, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_ad AFTER DELETE ON videos BEGIN
+    INSERT INTO video_fts(video_fts, rowid, title, channel, description)
+    VALUES ('delete', old.rowid, old.title, old.channel, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_au AFTER UPDATE ON videos BEGIN
+    INSERT INTO video_fts(video_fts, rowid, title, channel, description)
+    VALUES ('delete', old.rowid, old.title, old.channel, old.description);
+    INSERT INTO video_fts(rowid, title, channel, description)
+    VALUES (new.rowid, new.title, new.channel, new.description);
+END;
+"""
+
+# BM25 column weights: title, channel, description
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Run eviction after this many upserts rather than on every write
+EVICT_EVERY = 500
+
+
+class SearchIndexError(Exception):
+    """Custom exception for local search index errors."""
+    pass
+
+
+class LocalSearchIndex:
+    """SQLite FTS5 index over videos returned by YouTubeAPI."""
+
+    def __init__(self, path: Optional[Path] = None, max_videos: int = 20000,
+                 max_age_days: int = 180):
+        """
+        Open (or create) the index.
+
+        Args:
+            path: Database file, defaults to SEARCH_INDEX_FILE
+            max_videos: Maximum number of videos kept; oldest-seen are evicted
+            max_age_days: Videos not seen for this long are evicted
+
+        Raises:
+            SearchIndexError: If the database cannot be opened or SQLite lacks FTS5.
+        """
+        if path is None:
+            ensure_config_dir()
+            path = SEARCH_INDEX_FILE
+
+        self.path = Path(path)
+        self.max_videos = max_videos
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        try:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            raise SearchIndexError(f"Failed to open local search index: {e}")
+
+        self.evict()
+
+    def upsert(self, videos: List[Dict[str, Any]]) -> None:
+        """Insert or refresh videos in the index."""
+        if not videos:
+            return
+
+        now = time.time()
+        rows = [
+            (video['id'], video['title'], video.get('channel', ''),
+             video.get('description', ''), json.dumps(video), now)
+            for video in videos
+        ]
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT INTO videos (id, title, channel, description, data, seen_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        title = excluded.title,
+                        channel = excluded.channel,
+                        description = excluded.description,
+                        data = excluded.data,
+                        seen_at = excluded.seen_at
+                    """,
+                    rows
+                )
+            self._writes_since_evict += len(rows)
+            should_evict = self._writes_since_evict >= EVICT_EVERY
+
+        if should_evict:
+            self.evict()
+
+    def search(self, query: str, max_results: int = 25) -> List[Dict[str, Any]]:
+        """
+        Search the index, best BM25 match first.
+
+        Every word of the query must match; the last word also matches as a
+        prefix so partial input still finds results.
+
+        Args:
+            query: Free-text query
+            max_results: Maximum number of results to return
+
+        Returns:
+            List of video dictionaries
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        match = ' '.join(f'"{term}"' for term in terms[:-1])
+        match = f'{match} "{terms[-1]}"*'.strip()
+
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT v.data FROM video_fts
+                JOIN videos v ON v.rowid = video_fts.rowid
+                WHERE video_fts MATCH ?
+                ORDER BY bm25(video_fts, ?, ?, ?)
+                LIMIT ?
+                """,
+                (match, *BM25_WEIGHTS, max_results)
+            ).fetchall()
+
+        return [json.loads(data) for (data,) in rows]
+
+    def evict(self) -> None:
+        """Drop videos past the age limit, then the oldest-seen over the size limit."""
+        cutoff = time.time() - self.max_age
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM videos WHERE seen_at < ?", (cutoff,))
+                self._conn.execute(
+                    """
+                    DELETE FROM videos WHERE rowid IN (
+                        SELECT rowid FROM videos ORDER BY seen_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_videos,)
+                )
+            self._writes_since_evict = 0
+
+    def count(self) -> int:
+        """Get the number of indexed videos."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,277 @@
+"""Compact on-disk set of the video IDs an account has been shown, for "new" badges."""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+from config import SEEN_DIR
+
+# Bloom filter file header: magic, hash count, bit count, IDs added
+HEADER = struct.Struct('<4sIQQ')
+MAGIC = b'SEEN'
+
+# Chance that an unseen ID gets past the Bloom filter to the exact check
+FALSE_POSITIVE_RATE = 0.01
+
+# Fingerprints buffered in memory before being merged into the sorted file
+MERGE_THRESHOLD = 2048
+
+MASK64 = (1 << 64) - 1
+
+
+def fingerprint(video_id: str) -> int:
+    """Hash a video ID to the 64-bit fingerprint it is stored as."""
+    return int.from_bytes(hashlib.blake2b(video_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _second_hash(h: int) -> int:
+    """Derive an independent odd hash from a fingerprint (splitmix64), for double hashing."""
+    z = (h + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return (z ^ (z >> 31)) | 1
+
+
+class BloomFilter:
+    """
+    Bloom filter whose bits live in a memory-mapped file.
+
+    Bits are set and tested in place in the mapping, so the filter is never
+    read into Python objects and costs its file size in page cache only.
+    """
+
+    def __init__(self, path: Path, capacity: int):
+        """
+        Open the filter at path, creating it sized for capacity IDs if needed.
+
+        Args:
+            path: Filter file
+            capacity: IDs a new filter is sized for at FALSE_POSITIVE_RATE
+        """
+        self.path = path
+        if not path.exists():
+            self._create(path, capacity)
+
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.hashes, self.bits, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a seen-set filter")
+        self.capacity = int(-self.bits * math.log(2) ** 2 / math.log(FALSE_POSITIVE_RATE))
+
+    @staticmethod
+    def _create(path: Path, capacity: int) -> None:
+        """Write an empty filter file, atomically."""
+        bits = max(64, int(-capacity * math.log(FALSE_POSITIVE_RATE) / math.log(2) ** 2))
+        bits = (bits + 7) // 8 * 8
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, hashes, bits, 0))
+                f.truncate(HEADER.size + bits // 8)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _positions(self, h: int):
+        # Double hashing: k positions from two hashes
+        h2 = _second_hash(h)
+        for i in range(self.hashes):
+            yield (h + i * h2) % self.bits
+
+    def add(self, h: int) -> None:
+        """Set the bits of a fingerprint."""
+        data = self._map
+        for position in self._positions(h):
+            offset = HEADER.size + (position >> 3)
+            data[offset] |= 1 << (position & 7)
+        self.count += 1
+        HEADER.pack_into(data, 0, MAGIC, self.hashes, self.bits, self.count)
+
+    def might_contain(self, h: int) -> bool:
+        """Whether a fingerprint may have been added; False is always right."""
+        data = self._map
+        for position in self._positions(h):
+            if not data[HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def close(self) -> None:
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+
+class SeenSet:
+    """
+    Video IDs an account has been shown, checked in constant memory.
+
+    A Bloom filter answers most lookups: an ID it has never seen is
+    definitely new. IDs it reports as maybe seen are confirmed exactly
+    against a sorted file of 64-bit fingerprints, binary searched through
+    a memory mapping, plus a small buffer of recent additions. A hundred
+    thousand IDs take about a megabyte on disk. The filter is rebuilt,
+    twice the size, once it holds more IDs than it was sized for.
+
+    Merging the buffer into the file and rebuilding the filter happen on
+    a worker thread, so add() never waits for them.
+    """
+
+    def __init__(self, name: str, directory: Optional[Path] = None, capacity: int = 100000):
+        """
+        Open (or create) a seen-set.
+
+        Args:
+            name: Name of the set, such as an account ID
+            directory: Where the set's files live, defaults to SEEN_DIR
+            capacity: IDs the Bloom filter is first sized for
+        """
+        self.directory = Path(directory) if directory is not None else SEEN_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._bloom_path = self.directory / f"{name}.bloom"
+        self._rebuild_path = self.directory / f"{name}.bloom.new"
+        self._ids_path = self.directory / f"{name}.ids"
+        self._lock = threading.Lock()
+        self._recent: Set[int] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="seen-set")
+        self._maintenance: Optional[Future] = None
+
+        try:
+            self._bloom = BloomFilter(self._bloom_path, capacity)
+        except ValueError:
+            self._bloom_path.unlink()
+            self._bloom = BloomFilter(self._bloom_path, capacity)
+        self._open_ids()
+
+    def _open_ids(self) -> None:
+        """Map the sorted fingerprint file, if it has any entries."""
+        self._ids_file = None
+        self._ids_map = None
+        self._ids = memoryview(b'').cast('Q')
+        try:
+            if self._ids_path.stat().st_size < 8:
+                return
+        except OSError:
+            return
+        self._ids_file = open(self._ids_path, 'rb')
+        self._ids_map = mmap.mmap(self._ids_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._ids = memoryview(self._ids_map).cast('Q')
+
+    def _close_ids(self) -> None:
+        self._ids.release()
+        if self._ids_map is not None:
+            self._ids_map.close()
+            self._ids_file.close()
+
+    def __len__(self) -> int:
+        """Number of IDs added."""
+        return self._bloom.count
+
+    def __contains__(self, video_id: str) -> bool:
+        """Whether a video ID was added; exact, never a false positive."""
+        h = fingerprint(video_id)
+        with self._lock:
+            return self._contains(h)
+
+    def _contains(self, h: int) -> bool:
+        """Whether a fingerprint was added; the caller holds the lock."""
+        if not self._bloom.might_contain(h):
+            return False
+        if h in self._recent:
+            return True
+        index = bisect_left(self._ids, h)
+        return index < len(self._ids) and self._ids[index] == h
+
+    def add(self, video_ids: Iterable[str]) -> None:
+        """Add video IDs; those already in the set are skipped."""
+        with self._lock:
+            for video_id in video_ids:
+                h = fingerprint(video_id)
+                if self._contains(h):
+                    continue
+                self._bloom.add(h)
+                self._recent.add(h)
+
+            due = len(self._recent) >= MERGE_THRESHOLD or self._bloom.count > self._bloom.capacity
+            if due and (self._maintenance is None or self._maintenance.done()):
+                self._maintenance = self._executor.submit(self._maintain)
+
+    def _maintain(self) -> None:
+        """Merge the buffer, then rebuild the filter if it is over capacity; runs on the worker."""
+        self._merge()
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild()
+
+    def _merge(self) -> None:
+        """
+        Merge buffered fingerprints into the sorted file, atomically.
+
+        The file is written without the lock held; lookups keep using the
+        old file and the buffer until the new file is swapped in. Only the
+        worker thread (or close, once it has stopped) calls this.
+        """
+        with self._lock:
+            merging = set(self._recent)
+            ids = self._ids
+        if not merging:
+            return
+
+        merged = array('Q', sorted(set(ids) | merging))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                merged.tofile(f)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self._close_ids()
+            try:
+                os.replace(tmp_path, self._ids_path)
+            finally:
+                self._open_ids()
+            self._recent -= merging
+
+    def _rebuild(self) -> None:
+        """
+        Replace the Bloom filter with one twice the size needed, from the exact fingerprints.
+
+        The new filter is filled without the lock held, then topped up with
+        fingerprints added meanwhile and swapped in. Runs on the worker.
+        """
+        with self._lock:
+            capacity = max(self._bloom.capacity, len(self._ids) + len(self._recent)) * 2
+            ids = self._ids
+
+        self._rebuild_path.unlink(missing_ok=True)
+        bloom = BloomFilter(self._rebuild_path, capacity)
+        for h in ids:
+            bloom.add(h)
+
+        with self._lock:
+            for h in self._recent:
+                bloom.add(h)
+            self._bloom.close()
+            os.replace(self._rebuild_path, self._bloom_path)
+            bloom.path = self._bloom_path
+            self._bloom = bloom
+
+    def close(self) -> None:
+        """Finish any merge or rebuild, write buffered additions to disk and unmap the files."""
+        self._executor.shutdown(wait=True)
+        self._merge()
+        with self._lock:
+            self._close_ids()
+            self._bloom.close()
@@ -0,0 +1,83 @@
+"""Single-flight deduplication of identical concurrent calls."""
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+class _Call:
+    """An in-flight call that other callers can wait on."""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for and share its result (or exception). Nothing is cached
+    once the call completes.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for the identical call already running.
+
+        Returns:
+            Tuple of (result, shared) where shared is True if another caller ran fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+
+def request_key(request) -> Tuple[str, str, Any]:
+    """
+    Build a dedup key for a googleapiclient HttpRequest.
+
+    Query parameters are sorted so the same call built with keyword
+    arguments in a different order gets the same key.
+    """
+    parts = urlsplit(request.uri)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    uri = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+    return (request.method, uri, request.body)
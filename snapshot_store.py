@@ -0,0 +1,75 @@
+"""Persisted snapshots of each screen's last successful load."""
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from config import SNAPSHOT_DIR
+
+
+class SnapshotStore:
+    """
+    One JSON file per screen (and account) holding its last loaded rows.
+
+    Screens render a snapshot as soon as they mount, then revalidate
+    against the API. Snapshots are best effort: one that cannot be read or
+    written just means the screen starts from a loading row.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Where snapshot files live, defaults to SNAPSHOT_DIR
+        """
+        self.directory = Path(directory) if directory is not None else SNAPSHOT_DIR
+
+    def _path(self, key: str) -> Path:
+        """Get the file holding a key's snapshot."""
+        return self.directory / (re.sub(r'[^A-Za-z0-9_.-]', '_', key) + '.json')
+
+    def load(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Read a snapshot.
+
+        Returns:
+            Tuple of (data, saved_at) with saved_at as a Unix timestamp, or None
+        """
+        try:
+            with open(self._path(key), 'r') as f:
+                snapshot = json.load(f)
+            return snapshot['data'], snapshot['saved_at']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, key: str, data: Any) -> None:
+        """Replace a snapshot, atomically so a crash never leaves half a file."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({'saved_at': time.time(), 'data': data}, f)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            pass
+
+
+def describe_age(saved_at: float, now: Optional[float] = None) -> str:
+    """Describe how long ago a timestamp was, e.g. '5 min ago'."""
+    seconds = max(0, (time.time() if now is None else now) - saved_at)
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h ago"
+    days = int(seconds // 86400)
+    return f"{days} day{'s' if days != 1 else ''} ago"
@@ -0,0 +1,127 @@
+"""Tests for MpvPlayer against a stub IPC server standing in for mpv."""
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from player import MpvPlayer, PlayerError
+
+
+class StubMpv:
+    """
+    Listens on a Unix socket and answers mpv IPC commands with success.
+
+    Every command received is recorded. With reply=False, commands are
+    recorded but never answered, as by an mpv that has hung.
+    """
+
+    def __init__(self, socket_path: Path, reply: bool = True):
+        self.socket_path = socket_path
+        self.reply = reply
+        self.commands = []
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(str(socket_path))
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn, conn.makefile('rb') as reader:
+            for line in reader:
+                message = json.loads(line)
+                self.commands.append(message['command'])
+                if self.reply:
+                    # Events are interleaved with replies, as real mpv does
+                    conn.sendall(b'{"event": "idle"}\n')
+                    reply = {'request_id': message['request_id'], 'error': 'success', 'data': None}
+                    conn.sendall(json.dumps(reply).encode('utf-8') + b'\n')
+
+    def close(self) -> None:
+        self._server.close()
+
+
+class MpvPlayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = Path(self.directory.name) / "mpv.sock"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def start_stub(self, reply: bool = True) -> StubMpv:
+        stub = StubMpv(self.socket_path, reply=reply)
+        self.addCleanup(stub.close)
+        return stub
+
+    def test_play_replaces_current_video(self):
+        stub = self.start_stub()
+        player = MpvPlayer(self.socket_path, spawn=False)
+        self.addCleanup(player.close)
+
+        player.play("https://youtu.be/a")
+
+        self.assertEqual(stub.commands, [["loadfile", "https://youtu.be/a", "replace"]])
+
+    def test_enqueue_pipelines_commands_in_order(self):
+        stub = self.start_stub()
+        player = MpvPlayer(self.socket_path, spawn=False)
+        self.addCleanup(player.close)
+
+        player.enqueue(["https://youtu.be/a", "https://youtu.be/b"], play=True)
+        player.enqueue(["https://youtu.be/c"])
+
+        self.assertEqual(stub.commands, [
+            ["loadfile", "https://youtu.be/a", "replace"],
+            ["loadfile", "https://youtu.be/b", "append-play"],
+            ["loadfile", "https://youtu.be/c", "append-play"],
+        ])
+
+    def test_no_server_without_spawn_raises(self):
+        player = MpvPlayer(self.socket_path, spawn=False)
+
+        with self.assertRaises(PlayerError):
+            player.play("https://youtu.be/a")
+
+    def test_unanswered_commands_are_not_resent(self):
+        stub = self.start_stub(reply=False)
+        player = MpvPlayer(self.socket_path, spawn=False, timeout=0.2)
+        self.addCleanup(player.close)
+
+        with self.assertRaises(PlayerError):
+            player.enqueue(["https://youtu.be/a"])
+
+        self.assertEqual(stub.commands, [["loadfile", "https://youtu.be/a", "append-play"]])
+
+    def test_reconnects_after_player_restart(self):
+        stub = self.start_stub()
+        player = MpvPlayer(self.socket_path, spawn=False)
+        self.addCleanup(player.close)
+        player.play("https://youtu.be/a")
+
+        # The user quits mpv and a new one takes its socket
+        stub.close()
+        os.unlink(self.socket_path)
+        player._sock.shutdown(socket.SHUT_RDWR)
+        restarted = self.start_stub()
+        player.play("https://youtu.be/b")
+
+        self.assertEqual(restarted.commands, [["loadfile", "https://youtu.be/b", "replace"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""Tests for playlist stats staying in step with playlist ETags across syncs."""
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+from connectivity import Connectivity
+from library import Library
+from youtube_api import YouTubeAPI, YouTubeAPIError
+
+SNIPPET = {
+    'title': 'Title',
+    'channelTitle': 'Channel',
+    'channelId': 'UC1',
+    'publishedAt': '2024-01-01T00:00:00Z',
+    'thumbnails': {'default': {'url': 'https://i.ytimg.com/x.jpg'}},
+}
+
+
+class FakeRequest:
+    """Stands in for a googleapiclient HttpRequest, answering 304 to a matching If-None-Match."""
+
+    def __init__(self, service, resource, response):
+        self.service = service
+        self.resource = resource
+        self.response = response
+        self.headers = {}
+        self.method = 'GET'
+        self.uri = f"https://www.googleapis.com/youtube/v3/{resource}"
+        self.body = None
+        self.methodId = f"youtube.{resource}.list"
+
+    def execute(self, **kwargs):
+        self.service.requests.append(self.resource)
+        if isinstance(self.response, Exception):
+            raise self.response
+        etag = self.response.get('etag')
+        if etag and self.headers.get('If-None-Match') == etag:
+            raise HttpError(Response({'status': '304'}), b'')
+        return self.response
+
+
+class FakeResource:
+
+    def __init__(self, service, name):
+        self.service = service
+        self.name = name
+
+    def list(self, **kwargs):
+        return FakeRequest(self.service, self.name, self.service.responses[self.name])
+
+
+class FakeService:
+    """YouTube service whose responses are fixed, recording the resource of every request."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = {
+            'playlists': {
+                'etag': 'listing-1',
+                'items': [{
+                    'id': 'PL1',
+                    'etag': 'playlist-1',
+                    'snippet': dict(SNIPPET),
+                    'contentDetails': {'itemCount': 2},
+                }],
+            },
+            'playlistItems': {
+                'items': [{'contentDetails': {'videoId': 'v1'}}, {'contentDetails': {'videoId': 'v2'}}],
+            },
+            'videos': {
+                'items': [
+                    {'id': video_id, 'snippet': dict(SNIPPET),
+                     'contentDetails': {'duration': 'PT1M'}, 'statistics': {'viewCount': '10'}}
+                    for video_id in ('v1', 'v2')
+                ],
+            },
+        }
+
+    def playlists(self):
+        return FakeResource(self, 'playlists')
+
+    def playlistItems(self):
+        return FakeResource(self, 'playlistItems')
+
+    def videos(self):
+        return FakeResource(self, 'videos')
+
+
+class PlaylistStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.library = Library(Path(self.directory.name) / "library.db")
+        self.service = FakeService()
+        self.api = YouTubeAPI(self.service, account_id='account', library=self.library)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_unchanged_playlist_stats_cost_nothing_after_not_modified(self):
+        playlist, = self.api.get_playlists()
+        self.api.get_playlist_stats(playlist['id'], playlist['etag'])
+
+        self.service.requests.clear()
+        playlist, = self.api.get_playlists()
+        stats = self.api.get_playlist_stats(playlist['id'], playlist['etag'])
+
+        # The listing was revalidated (and came back 304); the playlist was not read again
+        self.assertEqual(self.service.requests, ['playlists'])
+        self.assertEqual(playlist['etag'], 'playlist-1')
+        self.assertEqual(stats['etag'], 'playlist-1')
+        self.assertEqual(stats['items'], 2)
+
+    def test_changed_playlist_stats_are_recomputed(self):
+        playlist, = self.api.get_playlists()
+        self.api.get_playlist_stats(playlist['id'], playlist['etag'])
+
+        self.service.requests.clear()
+        self.service.responses['playlists']['etag'] = 'listing-2'
+        self.service.responses['playlists']['items'][0]['etag'] = 'playlist-2'
+        playlist, = self.api.get_playlists()
+        stats = self.api.get_playlist_stats(playlist['id'], playlist['etag'])
+
+        self.assertIn('playlistItems', self.service.requests)
+        self.assertEqual(stats['etag'], 'playlist-2')
+
+    def test_offline_serves_stored_stats_without_requests(self):
+        playlist, = self.api.get_playlists()
+        stored = self.api.get_playlist_stats(playlist['id'], playlist['etag'])
+
+        self.service.requests.clear()
+        offline = YouTubeAPI(self.service, account_id='account', library=self.library,
+                             connectivity=Connectivity(forced=True))
+        stats = offline.get_playlist_stats(playlist['id'], 'playlist-2')
+
+        self.assertEqual(self.service.requests, [])
+        self.assertEqual(stats, stored)
+
+    def test_connection_errors_become_api_errors(self):
+        self.service.responses['playlistItems'] = ConnectionResetError("connection reset")
+
+        with self.assertRaises(YouTubeAPIError):
+            self.api.get_playlist_stats('PL1', 'playlist-1')
+
+
+if __name__ == '__main__':
+    unittest.main()
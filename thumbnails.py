@@ -0,0 +1,296 @@
+"""Thumbnail downloads, a size-bounded disk cache, and rendering to terminal cells."""
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from config import THUMBNAIL_DIR
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+# A cell is (top, bottom) RGB, drawn as an upper half block: top as
+# foreground, bottom as background, so each cell shows two pixels
+Cell = Tuple[Tuple[int, int, int], Tuple[int, int, int]]
+Cells = List[List[Cell]]
+
+# Rendered thumbnails kept in memory, across every size they were drawn at
+RENDERED_CACHE_SIZE = 256
+
+
+class ThumbnailError(Exception):
+    """Custom exception for thumbnail download and rendering errors."""
+    pass
+
+
+def render_cells(data: bytes, columns: int, rows: int) -> Cells:
+    """
+    Decode an image and downsample it to half-block cells.
+
+    The image is fitted inside columns x rows cells, keeping its aspect
+    ratio. Runs in a worker process, so it only takes and returns plain data.
+    """
+    if Image is None:
+        raise ThumbnailError("Thumbnail previews require Pillow (pip install Pillow).")
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        # Terminal cells are about twice as tall as wide; a half block is square
+        scale = min(columns / image.width, (rows * 2) / image.height)
+        width = max(1, int(image.width * scale))
+        height = max(2, int(image.height * scale) // 2 * 2)
+        pixels = image.resize((width, height), Image.LANCZOS).load()
+
+    return [
+        [(pixels[x, y], pixels[x, y + 1]) for x in range(width)]
+        for y in range(0, height, 2)
+    ]
+
+
+class ThumbnailCache:
+    """
+    Downloaded thumbnails on disk, evicting the least recently used past a byte cap.
+
+    Files are named after a hash of their URL; reading one marks it used,
+    so eviction order survives restarts.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = 50 * 1024 * 1024):
+        """
+        Initialize the cache, indexing files already on disk.
+
+        Args:
+            directory: Where thumbnails are stored, defaults to THUMBNAIL_DIR
+            max_bytes: Total size the cache is trimmed back to
+        """
+        self.directory = Path(directory) if directory is not None else THUMBNAIL_DIR
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # File name -> size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = sorted(
+                (entry for entry in os.scandir(self.directory) if entry.name.endswith('.img')),
+                key=lambda entry: entry.stat().st_mtime
+            )
+        except OSError:
+            files = []
+        for entry in files:
+            size = entry.stat().st_size
+            self._entries[entry.name] = size
+            self._total += size
+
+    def _name(self, url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest() + '.img'
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Read a cached thumbnail, or None if it is not cached."""
+        name = self._name(url)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+
+        path = self.directory / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                self._total -= self._entries.pop(name, 0)
+            return None
+
+    def put(self, url: str, data: bytes) -> None:
+        """Store a thumbnail, atomically, then trim the cache to max_bytes."""
+        name = self._name(url)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.directory / name)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            return
+
+        with self._lock:
+            self._total += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            evicted = []
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old, size = self._entries.popitem(last=False)
+                self._total -= size
+                evicted.append(old)
+
+        for old in evicted:
+            try:
+                (self.directory / old).unlink()
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        """Size of every cached thumbnail together."""
+        with self._lock:
+            return self._total
+
+
+class ThumbnailRenderer:
+    """
+    Fetches and renders thumbnails without ever blocking the caller.
+
+    Downloads run on a small thread pool sharing one keep-alive session,
+    and a URL already being fetched is not fetched again. Decoding and
+    downsampling run in a process pool. Rendered cells are memoized by URL
+    and size, so showing a thumbnail again at the same terminal size is free.
+    """
+
+    def __init__(self, cache: Optional[ThumbnailCache] = None, download_workers: int = 4,
+                 render_workers: int = 2, timeout: float = 10.0):
+        """
+        Initialize the renderer; the process pool starts with the first render.
+
+        Args:
+            cache: Disk cache for downloads, defaults to a ThumbnailCache
+            download_workers: Most thumbnails downloaded at once
+            render_workers: Processes decoding images
+            timeout: Per-download timeout in seconds
+        """
+        self.cache = cache if cache is not None else ThumbnailCache()
+        self.timeout = timeout
+        self.render_workers = render_workers
+
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=download_workers)
+        self._session.mount('https://', adapter)
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="thumbnail")
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+        self._lock = threading.Lock()
+        self._fetching: Dict[str, Future] = {}
+        self._rendered: "OrderedDict[Tuple[str, int, int], Cells]" = OrderedDict()
+
+    @property
+    def available(self) -> bool:
+        """Whether images can be rendered (Pillow is installed)."""
+        return Image is not None
+
+    def cached(self, url: str, columns: int, rows: int) -> Optional[Cells]:
+        """Get cells already rendered for a thumbnail at this size."""
+        key = (url, columns, rows)
+        with self._lock:
+            cells = self._rendered.get(key)
+            if cells is not None:
+                self._rendered.move_to_end(key)
+            return cells
+
+    def request(self, url: str, columns: int, rows: int,
+                callback: Callable[[str, Optional[Cells]], None]) -> Optional[Cells]:
+        """
+        Get a thumbnail rendered at a size, now if memoized, else later.
+
+        Args:
+            url: Thumbnail URL
+            columns: Width to fit it in, in cells
+            rows: Height to fit it in, in cells
+            callback: Called with (url, cells) from a worker thread once
+                rendered, or with (url, None) if it could not be
+
+        Returns:
+            The cells if already rendered; otherwise None, and callback is called
+        """
+        cells = self.cached(url, columns, rows)
+        if cells is not None:
+            return cells
+
+        def rendered(future: Future) -> None:
+            try:
+                cells = future.result()
+            except Exception:
+                callback(url, None)
+                return
+            with self._lock:
+                self._rendered[(url, columns, rows)] = cells
+                while len(self._rendered) > RENDERED_CACHE_SIZE:
+                    self._rendered.popitem(last=False)
+            callback(url, cells)
+
+        self._download(url).add_done_callback(
+            lambda download: self._render(download, columns, rows).add_done_callback(rendered)
+        )
+        return None
+
+    def _download(self, url: str) -> Future:
+        """Get the bytes of a thumbnail, from disk or the network, sharing fetches in flight."""
+        with self._lock:
+            future = self._fetching.get(url)
+            if future is not None:
+                return future
+            future = self._downloads.submit(self._fetch, url)
+            self._fetching[url] = future
+        future.add_done_callback(lambda _: self._forget(url))
+        return future
+
+    def _forget(self, url: str) -> None:
+        with self._lock:
+            self._fetching.pop(url, None)
+
+    def _fetch(self, url: str) -> bytes:
+        data = self.cache.get(url)
+        if data is not None:
+            return data
+        try:
+            response = self._session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ThumbnailError(f"Failed to download thumbnail: {e}")
+        self.cache.put(url, response.content)
+        return response.content
+
+    def _render(self, download: Future, columns: int, rows: int) -> Future:
+        """Decode downloaded bytes in the process pool."""
+        if download.exception() is not None:
+            failed = Future()
+            failed.set_exception(download.exception())
+            return failed
+
+        with self._lock:
+            if self._processes is None:
+                # Spawn rather than fork: the app has threads running
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.render_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            processes = self._processes
+        try:
+            return processes.submit(render_cells, download.result(), columns, rows)
+        except RuntimeError as e:
+            # Closed while the download was running
+            failed = Future()
+            failed.set_exception(e)
+            return failed
+
+    def close(self) -> None:
+        """Stop the download threads and render processes."""
+        self._downloads.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            processes, self._processes = self._processes, None
+        if processes is not None:
+            processes.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
@@ -0,0 +1,108 @@
+"""Pooled, thread-safe HTTP transport for the YouTube API client."""
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import httplib2
+import requests
+from google.auth.transport.requests import AuthorizedSession
+from googleapiclient.discovery import build
+
+from config import load_config
+
+# Headers describing the wire encoding, which requests has already undone
+_WIRE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+_context = threading.local()
+
+
+@contextmanager
+def request_timeout(seconds: Optional[float]):
+    """Override the transport timeout for requests sent from this thread."""
+    previous = getattr(_context, 'timeout', None)
+    _context.timeout = seconds
+    try:
+        yield
+    finally:
+        _context.timeout = previous
+
+
+class PooledHttp:
+    """
+    httplib2.Http-compatible transport backed by a pooled requests session.
+
+    googleapiclient's default httplib2 transport must not be shared between
+    threads and opens a new TLS connection whenever its single connection
+    is busy. This adapter keeps a urllib3 pool of keep-alive connections
+    that any number of threads can use at once, and attaches (and refreshes)
+    OAuth credentials through google.auth's AuthorizedSession.
+    """
+
+    def __init__(self, credentials, pool_size: int = 16, timeout: float = 30.0):
+        """
+        Initialize the transport.
+
+        Args:
+            credentials: google.auth credentials used to authorize requests
+            pool_size: Maximum keep-alive connections kept per host
+            timeout: Default per-request timeout in seconds
+        """
+        self.credentials = credentials
+        self.timeout = timeout
+
+        self.session = AuthorizedSession(credentials)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            pool_block=False
+        )
+        self.session.mount('https://', adapter)
+
+    def request(self, uri: str, method: str = "GET", body=None, headers=None,
+                redirections: int = 5, connection_type=None) -> Tuple[httplib2.Response, bytes]:
+        """Send a request; same signature and return value as httplib2.Http.request."""
+        response = self.session.request(
+            method,
+            uri,
+            data=body,
+            headers=headers,
+            timeout=getattr(_context, 'timeout', None) or self.timeout,
+            allow_redirects=redirections > 0
+        )
+
+        info = {
+            key.lower(): value
+            for key, value in response.headers.items()
+            if key.lower() not in _WIRE_HEADERS
+        }
+        info['status'] = str(response.status_code)
+
+        resp = httplib2.Response(info)
+        resp.reason = response.reason
+        return resp, response.content
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self.session.close()
+
+
+def build_youtube_service(credentials, pool_size: Optional[int] = None,
+                          timeout: Optional[float] = None):
+    """
+    Build a YouTube Data API service on a pooled transport.
+
+    Args:
+        credentials: OAuth credentials for the account
+        pool_size: Connection pool size, defaults to the http_pool_size setting
+        timeout: Per-request timeout, defaults to the http_timeout setting
+
+    Returns:
+        YouTube API service object
+    """
+    if pool_size is None or timeout is None:
+        config = load_config()
+        pool_size = config["http_pool_size"] if pool_size is None else pool_size
+        timeout = config["http_timeout"] if timeout is None else timeout
+
+    http = PooledHttp(credentials, pool_size=pool_size, timeout=timeout)
+    return build('youtube', 'v3', http=http)
@@ -0,0 +1,116 @@
+"""Trending charts for several regions and categories, fetched together and cached."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+from cancellation import cancel_scope, current_token
+from scheduler import current_priority, request_priority
+from youtube_api import OfflineResult, YouTubeAPIError
+
+# Names of YouTube's assignable video categories; '' is the overall chart
+CATEGORY_NAMES = {
+    '': "All",
+    '1': "Film & Animation",
+    '2': "Autos & Vehicles",
+    '10': "Music",
+    '15': "Pets & Animals",
+    '17': "Sports",
+    '19': "Travel & Events",
+    '20': "Gaming",
+    '22': "People & Blogs",
+    '23': "Comedy",
+    '24': "Entertainment",
+    '25': "News & Politics",
+    '26': "Howto & Style",
+    '27': "Education",
+    '28': "Science & Technology",
+}
+
+# A chart is (region code, category ID or '')
+Chart = Tuple[str, str]
+
+
+class TrendingCharts:
+    """
+    Several trending charts, fetched concurrently and cached per chart.
+
+    The overall chart of a region churns faster than its category charts,
+    so each kind is cached for its own time. Switching to a chart that is
+    cached costs nothing.
+    """
+
+    def __init__(self, max_results: int = 50, chart_ttl: float = 1800.0,
+                 category_ttl: float = 7200.0, max_workers: int = 4):
+        """
+        Initialize with nothing cached.
+
+        Args:
+            max_results: Videos per chart, up to YouTube's limit of 200
+            chart_ttl: Seconds a region's overall chart is served from cache
+            category_ttl: Seconds a category chart is served from cache
+            max_workers: Most charts fetched at once
+        """
+        self.max_results = max_results
+        self.chart_ttl = chart_ttl
+        self.category_ttl = category_ttl
+        self.max_workers = max_workers
+        self.cache = TTLCache(maxsize=256, ttl=chart_ttl)
+
+    def _key(self, api, chart: Chart) -> tuple:
+        return (api.account_id, chart)
+
+    def cached(self, api, chart: Chart) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """
+        Get a chart if it is cached and fresh.
+
+        Returns:
+            The chart's videos and when they were fetched, or None
+        """
+        return self.cache.get(self._key(api, chart))
+
+    def store(self, api, chart: Chart, videos: List[Dict[str, Any]]) -> None:
+        """Cache a chart just fetched, here or elsewhere (results served offline are not cached)."""
+        if isinstance(videos, OfflineResult):
+            return
+        ttl = self.category_ttl if chart[1] else self.chart_ttl
+        self.cache.set(self._key(api, chart), (videos, time.time()), ttl=ttl)
+
+    def invalidate(self, api, chart: Chart) -> None:
+        """Drop a chart from the cache, so the next fetch goes to YouTube."""
+        self.cache.invalidate(self._key(api, chart))
+
+    def fetch(self, api, chart: Chart) -> List[Dict[str, Any]]:
+        """Fetch one chart, from cache if fresh."""
+        cached = self.cached(api, chart)
+        if cached is not None:
+            return cached[0]
+
+        region_code, category_id = chart
+        videos = api.get_trending_videos(
+            max_results=self.max_results,
+            region_code=region_code,
+            category_id=category_id or None
+        )
+        self.store(api, chart, videos)
+        return videos
+
+    def fetch_all(self, api, charts: List[Chart]) -> Dict[Chart, Any]:
+        """
+        Fetch several charts concurrently, skipping those that are cached.
+
+        Returns:
+            Each chart's videos, or the YouTubeAPIError that fetching it raised
+        """
+        # Workers inherit the caller's cancel token and priority
+        token, priority = current_token(), current_priority()
+
+        def fetch_in_scope(chart: Chart):
+            with cancel_scope(token), request_priority(priority):
+                try:
+                    return self.fetch(api, chart)
+                except YouTubeAPIError as e:
+                    return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="trending") as pool:
+            return dict(zip(charts, pool.map(fetch_in_scope, charts)))
@@ -1,20 +1,42 @@
 """Main Textual application."""
-import webbrowser
+import time
+from typing import Dict, Optional
+
+from textual import work
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Container, Horizontal, Vertical
 from textual.widgets import Header, Footer, TabbedContent, TabPane, Static, DataTable, Input, Button
 from textual.screen import Screen
+from textual.worker import get_current_worker
 
 from youtube_api import YouTubeAPI, YouTubeAPIError
 from account_manager import AccountManager
 from auth import get_authenticated_service
+from scheduler import Priority, request_priority
+from config import load_config
+from refresher import BackgroundRefresher, QuotaBudget, refresher_options
+from thumbnails import ThumbnailCache, ThumbnailRenderer
+from watch_log import WatchLog
+from seen_set import SeenSet
+from player import MpvPlayer, PlayerLauncher
 from ui.search import SearchScreen
 from ui.subscriptions import SubscriptionsScreen
 from ui.history import HistoryScreen
 from ui.playlists import PlaylistsScreen, PlaylistVideosScreen
 from ui.trending import TrendingScreen
 from ui.accounts import AccountSwitcher, AccountInfoWidget
+from ui.preview import ThumbnailPreview
+from ui.video_table import VideoTableView
+
+
+# Seconds between checks of whether the app went offline or should probe YouTube
+CONNECTIVITY_CHECK_INTERVAL = 5
+
+# Snapshots younger than this are not revalidated when switching to their account
+SWITCH_REFRESH_AGE = 300
+
+HELP_TEXT = "Tab: switch | Enter: play | /: search | a: accounts | q: quit"
 
 
 class YouTubeApp(App):
@@ -88,6 +110,11 @@ class YouTubeApp(App):
         margin: 0 1;
     }
 
+    .filter-bar {
+        margin: 0;
+        border: tall $panel;
+    }
+
     .error {
         background: $error;
         color: $text;
@@ -116,6 +143,7 @@ class YouTubeApp(App):
         Binding("r", "refresh", "Refresh"),
         Binding("/", "search", "Search"),
         Binding("a", "switch_account", "Accounts"),
+        Binding("p", "toggle_preview", "Preview"),
         Binding("1", "switch_tab('search')", "Search", show=False),
         Binding("2", "switch_tab('trending')", "Trending", show=False),
         Binding("3", "switch_tab('subscriptions')", "Subscriptions", show=False),
@@ -127,8 +155,22 @@ class YouTubeApp(App):
         super().__init__()
         self.youtube = youtube_api
         self.account_manager = account_manager
+        self._active_pane = "search"
+        self._shown_offline = False
+        self._refresh_worker = None
+        self.refresh_budget: Optional[QuotaBudget] = None
+        self.refresher: Optional[BackgroundRefresher] = None
+        self.thumbnails: Optional[ThumbnailRenderer] = None
+        self.watch_log = WatchLog()
+        self.seen_sets: Dict[str, SeenSet] = {}
+        config = load_config()
+        self.new_badges = config["new_badges"]
+        self.seen_set_capacity = config["seen_set_capacity"]
+        self.player = self._new_player_launcher()
         self.title = "YT-TUI - YouTube Terminal Client"
-        self.sub_title = "Tab: switch | Enter: play | /: search | a: accounts | q: quit"
+        if account_manager is not None and youtube_api.account_id is not None:
+            account_manager.pool_api(youtube_api)
+        self.sub_title = HELP_TEXT
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
@@ -145,24 +187,252 @@ class YouTubeApp(App):
             with TabPane("Trending", id="trending"):
                 yield TrendingScreen(self.youtube)
             with TabPane("Subscriptions", id="subscriptions"):
-                yield SubscriptionsScreen(self.youtube)
+                yield SubscriptionsScreen(self.youtube, self.account_manager)
             with TabPane("History", id="history"):
-                yield HistoryScreen(self.youtube)
+                yield HistoryScreen(self.youtube, self.watch_log)
             with TabPane("Playlists", id="playlists"):
                 yield PlaylistsScreen(self.youtube)
+
+        config = load_config()
+        self.thumbnails = ThumbnailRenderer(
+            ThumbnailCache(max_bytes=config["thumbnail_cache_mb"] * 1024 * 1024),
+            download_workers=config["thumbnail_download_workers"]
+        )
+        preview = ThumbnailPreview(self.thumbnails)
+        preview.display = config["thumbnail_preview"]
+        yield preview
         yield Footer()
 
+    def on_mount(self) -> None:
+        """Start watching connectivity and refreshing in the background."""
+        if self.youtube.connectivity is not None:
+            self.check_connectivity()
+            self.set_interval(CONNECTIVITY_CHECK_INTERVAL, self.check_connectivity)
+
+        config = load_config()
+        # A sync daemon refreshes in the background itself; doing it here too would pay twice
+        if config["background_refresh"] and not getattr(self.youtube, 'background_sync', False):
+            self.refresh_budget = QuotaBudget(config["background_quota_per_hour"])
+            self.refresher = self._new_refresher()
+            self.set_interval(config["background_refresh_tick"], self.background_refresh)
+
+    def _new_refresher(self) -> BackgroundRefresher:
+        """Create a refresher for the current account, sharing the quota budget."""
+        return BackgroundRefresher(self.refresh_budget, **refresher_options(load_config()))
+
+    def background_refresh(self) -> None:
+        """Start a background refresh, unless the last one is still running."""
+        if self._refresh_worker is not None and not self._refresh_worker.is_finished:
+            return
+        self._refresh_worker = self.run_background_refresh(self.youtube, self.refresher)
+
+    @work(thread=True, exclusive=True, group="background-refresh")
+    def run_background_refresh(self, youtube, refresher: BackgroundRefresher) -> None:
+        """Refresh whatever is due off the UI thread, behind anything the user is waiting on."""
+        worker = get_current_worker()
+        try:
+            with request_priority(Priority.BACKGROUND):
+                result = refresher.tick(youtube)
+        except Exception:
+            # A refresh nobody asked for never reports errors; the next tick tries again
+            return
+        if not worker.is_cancelled:
+            self.call_from_thread(self.apply_background_refresh, youtube, result)
+
+    def apply_background_refresh(self, youtube, result) -> None:
+        """Merge a background refresh into the screens, if the account has not changed since."""
+        if youtube is not self.youtube:
+            return
+
+        if result.trending is not None:
+            self.query_one(TrendingScreen).apply_background_refresh(result.trending)
+        if result.playlists is not None:
+            self.query_one(PlaylistsScreen).apply_background_refresh(result.playlists)
+        if result.new_videos:
+            added = self.query_one(SubscriptionsScreen).apply_background_refresh(result.new_videos)
+            if added:
+                self.notify(f"{added} new video(s) from your subscriptions")
+
+    def _new_player_launcher(self) -> PlayerLauncher:
+        """Create the launcher for the configured player."""
+        config = load_config()
+        if config["player"] != "mpv":
+            return PlayerLauncher()
+        return PlayerLauncher(MpvPlayer(command=config["player_command"], args=config["player_args"]))
+
+    def on_unmount(self) -> None:
+        """Stop thumbnail downloads, render processes and token refreshes, and save the seen-sets."""
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        self.player.close()
+        for seen in self.seen_sets.values():
+            seen.close()
+        if self.account_manager is not None:
+            self.account_manager.close()
+
+    def is_watched(self, video_id: str) -> bool:
+        """Whether the current account has opened a video."""
+        return self.watch_log.watched(self.youtube.account_id, video_id)
+
+    def new_videos(self, videos: list, shown_new: set) -> set:
+        """
+        Find the videos the current account is being shown for the first time, and record them as shown.
+
+        Args:
+            videos: Videos about to be shown
+            shown_new: Videos the screen already badged as new, which stay new
+
+        Returns:
+            IDs of the videos to badge as new; none the first time an account is seen
+        """
+        if not self.new_badges:
+            return set()
+
+        name = self.youtube.account_id or 'default'
+        seen = self.seen_sets.get(name)
+        if seen is None:
+            try:
+                seen = self.seen_sets[name] = SeenSet(name, capacity=self.seen_set_capacity)
+            except OSError:
+                # Badges are a nicety; without a writable seen-set there are none
+                return set()
+
+        first_time = len(seen) == 0
+        new = {video['id'] for video in videos if video['id'] in shown_new or video['id'] not in seen}
+        seen.add(video['id'] for video in videos)
+        return set() if first_time else new
+
+    def _report_player(self, future) -> None:
+        """
+        Report a video that could not be opened.
+
+        Runs on the player thread, or on the UI thread if the future was
+        already done when the callback was added; call_later is safe from both.
+        """
+        if future.cancelled():
+            # Dropped unstarted when the app closed
+            return
+        error = future.exception()
+        if error is not None:
+            self.call_later(self.notify, f"Failed to open video: {error}", severity="error")
+
+    def open_video(self, video: dict) -> None:
+        """Open a video in the player (or browser) without waiting, and log it as watched."""
+        self.notify(f"Opening: {video['title'][:50]}...")
+        self.player.play(video['url']).add_done_callback(self._report_player)
+
+        self.watch_log.record(self.youtube.account_id, video)
+        # The History tab re-reads the log when next shown
+        for screen in self.query(HistoryScreen):
+            screen.load_state.invalidate()
+
+    def enqueue_videos(self, videos: list) -> None:
+        """Queue videos in the player, in order, without waiting."""
+        if not videos:
+            return
+        self.notify(f"Queueing {len(videos)} video(s)...")
+        self.player.enqueue([video['url'] for video in videos]).add_done_callback(self._report_player)
+
+    def open_page(self, url: str, title: str) -> None:
+        """Open a web page (such as a channel) in the browser without waiting."""
+        self.notify(f"Opening: {title[:50]}...")
+        self.player.browse(url).add_done_callback(self._report_player)
+
+    def _item_at(self, table: DataTable, row_index: int):
+        """Get the video, playlist or channel shown in a row of a screen's table."""
+        for ancestor in table.ancestors:
+            if hasattr(ancestor, 'item_at'):
+                return ancestor.item_at(row_index)
+            view = getattr(ancestor, 'view', None)
+            if isinstance(view, VideoTableView):
+                return view.video_at(row_index)
+        return None
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        """Preview the row under the cursor."""
+        preview = self.query_one(ThumbnailPreview)
+        if preview.display:
+            preview.show_item(self._item_at(event.data_table, event.cursor_row))
+
+    def action_toggle_preview(self) -> None:
+        """Show or hide the thumbnail preview pane."""
+        preview = self.query_one(ThumbnailPreview)
+        preview.display = not preview.display
+        if not preview.display:
+            return
+
+        screen = self._screen_in_pane(self.query_one(TabbedContent).active)
+        tables = screen.query(DataTable) if screen is not None else []
+        for table in tables:
+            preview.show_item(self._item_at(table, table.cursor_row))
+            break
+
+    def check_connectivity(self) -> None:
+        """Show whether the app is offline, and probe YouTube when it is time to."""
+        connectivity = self.youtube.connectivity
+        if connectivity.offline != self._shown_offline:
+            self._shown_offline = connectivity.offline
+            if connectivity.offline:
+                self.sub_title = f"{connectivity.describe()} - showing saved data"
+                self.notify(connectivity.describe(), severity="warning")
+            else:
+                self.sub_title = HELP_TEXT
+
+        if connectivity.probe_due():
+            self.probe_connectivity()
+
+    @work(thread=True, exclusive=True, group="probe")
+    def probe_connectivity(self) -> None:
+        """Check off the UI thread whether YouTube is usable again."""
+        with request_priority(Priority.BACKGROUND):
+            back_online = self.youtube.probe()
+        if back_online:
+            self.call_from_thread(self.on_back_online)
+
+    def on_back_online(self) -> None:
+        """Run the refreshes that waited for YouTube to be reachable."""
+        self.check_connectivity()
+        self.notify("Back online, refreshing")
+
+        # The visible tab refreshes now; the others when next shown
+        active = self._screen_in_pane(self.query_one(TabbedContent).active)
+        for screen in self.query("SearchScreen, TrendingScreen, SubscriptionsScreen, HistoryScreen, PlaylistsScreen"):
+            if screen is active:
+                screen.refresh_data()
+            else:
+                screen.load_state.invalidate()
+
+    def _screen_in_pane(self, pane_id: str):
+        """Get the screen widget shown in a tab pane, if any."""
+        for widget in self.query("SearchScreen, TrendingScreen, SubscriptionsScreen, HistoryScreen, PlaylistsScreen"):
+            if widget.ancestors and any(ancestor.id == pane_id for ancestor in widget.ancestors):
+                return widget
+        return None
+
     def action_refresh(self) -> None:
         """Refresh the current tab."""
         tabbed_content = self.query_one(TabbedContent)
-        active_pane = tabbed_content.active
-
-        # Find the screen widget in the active pane
-        for widget in self.query("SearchScreen, TrendingScreen, SubscriptionsScreen, HistoryScreen, PlaylistsScreen"):
-            if widget.ancestors and any(ancestor.id == active_pane for ancestor in widget.ancestors):
-                if hasattr(widget, 'refresh_data'):
-                    widget.refresh_data()
-                break
+        screen = self._screen_in_pane(tabbed_content.active)
+        if screen is not None and hasattr(screen, 'refresh_data'):
+            if hasattr(screen, 'load_state'):
+                # Past the sync daemon's cache, to YouTube
+                screen.load_state.request_fresh()
+            screen.refresh_data()
+
+        connectivity = self.youtube.connectivity
+        if connectivity is not None and connectivity.offline:
+            self.notify(f"{connectivity.describe()} - showing saved data")
+
+    def on_tabbed_content_tab_activated(self, event: TabbedContent.TabActivated) -> None:
+        """Cancel the load of the tab being left, and resume one interrupted earlier."""
+        previous = self._screen_in_pane(self._active_pane)
+        if previous is not None and hasattr(previous, 'load_state'):
+            previous.load_state.cancel()
+
+        self._active_pane = event.pane.id
+        current = self._screen_in_pane(self._active_pane)
+        if current is not None and getattr(current, 'load_state', None) and current.load_state.interrupted:
+            current.refresh_data()
 
     def action_search(self) -> None:
         """Focus on search tab and input."""
@@ -186,6 +456,7 @@ class YouTubeApp(App):
             return
 
         self.push_screen(AccountSwitcher(self.account_manager), self.handle_account_switch)
+        self.warm_accounts()
 
     def handle_account_switch(self, result) -> None:
         """Handle account switch result."""
@@ -251,27 +522,73 @@ class YouTubeApp(App):
         if not self.account_manager:
             return
 
+        # A warm account switches at once; a cold one signs in off the UI thread
+        api = self.account_manager.pooled_api(account.id)
+        if api is not None:
+            self.use_account_api(api)
+        else:
+            self.load_account_api(account)
+
+    @work(thread=True, exclusive=True, group="account")
+    def load_account_api(self, account) -> None:
+        """Sign in an account that is not warm, then switch to it."""
         try:
-            # Get new service with switched account
-            from googleapiclient.discovery import build
-            creds = self.account_manager.get_credentials(account)
-            if not creds:
-                self.notify("Failed to get credentials", severity="error")
-                return
+            api = self.account_manager.get_api(account, self.youtube)
+        except Exception as e:
+            self.call_from_thread(self.notify, f"Failed to switch account: {e}", severity="error")
+            return
 
-            service = build('youtube', 'v3', credentials=creds)
-            self.youtube = YouTubeAPI(service)
+        if api is None:
+            self.call_from_thread(self.notify, "Failed to get credentials", severity="error")
+            return
+        self.call_from_thread(self.use_account_api, api)
 
-            # Update all screens with new API
-            for screen in self.query("SearchScreen, TrendingScreen, SubscriptionsScreen, HistoryScreen, PlaylistsScreen"):
-                screen.youtube = self.youtube
+    def use_account_api(self, api) -> None:
+        """Point every screen at another account's client and repaint from its snapshots."""
+        active = self.account_manager.get_active_account()
+        if active is None or api.account_id != active.id:
+            # The user switched again while this account was signing in
+            return
 
-            # Update account info widget
-            account_widget = self.query_one(AccountInfoWidget)
-            account_widget.update_display()
+        self.youtube = api
+        if self.refresher is not None:
+            self.refresher = self._new_refresher()
+
+        # Loads for the old account are abandoned, each screen shows the
+        # new account's snapshot, and hidden tabs revalidate when next shown
+        for screen in self.query("SearchScreen, TrendingScreen, SubscriptionsScreen, HistoryScreen, PlaylistsScreen"):
+            screen.youtube = self.youtube
+            if hasattr(screen, 'show_snapshot'):
+                screen.load_state.invalidate()
+                screen.show_snapshot()
+            elif isinstance(screen, HistoryScreen):
+                screen.refresh_data()
+            else:
+                screen.load_state.cancel()
 
-            # Refresh current view
-            self.action_refresh()
+        # Update account info widget
+        account_widget = self.query_one(AccountInfoWidget)
+        account_widget.update_display()
+        self.query_one(SubscriptionsScreen).update_account_buttons()
 
-        except Exception as e:
-            self.notify(f"Failed to switch account: {e}", severity="error")
+        # Revalidate the current view unless its snapshot is recent
+        screen = self._screen_in_pane(self.query_one(TabbedContent).active)
+        loaded_at = getattr(screen, 'loaded_at', None)
+        if loaded_at is None or time.time() - loaded_at > SWITCH_REFRESH_AGE:
+            self.action_refresh()
+        elif screen is not None:
+            screen.load_state.interrupted = False
+
+    @work(thread=True, exclusive=True, group="warm-accounts")
+    def warm_accounts(self) -> None:
+        """Sign in the accounts offered in the switcher ahead of time, up to the pool size."""
+        active = self.account_manager.get_active_account()
+        others = [account for account in self.account_manager.get_all_accounts()
+                  if active is None or account.id != active.id]
+        with request_priority(Priority.BACKGROUND):
+            for account in others[:max(0, self.account_manager.warm_accounts - 1)]:
+                try:
+                    self.account_manager.get_api(account, self.youtube)
+                except Exception:
+                    # Switching to it signs in again and reports the problem
+                    continue
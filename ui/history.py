@@ -1,89 +1,118 @@
 """Watch history screen."""
-import webbrowser
+import time
+from typing import Optional
+
 from textual.app import ComposeResult
 from textual.containers import Vertical
-from textual.widgets import Static, DataTable
+from textual.widgets import Static, DataTable, Input
 from textual.reactive import reactive
 
-from youtube_api import YouTubeAPI, YouTubeAPIError
+from youtube_api import YouTubeAPI
+from watch_log import WatchLog
+from snapshot_store import describe_age
+from ui.loading import LoadState
+from ui.video_table import VideoTableView, setup_video_table, filter_input
+
+# Videos read from the watch log at a time
+PAGE_SIZE = 50
 
 
 class HistoryScreen(Static):
-    """Watch history screen widget."""
+    """Watch history screen widget, served from the local watch log."""
+
+    TITLE = "🕐 Watch History"
 
     videos: reactive[list] = reactive([])
 
-    def __init__(self, youtube_api: YouTubeAPI):
+    def __init__(self, youtube_api: YouTubeAPI, watch_log: WatchLog):
         """Initialize history screen."""
         super().__init__()
         self.youtube = youtube_api
+        self.watch_log = watch_log
+        self.load_state = LoadState()
+        self.loaded_at: Optional[float] = None
+        self.view = VideoTableView()
 
     def compose(self) -> ComposeResult:
         """Compose the history screen."""
         with Vertical():
-            yield Static("🕐 Watch History", classes="info")
+            yield Static(self.TITLE, id="screen-title", classes="info")
             yield Static(
-                "Note: Watch history API access is restricted. Showing activity feed instead.",
+                "Videos opened in yt-tui, most recent first. Scroll to the end for older ones.",
                 classes="info"
             )
+            yield filter_input()
             yield DataTable(id="history-table")
 
     def on_mount(self) -> None:
-        """Set up the data table and load history."""
+        """Set up the data table and show the latest page of history."""
         table = self.query_one(DataTable)
-        table.cursor_type = "row"
-        table.zebra_stripes = True
-        table.add_columns("Title", "Channel", "Duration", "Views", "Published")
+        setup_video_table(table)
+        self.view.watched = self.app.is_watched
 
         self.refresh_data()
 
+    def set_status(self, *parts: str) -> None:
+        """Show how much history is loaded next to the screen title."""
+        self.query_one("#screen-title", Static).update(" · ".join((self.TITLE,) + parts))
+
     def refresh_data(self) -> None:
-        """Load watch history."""
+        """Show the latest page of the current account's history."""
+        # Nothing to wait for: the log is indexed in memory
+        self.load_state.cancel(resume=False)
+        self.load_state.interrupted = False
+        self.show_videos(self.watch_log.page(self.youtube.account_id, 0, PAGE_SIZE))
+
+    def load_more(self) -> None:
+        """Append the next page of older history, if there is one."""
+        older = self.watch_log.page(self.youtube.account_id, len(self.videos), PAGE_SIZE)
+        # Videos opened since the first page was read shift the offsets
+        shown = {video['id'] for video in self.videos}
+        older = [video for video in older if video['id'] not in shown]
+        if older:
+            self.show_videos(self.videos + older)
+
+    def show_videos(self, results: list) -> None:
+        """Populate the table with the history read so far."""
         table = self.query_one(DataTable)
-        table.clear()
-        table.add_row("Loading history...", "", "", "", "")
-
-        try:
-            results = self.youtube.get_watch_history(max_results=50)
-            self.videos = results
-
-            table.clear()
-
-            if not results:
-                table.add_row("No history found", "", "", "", "")
-                return
-
-            for video in results:
-                table.add_row(
-                    video['title'][:60],
-                    video['channel'][:30],
-                    video['duration'],
-                    video['view_count'],
-                    video['published_at']
-                )
-
-        except YouTubeAPIError as e:
-            table.clear()
-            table.add_row(f"Error: {e}", "", "", "", "")
-            table.add_row("Watch history requires special API access", "", "", "", "")
-        except Exception as e:
-            table.clear()
-            table.add_row(f"Unexpected error: {e}", "", "", "", "")
+        self.videos = results
+        self.loaded_at = time.time()
+        self.view.replace_videos(table, results)
 
-    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
-        """Handle row selection - open video in browser."""
-        if not self.videos:
+        if not results:
+            table.add_row("No history yet - videos you open are listed here", "", "", "", "")
+            self.set_status()
             return
 
-        row_index = event.cursor_row
-        if row_index >= len(self.videos):
-            return
+        total = self.watch_log.count(self.youtube.account_id)
+        last = results[0].get('watched_at')
+        parts = [f"{len(results)} of {total}"]
+        if last is not None:
+            parts.append(f"last watched {describe_age(last)}")
+        self.set_status(*parts)
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Narrow the loaded videos as the filter text changes."""
+        if event.input.id == "filter-input":
+            self.view.set_filter(event.value)
+            if self.videos:
+                self.view.render(self.query_one(DataTable))
+
+    def on_data_table_header_selected(self, event: DataTable.HeaderSelected) -> None:
+        """Sort the loaded videos by the clicked column."""
+        self.view.toggle_sort(event.column_key.value)
+        if self.videos:
+            self.view.render(self.query_one(DataTable))
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        """Read older history once the cursor reaches the last row."""
+        if event.cursor_row == event.data_table.row_count - 1 and self.videos:
+            self.load_more()
 
-        video = self.videos[row_index]
-        url = video['url']
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        """Handle row selection - open video in browser."""
+        video = self.view.video_at(event.cursor_row)
+        if not video:
+            return
 
-        try:
-            webbrowser.open(url)
-            self.app.notify(f"Opening: {video['title'][:50]}...")
-        except Exception as e:
-            self.app.notify(f"Failed to open browser: {e}", severity="error")
+        self.app.open_video(video)
@@ -0,0 +1,89 @@
+"""Cancellation of a screen's in-flight load."""
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from cache import bypass_cache
+from cancellation import CancelToken, cancel_scope
+from config import load_config
+from snapshot_store import describe_age
+from youtube_api import OfflineResult
+
+
+class LoadState:
+    """
+    Tracks the cancel token of a screen's current load.
+
+    Starting a load cancels the previous one. Cancelling a load that was
+    still running marks it interrupted, so the screen knows to load again
+    when the user comes back to it. A load begun after request_fresh skips
+    shared caches.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        """
+        Initialize with no load running.
+
+        Args:
+            deadline: Overall seconds allowed per load, defaults to the screen_load_deadline setting
+        """
+        self.deadline = load_config()["screen_load_deadline"] if deadline is None else deadline
+        self.token: Optional[CancelToken] = None
+        self.interrupted = False
+        self._fresh_next = False
+        self._fresh: Optional[CancelToken] = None
+
+    def request_fresh(self) -> None:
+        """Make the next load skip shared caches, as an explicit refresh should."""
+        self._fresh_next = True
+
+    def begin(self) -> CancelToken:
+        """Cancel any running load and get a token for a new one."""
+        if self.token is not None:
+            self.token.cancel()
+        self.token = CancelToken(self.deadline)
+        self.interrupted = False
+        self._fresh = self.token if self._fresh_next else None
+        self._fresh_next = False
+        return self.token
+
+    def cancel(self, resume: bool = True) -> None:
+        """
+        Cancel the running load, if any.
+
+        Args:
+            resume: Mark the load interrupted so it is started again later
+        """
+        self._fresh_next = False
+        if self.token is not None:
+            self.token.cancel()
+            self.token = None
+            self.interrupted = resume
+
+    def invalidate(self) -> None:
+        """Cancel the running load, if any, and load again when next shown."""
+        self.cancel()
+        self.interrupted = True
+
+    @contextmanager
+    def running(self, token: CancelToken):
+        """Make requests in the block use token, and mark the load finished after."""
+        with cancel_scope(token), bypass_cache(token is self._fresh):
+            try:
+                yield token
+            finally:
+                if self.token is token:
+                    self.token = None
+
+
+def freshness(results: list, saved_at: Optional[float]) -> Tuple[str, ...]:
+    """
+    Describe how fresh loaded rows are, as parts of a screen's status.
+
+    Args:
+        results: The rows; an OfflineResult is marked offline
+        saved_at: When they were loaded, or None if just now
+    """
+    parts = ("offline",) if isinstance(results, OfflineResult) else ()
+    if saved_at is not None:
+        parts += (f"from {describe_age(saved_at)}",)
+    return parts
@@ -1,27 +1,57 @@
 """Playlists screen."""
-import webbrowser
+import time
+from typing import Dict, Optional
+
+from textual import work
 from textual.app import ComposeResult
 from textual.containers import Vertical
-from textual.widgets import Static, DataTable, Button
+from textual.coordinate import Coordinate
+from textual.widgets import Static, DataTable, Button, Input
 from textual.reactive import reactive
+from textual.worker import get_current_worker
 from textual.screen import Screen
 
-from youtube_api import YouTubeAPI, YouTubeAPIError
+from youtube_api import YouTubeAPI, YouTubeAPIError, OfflineResult
+from scheduler import Priority, request_priority
+from cache import TTLCache
+from cancellation import CancelToken, RequestCancelled, DeadlineExceeded, cancel_scope
+from config import load_config
+from refresher import QuotaBudget
+from playlist_stats import format_runtime
+from snapshot_store import SnapshotStore, describe_age
+from ui.loading import LoadState, freshness
+from ui.video_table import VideoTableView, setup_video_table, filter_input
 
 
 class PlaylistVideosScreen(Screen):
     """Screen for displaying videos in a playlist."""
 
-    def __init__(self, youtube_api: YouTubeAPI, playlist_id: str, playlist_title: str):
+    def __init__(self, youtube_api: YouTubeAPI, playlist_id: str, playlist_title: str,
+                 prefetched: Optional[list] = None):
+        """
+        Initialize the screen.
+
+        Args:
+            youtube_api: Client to load the playlist with
+            playlist_id: ID of the playlist
+            playlist_title: Title shown above the videos
+            prefetched: The playlist's videos, if they were just fetched ahead of time
+        """
         super().__init__()
         self.youtube = youtube_api
+        self.prefetched = prefetched
+        self.load_state = LoadState()
+        self.snapshots = SnapshotStore()
         self.playlist_id = playlist_id
         self.playlist_title = playlist_title
         self.videos = []
+        self.loaded_at: Optional[float] = None
+        self.view = VideoTableView()
 
     BINDINGS = [
         ("escape", "app.pop_screen", "Back"),
         ("q", "app.pop_screen", "Back"),
+        ("e", "enqueue", "Queue all"),
     ]
 
     CSS = """
@@ -40,84 +70,198 @@ class PlaylistVideosScreen(Screen):
     def compose(self) -> ComposeResult:
         """Compose the playlist videos screen."""
         with Vertical(id="playlist-container"):
-            yield Static(f"📋 {self.playlist_title}", classes="info")
-            yield Static("Press ESC or Q to go back", classes="info")
+            yield Static(f"📋 {self.playlist_title}", id="screen-title", classes="info")
+            yield Static("Press ESC or Q to go back, E to queue every video shown in the player", classes="info")
+            yield filter_input()
             yield DataTable(id="playlist-videos-table")
 
     def on_mount(self) -> None:
-        """Set up the data table and load videos."""
+        """Set up the data table, show the last snapshot and revalidate it."""
         table = self.query_one(DataTable)
-        table.cursor_type = "row"
-        table.zebra_stripes = True
-        table.add_columns("Title", "Channel", "Duration", "Views", "Published")
+        setup_video_table(table)
+        self.view.watched = self.app.is_watched
+
+        if self.prefetched is not None:
+            # Fetched moments ago while the cursor rested on the playlist
+            self.snapshots.save(self.snapshot_key(), self.prefetched)
+            self.show_videos(self.prefetched)
+            return
 
+        snapshot = self.snapshots.load(self.snapshot_key())
+        if snapshot is not None:
+            videos, saved_at = snapshot
+            self.show_videos(videos, saved_at=saved_at)
         self.load_videos()
 
-    def load_videos(self) -> None:
-        """Load videos from the playlist."""
-        table = self.query_one(DataTable)
-        table.clear()
-        table.add_row("Loading playlist videos...", "", "", "", "")
+    def on_unmount(self) -> None:
+        """Stop loading once the screen has been popped."""
+        self.load_state.cancel()
 
-        try:
-            results = self.youtube.get_playlist_videos(self.playlist_id, max_results=50)
-            self.videos = results
+    def action_enqueue(self) -> None:
+        """Queue the videos shown, as filtered and sorted, in the player."""
+        self.app.enqueue_videos(self.view.visible)
+
+    def snapshot_key(self) -> str:
+        """Get the snapshot key for this playlist."""
+        return f"playlist-{self.youtube.account_id or 'default'}-{self.playlist_id}"
 
+    def set_status(self, *parts: str) -> None:
+        """Show how fresh the table is next to the playlist title."""
+        self.query_one("#screen-title", Static).update(" · ".join((f"📋 {self.playlist_title}",) + parts))
+
+    def load_videos(self) -> None:
+        """Load videos from the playlist, keeping any shown until the new ones arrive."""
+        if self.videos:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refreshing...")
+        else:
+            table = self.query_one(DataTable)
             table.clear()
+            table.add_row("Loading playlist videos...", "", "", "", "")
 
-            if not results:
-                table.add_row("No videos in this playlist", "", "", "", "")
-                return
-
-            for video in results:
-                table.add_row(
-                    video['title'][:60],
-                    video['channel'][:30],
-                    video['duration'],
-                    video['view_count'],
-                    video['published_at']
-                )
+        self.fetch_videos(self.load_state.begin())
 
+    @work(thread=True, exclusive=True, group="load")
+    def fetch_videos(self, token: CancelToken) -> None:
+        """Fetch playlist videos off the UI thread."""
+        worker = get_current_worker()
+
+        try:
+            # The user just opened this playlist and is waiting on it
+            with request_priority(Priority.INTERACTIVE), self.load_state.running(token):
+                results = self.youtube.get_playlist_videos(self.playlist_id, max_results=50)
+        except DeadlineExceeded:
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, "Error: Timed out loading playlist videos")
+            return
+        except RequestCancelled:
+            return
         except YouTubeAPIError as e:
-            table.clear()
-            table.add_row(f"Error: {e}", "", "", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Error: {e}")
+            return
         except Exception as e:
-            table.clear()
-            table.add_row(f"Unexpected error: {e}", "", "", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Unexpected error: {e}")
+            return
+
+        if not worker.is_cancelled and not token.cancelled:
+            if not isinstance(results, OfflineResult):
+                self.snapshots.save(self.snapshot_key(), results)
+            self.app.call_from_thread(self.show_videos, results)
+
+    def show_videos(self, results: list, saved_at: Optional[float] = None) -> None:
+        """
+        Populate the table with loaded videos.
+
+        Args:
+            results: Videos to show
+            saved_at: When they were loaded, if they come from a snapshot
+        """
+        if isinstance(results, OfflineResult):
+            saved_at = results.synced_at
+
+        table = self.query_one(DataTable)
+        self.videos = results
+        self.loaded_at = time.time() if saved_at is None else saved_at
+        self.view.new_ids = self.app.new_videos(results, self.view.new_ids)
+        self.view.replace_videos(table, results)
+
+        if not results:
+            table.add_row("No videos in this playlist", "", "", "", "")
+
+        self.set_status(*freshness(results, saved_at))
+
+    def show_error(self, *lines: str) -> None:
+        """Report an error, keeping any videos already shown."""
+        if self.videos:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refresh failed")
+            self.notify(" ".join(lines), severity="error")
+            return
+
+        table = self.query_one(DataTable)
+        table.clear()
+        for line in lines:
+            table.add_row(line, "", "", "", "")
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Narrow the loaded videos as the filter text changes."""
+        if event.input.id == "filter-input":
+            self.view.set_filter(event.value)
+            if self.videos:
+                self.view.render(self.query_one(DataTable))
+
+    def on_data_table_header_selected(self, event: DataTable.HeaderSelected) -> None:
+        """Sort the loaded videos by the clicked column."""
+        self.view.toggle_sort(event.column_key.value)
+        if self.videos:
+            self.view.render(self.query_one(DataTable))
 
     def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
         """Handle row selection - open video in browser."""
-        if not self.videos:
+        video = self.view.video_at(event.cursor_row)
+        if not video:
             return
 
-        row_index = event.cursor_row
-        if row_index >= len(self.videos):
-            return
+        self.app.open_video(video)
+        self.view.refresh_row(event.data_table, event.cursor_row)
 
-        video = self.videos[row_index]
-        url = video['url']
 
-        try:
-            webbrowser.open(url)
-            self.notify(f"Opening: {video['title'][:50]}...")
-        except Exception as e:
-            self.notify(f"Failed to open browser: {e}", severity="error")
+PLAYLIST_COLUMNS = ("Title", "Videos", "Runtime", "Average", "Views", "Newest", "Description", "Created")
+
+# Index of the first stats column
+STATS_COLUMN = 2
+
+# Seconds the cursor must rest on a playlist before its contents are prefetched
+PREFETCH_DELAY = 0.3
+
+# Playlists on each side of the cursor prefetched along with it
+PREFETCH_NEIGHBORS = 1
+
+# Quota units a prefetch may cost: the first page of items and their details
+PREFETCH_COST = 2
+
+
+def stats_cells(stats: Optional[dict]) -> tuple:
+    """Get the stats cells of a playlist row, blank until its stats are computed."""
+    if stats is None:
+        return ("…", "…", "…", "…")
+    newest = describe_age(stats['newest_ts']) if stats.get('newest_ts') else ""
+    return (
+        format_runtime(stats['total_seconds']),
+        format_runtime(stats['average_seconds']),
+        stats.get('view_count', str(stats['total_views'])),
+        newest
+    )
 
 
 class PlaylistsScreen(Static):
     """Playlists screen widget."""
 
+    TITLE = "📚 Your Playlists"
+
     playlists: reactive[list] = reactive([])
 
     def __init__(self, youtube_api: YouTubeAPI):
         """Initialize playlists screen."""
         super().__init__()
         self.youtube = youtube_api
+        self.load_state = LoadState()
+        self.snapshots = SnapshotStore()
+        self.loaded_at: Optional[float] = None
+        self.stats: Dict[str, dict] = {}
+        self.stats_token: Optional[CancelToken] = None
+
+        config = load_config()
+        self.prefetch_enabled = config["playlist_prefetch"]
+        self.prefetch_budget = QuotaBudget(config["prefetch_quota_per_hour"])
+        self.prefetched = TTLCache(maxsize=32, ttl=config["playlist_prefetch_ttl"])
+        self.prefetch_token: Optional[CancelToken] = None
+        self._prefetch_timer = None
 
     def compose(self) -> ComposeResult:
         """Compose the playlists screen."""
         with Vertical():
-            yield Static("📚 Your Playlists", classes="info")
+            yield Static(self.TITLE, id="screen-title", classes="info")
             yield Static("Select a playlist to view its videos", classes="info")
             yield DataTable(id="playlists-table")
 
@@ -126,41 +270,267 @@ class PlaylistsScreen(Static):
         table = self.query_one(DataTable)
         table.cursor_type = "row"
         table.zebra_stripes = True
-        table.add_columns("Title", "Videos", "Description", "Created")
+        table.add_columns(*PLAYLIST_COLUMNS)
+        self.watch(table, "hover_coordinate", self.on_hover_changed, init=False)
 
+        self.show_snapshot()
         self.refresh_data()
 
-    def refresh_data(self) -> None:
-        """Load playlists."""
-        table = self.query_one(DataTable)
-        table.clear()
-        table.add_row("Loading playlists...", "", "", "")
+    def snapshot_key(self) -> str:
+        """Get the snapshot key for the current account."""
+        return f"playlists-{self.youtube.account_id or 'default'}"
+
+    def stats_key(self) -> str:
+        """Get the snapshot key of the playlist stats for the current account."""
+        return f"playlist-stats-{self.youtube.account_id or 'default'}"
+
+    def message_row(self, table: DataTable, text: str) -> None:
+        """Add a row holding only a message."""
+        table.add_row(text, *[""] * (len(PLAYLIST_COLUMNS) - 1))
+
+    def show_snapshot(self) -> None:
+        """Show the last playlists (and their stats) loaded for the current account, if any were saved."""
+        self.cancel_prefetch()
+        if self.stats_token is not None:
+            self.stats_token.cancel()
+        stats = self.snapshots.load(self.stats_key())
+        self.stats = stats[0] if stats is not None else {}
+
+        snapshot = self.snapshots.load(self.snapshot_key())
+        if snapshot is None:
+            self.playlists = []
+            self.loaded_at = None
+            self.query_one(DataTable).clear()
+            self.set_status()
+            return
 
-        try:
-            results = self.youtube.get_playlists(max_results=50)
-            self.playlists = results
+        playlists, saved_at = snapshot
+        self.show_playlists(playlists, saved_at=saved_at)
+
+    def set_status(self, *parts: str) -> None:
+        """Show how fresh the table is next to the screen title."""
+        self.query_one("#screen-title", Static).update(" · ".join((self.TITLE,) + parts))
 
+    def refresh_data(self) -> None:
+        """Load playlists, keeping any shown until the new ones arrive."""
+        if self.playlists:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refreshing...")
+        else:
+            table = self.query_one(DataTable)
             table.clear()
+            self.message_row(table, "Loading playlists...")
 
-            if not results:
-                table.add_row("No playlists found", "", "", "")
-                return
+        self.fetch_playlists(self.load_state.begin(), self.snapshot_key())
 
-            for playlist in results:
-                table.add_row(
-                    playlist['title'][:40],
-                    str(playlist['video_count']),
-                    playlist['description'][:60],
-                    playlist['published_at']
-                )
+    @work(thread=True, exclusive=True, group="load")
+    def fetch_playlists(self, token: CancelToken, snapshot_key: str) -> None:
+        """Fetch playlists off the UI thread, saving them under snapshot_key."""
+        worker = get_current_worker()
 
+        try:
+            with request_priority(Priority.VISIBLE), self.load_state.running(token):
+                results = self.youtube.get_playlists(max_results=50)
+        except DeadlineExceeded:
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, "Error: Timed out loading playlists")
+            return
+        except RequestCancelled:
+            return
         except YouTubeAPIError as e:
-            table.clear()
-            table.add_row(f"Error: {e}", "", "", "")
-            table.add_row("You need to be authenticated to view playlists", "", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(
+                    self.show_error, f"Error: {e}", "You need to be authenticated to view playlists"
+                )
+            return
         except Exception as e:
-            table.clear()
-            table.add_row(f"Unexpected error: {e}", "", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Unexpected error: {e}")
+            return
+
+        if not worker.is_cancelled and not token.cancelled:
+            if not isinstance(results, OfflineResult):
+                self.snapshots.save(snapshot_key, results)
+            self.app.call_from_thread(self.show_playlists, results)
+
+    def show_playlists(self, results: list, saved_at: Optional[float] = None) -> None:
+        """
+        Populate the table with loaded playlists.
+
+        Args:
+            results: Playlists to show
+            saved_at: When they were loaded, if they come from a snapshot
+        """
+        if isinstance(results, OfflineResult):
+            saved_at = results.synced_at
+
+        table = self.query_one(DataTable)
+        selected = self.playlists[table.cursor_row]['id'] if table.cursor_row < len(self.playlists) else None
+        self.playlists = results
+        self.loaded_at = time.time() if saved_at is None else saved_at
+        table.clear()
+
+        self.set_status(*freshness(results, saved_at))
+
+        if not results:
+            self.message_row(table, "No playlists found")
+            return
+
+        for playlist in results:
+            table.add_row(
+                playlist['title'][:40],
+                str(playlist['video_count']),
+                *stats_cells(self.stats.get(playlist['id'])),
+                playlist['description'][:40],
+                playlist['published_at']
+            )
+
+        # Keep the cursor on the playlist it was on before the refresh
+        for row, playlist in enumerate(results):
+            if playlist['id'] == selected:
+                table.move_cursor(row=row)
+                break
+
+        if saved_at is None:
+            self.compute_stats(results)
+
+    def compute_stats(self, playlists: list) -> None:
+        """Start bringing the stats of freshly loaded playlists up to date, in the background."""
+        config = load_config()
+        if not config["playlist_stats"]:
+            return
+        if self.stats_token is not None:
+            self.stats_token.cancel()
+        self.stats_token = CancelToken()
+        self.fetch_stats(self.stats_token, self.youtube, playlists,
+                         config["playlist_stats_max_items"], config["playlist_stats_ttl"])
+
+    @work(thread=True, exclusive=True, group="playlist-stats")
+    def fetch_stats(self, token: CancelToken, youtube, playlists: list, max_items: int, max_age: float) -> None:
+        """
+        Compute each playlist's stats off the UI thread, behind anything the user is waiting on.
+
+        Playlists whose ETag has not changed since their stats were stored,
+        less than max_age seconds ago, cost nothing; the rest are read in
+        full and their new or stale videos looked up.
+        """
+        changed = False
+        with request_priority(Priority.BACKGROUND), cancel_scope(token):
+            for playlist in playlists:
+                try:
+                    stats = youtube.get_playlist_stats(
+                        playlist['id'], playlist.get('etag'), max_items=max_items, max_age=max_age
+                    )
+                except RequestCancelled:
+                    return
+                except Exception:
+                    # Stats are extra; never let them take the app down. The next load tries again
+                    continue
+                if stats != self.stats.get(playlist['id']):
+                    changed = True
+                    self.app.call_from_thread(self.show_stats, youtube, playlist['id'], stats)
+
+        if changed and not token.cancelled:
+            self.app.call_from_thread(self.save_stats, youtube)
+
+    def show_stats(self, youtube, playlist_id: str, stats: dict) -> None:
+        """Fill in a playlist's stats cells, if its account is still the one shown."""
+        if youtube is not self.youtube:
+            return
+        self.stats[playlist_id] = stats
+
+        table = self.query_one(DataTable)
+        for row, playlist in enumerate(self.playlists):
+            if playlist['id'] == playlist_id:
+                for offset, cell in enumerate(stats_cells(stats)):
+                    table.update_cell_at(Coordinate(row, STATS_COLUMN + offset), cell)
+                break
+
+    def save_stats(self, youtube) -> None:
+        """Keep the stats shown, so they appear straight away next time."""
+        if youtube is self.youtube:
+            self.snapshots.save(self.stats_key(), self.stats)
+
+    def item_at(self, row_index: int) -> Optional[dict]:
+        """Get the playlist shown in a row."""
+        if 0 <= row_index < len(self.playlists):
+            return self.playlists[row_index]
+        return None
+
+    def apply_background_refresh(self, results: list) -> None:
+        """Show playlists refreshed in the background, unless a load is already on its way."""
+        if self.load_state.token is not None:
+            return
+        self.snapshots.save(self.snapshot_key(), results)
+        self.show_playlists(results)
+
+    def show_error(self, *lines: str) -> None:
+        """Report an error, keeping any playlists already shown."""
+        if self.playlists:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refresh failed")
+            self.app.notify(" ".join(lines), severity="error")
+            return
+
+        table = self.query_one(DataTable)
+        table.clear()
+        for line in lines:
+            self.message_row(table, line)
+
+    def cancel_prefetch(self) -> None:
+        """Stop waiting to prefetch, and abandon any prefetch in flight."""
+        if self._prefetch_timer is not None:
+            self._prefetch_timer.stop()
+            self._prefetch_timer = None
+        if self.prefetch_token is not None:
+            self.prefetch_token.cancel()
+            self.prefetch_token = None
+
+    def schedule_prefetch(self, row: int) -> None:
+        """Prefetch the playlists around a row once the cursor or mouse rests on it, dropping the last prefetch."""
+        self.cancel_prefetch()
+        if self.prefetch_enabled and self.playlists:
+            self._prefetch_timer = self.set_timer(PREFETCH_DELAY, lambda: self.start_prefetch(row))
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        """Prefetch around the cursor."""
+        self.schedule_prefetch(event.cursor_row)
+
+    def on_hover_changed(self, old: Coordinate, new: Coordinate) -> None:
+        """Prefetch around the row under the mouse."""
+        if new.row != old.row and 0 <= new.row < len(self.playlists):
+            self.schedule_prefetch(new.row)
+
+    def start_prefetch(self, row: int) -> None:
+        """Prefetch the playlist at a row, then its neighbors, skipping those already fetched."""
+        self._prefetch_timer = None
+        rows = [row]
+        for distance in range(1, PREFETCH_NEIGHBORS + 1):
+            rows += [row + distance, row - distance]
+
+        playlists = [
+            self.playlists[index] for index in rows
+            if 0 <= index < len(self.playlists)
+            and self.prefetched.get((self.youtube.account_id, self.playlists[index]['id'])) is None
+        ]
+        if playlists:
+            self.prefetch_token = CancelToken()
+            self.prefetch_playlists(self.prefetch_token, self.youtube, playlists)
+
+    @work(thread=True, exclusive=True, group="prefetch")
+    def prefetch_playlists(self, token: CancelToken, youtube, playlists: list) -> None:
+        """Fetch the first page of playlists off the UI thread, as quota allows, at prefetch priority."""
+        with request_priority(Priority.PREFETCH), cancel_scope(token):
+            for playlist in playlists:
+                if token.cancelled or not self.prefetch_budget.try_spend(PREFETCH_COST):
+                    return
+                try:
+                    videos = youtube.get_playlist_videos(playlist['id'], max_results=50)
+                except RequestCancelled:
+                    return
+                except Exception:
+                    # Speculative; a failure here must never take the app down
+                    continue
+                if not isinstance(videos, OfflineResult):
+                    self.prefetched.set((youtube.account_id, playlist['id']), videos)
 
     def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
         """Handle row selection - show playlist videos."""
@@ -173,10 +543,14 @@ class PlaylistsScreen(Static):
 
         playlist = self.playlists[row_index]
 
+        # A prefetch still running would hold the playlist's load at its priority
+        self.cancel_prefetch()
+
         # Push a new screen to show playlist videos
         screen = PlaylistVideosScreen(
             self.youtube,
             playlist['id'],
-            playlist['title']
+            playlist['title'],
+            prefetched=self.prefetched.get((self.youtube.account_id, playlist['id']))
         )
         self.app.push_screen(screen)
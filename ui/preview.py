@@ -0,0 +1,110 @@
+"""Preview pane showing the thumbnail of the highlighted row."""
+import threading
+from typing import Any, Dict, Optional
+
+from rich.color import Color
+from rich.style import Style
+from rich.text import Text
+from textual.widgets import Static
+
+from thumbnails import Cells, ThumbnailRenderer
+
+# Seconds the cursor must rest on a row before its thumbnail is fetched
+PREVIEW_DELAY = 0.15
+
+# Rows below the image taken by the caption
+CAPTION_ROWS = 3
+
+
+def cells_to_text(cells: Cells) -> Text:
+    """Draw half-block cells as Rich text."""
+    text = Text()
+    for index, row in enumerate(cells):
+        if index:
+            text.append("\n")
+        for top, bottom in row:
+            text.append("▀", Style(color=Color.from_rgb(*top), bgcolor=Color.from_rgb(*bottom)))
+    return text
+
+
+class ThumbnailPreview(Static):
+    """Side pane with the highlighted video's (or playlist's, or channel's) thumbnail."""
+
+    DEFAULT_CSS = """
+    ThumbnailPreview {
+        dock: right;
+        width: 44;
+        height: 100%;
+        padding: 1 1;
+        border-left: solid $primary;
+        background: $panel;
+    }
+    """
+
+    def __init__(self, renderer: ThumbnailRenderer):
+        """Initialize the pane, empty."""
+        super().__init__("", id="preview")
+        self.renderer = renderer
+        self.item: Optional[Dict[str, Any]] = None
+        self._timer = None
+
+    def show_item(self, item: Optional[Dict[str, Any]]) -> None:
+        """Preview an item once the cursor has rested on it."""
+        self.item = item
+        if self._timer is not None:
+            self._timer.stop()
+        self.update(self._caption())
+        if item is not None:
+            self._timer = self.set_timer(PREVIEW_DELAY, self._load)
+
+    def _caption(self) -> Text:
+        """Describe the item under the image."""
+        if self.item is None:
+            return Text("Nothing selected", style="dim")
+        caption = Text(self.item.get('title', ''), style="bold")
+        detail = self.item.get('channel') or self.item.get('description', '')
+        if detail:
+            caption.append("\n" + detail[:80], style="dim")
+        return caption
+
+    def _size(self) -> tuple:
+        """Get the cells available for the image."""
+        return max(1, self.content_size.width), max(1, self.content_size.height - CAPTION_ROWS)
+
+    def _load(self) -> None:
+        """Show the item's thumbnail, fetching and rendering it in the background if needed."""
+        self._timer = None
+        url = self.item.get('thumbnail') if self.item else None
+        if not url:
+            return
+        if not self.renderer.available:
+            self.update(Text("Install Pillow to see thumbnails\n\n", style="dim") + self._caption())
+            return
+
+        columns, rows = self._size()
+        cells = self.renderer.request(url, columns, rows, self._rendered)
+        if cells is not None:
+            self._show(url, cells)
+        else:
+            self.update(Text("Loading thumbnail...\n\n", style="dim") + self._caption())
+
+    def _rendered(self, url: str, cells: Optional[Cells]) -> None:
+        """Receive a rendered thumbnail from a worker thread."""
+        if threading.get_ident() == threading.main_thread().ident:
+            self._show(url, cells)
+        else:
+            self.app.call_from_thread(self._show, url, cells)
+
+    def _show(self, url: str, cells: Optional[Cells]) -> None:
+        """Draw a thumbnail, unless the cursor has moved on to another item."""
+        if self.item is None or self.item.get('thumbnail') != url:
+            return
+        if cells is None:
+            self.update(Text("Thumbnail unavailable\n\n", style="dim") + self._caption())
+            return
+        self.update(cells_to_text(cells) + Text("\n\n") + self._caption())
+
+    def on_resize(self) -> None:
+        """Redraw at the new size; each size is rendered once and remembered."""
+        if self.item is not None and self.display:
+            self.show_item(self.item)
@@ -1,39 +1,59 @@
 """Search screen for videos."""
-import webbrowser
+from textual import work
 from textual.app import ComposeResult
 from textual.containers import Container, Vertical, Horizontal
 from textual.widgets import Static, DataTable, Input, Button
 from textual.reactive import reactive
+from textual.worker import get_current_worker
 
-from youtube_api import YouTubeAPI, YouTubeAPIError
+from youtube_api import YouTubeAPI, YouTubeAPIError, OfflineResult
+from cache import TTLCache
+from scheduler import Priority, request_priority
+from cancellation import CancelToken, RequestCancelled, DeadlineExceeded
+from ui.loading import LoadState
+from config import load_config
+from ui.video_table import VideoTableView, setup_video_table, filter_input
+
+# Shortest query worth sending to YouTube while the user is still typing
+MIN_LIVE_QUERY_LENGTH = 3
 
 
 class SearchScreen(Static):
     """Search screen widget."""
 
     current_query: reactive[str] = reactive("")
+    local_mode: reactive[bool] = reactive(False)
     videos: reactive[list] = reactive([])
 
     def __init__(self, youtube_api: YouTubeAPI):
         """Initialize search screen."""
         super().__init__()
         self.youtube = youtube_api
+        self.load_state = LoadState()
+        self.view = VideoTableView()
+
+        config = load_config()
+        self.live_search = config["search_as_you_type"]
+        self.debounce = config["search_debounce_ms"] / 1000
+        self.query_cache = TTLCache(maxsize=64, ttl=config["search_cache_ttl"])
+        self._debounce_timer = None
 
     def compose(self) -> ComposeResult:
         """Compose the search screen."""
         with Vertical():
-            yield Static("🔍 Search YouTube", classes="info")
+            yield Static("🔍 Search YouTube", classes="info", id="search-status")
             with Horizontal():
                 yield Input(placeholder="Enter search query...", id="search-input")
                 yield Button("Search", variant="primary", id="search-btn")
+                yield Button("YouTube", variant="default", id="local-toggle")
+            yield filter_input()
             yield DataTable(id="search-results")
 
     def on_mount(self) -> None:
         """Set up the data table."""
         table = self.query_one(DataTable)
-        table.cursor_type = "row"
-        table.zebra_stripes = True
-        table.add_columns("Title", "Channel", "Duration", "Views", "Published")
+        setup_video_table(table)
+        self.view.watched = self.app.is_watched
 
         # Show helpful message
         table.add_row("Type a query and press Enter or click Search", "", "", "", "")
@@ -43,12 +63,79 @@ class SearchScreen(Static):
         if event.input.id == "search-input":
             self.perform_search()
 
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Search as the query is typed, or narrow results as the filter changes."""
+        if event.input.id == "search-input" and self.live_search:
+            self.search_as_you_type(event.value.strip())
+        elif event.input.id == "filter-input":
+            self.view.set_filter(event.value)
+            if self.videos:
+                self.view.render(self.query_one(DataTable))
+
+    def on_data_table_header_selected(self, event: DataTable.HeaderSelected) -> None:
+        """Sort the loaded results by the clicked column."""
+        self.view.toggle_sort(event.column_key.value)
+        if self.videos:
+            self.view.render(self.query_one(DataTable))
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Handle button press."""
         if event.button.id == "search-btn":
             self.perform_search()
+        elif event.button.id == "local-toggle":
+            self.local_mode = not self.local_mode
+            event.button.label = "Local" if self.local_mode else "YouTube"
+            event.button.variant = "success" if self.local_mode else "default"
+            if self.current_query:
+                self.perform_search()
+
+    def _cache_key(self, query: str) -> tuple:
+        """Get the query cache key for a query in the current mode."""
+        return ("local" if self.local_mode else "youtube", query.casefold())
+
+    def search_as_you_type(self, query: str) -> None:
+        """Handle a keystroke in the search input when live search is on."""
+        if self._debounce_timer is not None:
+            self._debounce_timer.stop()
+            self._debounce_timer = None
+
+        # Whatever is in flight is for a query the user has moved past
+        self.workers.cancel_group(self, "search")
+        self.load_state.cancel(resume=False)
+
+        if len(query) < MIN_LIVE_QUERY_LENGTH:
+            return
+
+        self.current_query = query
+
+        # Repeated or backspaced-to queries are answered instantly
+        cached = self.query_cache.get(self._cache_key(query))
+        if cached is not None:
+            self.show_results(cached)
+            return
+
+        if self.local_mode:
+            self.run_search(query, self.load_state.begin())
+            return
+
+        # Show what we already know locally while YouTube is asked
+        if self.youtube.search_index is not None:
+            try:
+                suggestions = self.youtube.search_local(query, max_results=25)
+            except YouTubeAPIError:
+                suggestions = []
+            if suggestions:
+                self.show_results(suggestions, status=f"🔍 Local matches for '{query}' - searching YouTube...")
+
+        self._debounce_timer = self.set_timer(self.debounce, lambda: self._debounced_search(query))
+
+    def _debounced_search(self, query: str) -> None:
+        """Send the remote search once typing has paused on query."""
+        self._debounce_timer = None
+        if query == self.current_query:
+            self.run_search(query, self.load_state.begin())
 
-    def perform_search(self) -> None:
+    def perform_search(self, use_cache: bool = True) -> None:
         """Perform the search."""
         search_input = self.query_one("#search-input", Input)
         query = search_input.value.strip()
@@ -56,60 +143,134 @@ class SearchScreen(Static):
         if not query:
             return
 
+        if self._debounce_timer is not None:
+            self._debounce_timer.stop()
+            self._debounce_timer = None
+
         self.current_query = query
+
+        if use_cache:
+            cached = self.query_cache.get(self._cache_key(query))
+            if cached is not None:
+                self.show_results(cached)
+                return
+
         table = self.query_one(DataTable)
         table.clear()
 
         # Show loading message
-        row_key = table.add_row("Searching...", "", "", "", "")
+        table.add_row("Searching...", "", "", "", "")
 
-        try:
-            # Perform search
-            results = self.youtube.search_videos(query, max_results=25)
-            self.videos = results
+        self.run_search(query, self.load_state.begin())
+
+    @work(thread=True, exclusive=True, group="search")
+    def run_search(self, query: str, token: CancelToken) -> None:
+        """
+        Run a search off the UI thread; superseded searches are discarded.
 
-            # Clear table and populate with results
-            table.clear()
+        Only complete results are cached. If the details of remote results
+        cannot be fetched, the snippet rows stay up, marked as such.
+        """
+        worker = get_current_worker()
+        key = self._cache_key(query)
+        phase = -1
 
-            if not results:
-                table.add_row("No results found", "", "", "", "")
+        def fail(message: str) -> None:
+            if worker.is_cancelled:
                 return
+            if phase >= 0:
+                # Keep the snippet rows already shown rather than blanking the table
+                self.app.call_from_thread(self.show_details_error, message)
+            else:
+                self.app.call_from_thread(self.show_error, message)
 
-            for video in results:
-                table.add_row(
-                    video['title'][:60],
-                    video['channel'][:30],
-                    video['duration'],
-                    video['view_count'],
-                    video['published_at']
-                )
+        try:
+            # Local mode answers from videos already seen, no quota used.
+            # Remote searches show snippet rows after the first round trip
+            # and fill in durations and views when the details arrive.
+            with request_priority(Priority.INTERACTIVE), self.load_state.running(token):
+                if self.local_mode:
+                    phases = iter([self.youtube.search_local(query, max_results=50)])
+                    status = "🔍 Search YouTube"
+                else:
+                    phases = self.youtube.search_videos_progressive(query, max_results=25)
+                    status = "🔍 Search YouTube - loading details..."
 
+                results = []
+                for phase, results in enumerate(phases):
+                    if worker.is_cancelled or query != self.current_query:
+                        return
+                    if isinstance(results, OfflineResult):
+                        status = "🔍 Offline - showing matches from the local index"
+                    if phase == 0:
+                        self.app.call_from_thread(self.show_results, results, status)
+                    else:
+                        self.app.call_from_thread(self.enrich_results, results)
+        except DeadlineExceeded:
+            fail("Error: Search timed out")
+            return
+        except RequestCancelled:
+            return
         except YouTubeAPIError as e:
-            table.clear()
-            table.add_row(f"Error: {e}", "", "", "", "")
+            fail(f"Error: {e}")
+            return
         except Exception as e:
-            table.clear()
-            table.add_row(f"Unexpected error: {e}", "", "", "", "")
-
-    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
-        """Handle row selection - open video in browser."""
-        if not self.videos:
+            fail(f"Unexpected error: {e}")
             return
 
-        row_index = event.cursor_row
-        if row_index >= len(self.videos):
+        if worker.is_cancelled or query != self.current_query:
+            return
+        if isinstance(results, OfflineResult):
+            # Offline answers should not stand in for YouTube's once back online
+            return
+        if not self.local_mode and phase == 0 and results:
+            # The connection went while the details loaded; snippets are all there is
+            self.app.call_from_thread(self.show_details_error, "offline")
             return
+        self.query_cache.set(key, results)
 
-        video = self.videos[row_index]
-        url = video['url']
+    def show_results(self, results: list, status: str = "🔍 Search YouTube") -> None:
+        """Populate the table with search results."""
+        if not results:
+            status = "🔍 Search YouTube"
+        self.videos = results
+        self.query_one("#search-status", Static).update(status)
 
-        try:
-            webbrowser.open(url)
-            self.app.notify(f"Opening: {video['title'][:50]}...")
-        except Exception as e:
-            self.app.notify(f"Failed to open browser: {e}", severity="error")
+        table = self.query_one(DataTable)
+        self.view.set_videos(results)
+        self.view.render(table)
+
+        if not results:
+            table.add_row("No results found", "", "", "", "")
+
+    def enrich_results(self, results: list) -> None:
+        """Fill in details for the rows already shown, in place."""
+        self.videos = results
+        self.query_one("#search-status", Static).update("🔍 Search YouTube")
+        self.view.update_videos(self.query_one(DataTable), results)
+
+    def show_details_error(self, message: str) -> None:
+        """Keep snippet-only rows on screen, noting that their details could not be loaded."""
+        self.query_one("#search-status", Static).update(
+            f"🔍 Search YouTube - details unavailable ({message})"
+        )
+
+    def show_error(self, message: str) -> None:
+        """Replace the table contents with an error message."""
+        table = self.query_one(DataTable)
+        table.clear()
+        table.add_row(message, "", "", "", "")
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        """Handle row selection - open video in browser."""
+        video = self.view.video_at(event.cursor_row)
+        if not video:
+            return
+
+        self.app.open_video(video)
+        self.view.refresh_row(event.data_table, event.cursor_row)
 
     def refresh_data(self) -> None:
         """Refresh search results."""
         if self.current_query:
-            self.perform_search()
+            self.perform_search(use_cache=False)
@@ -1,37 +1,109 @@
 """Subscriptions screen."""
-import webbrowser
+import time
+from typing import Optional
+
+from textual import work
 from textual.app import ComposeResult
-from textual.containers import Vertical
-from textual.widgets import Static, DataTable, Button
+from textual.containers import Horizontal, Vertical
+from textual.widgets import Static, DataTable, Button, Input
 from textual.reactive import reactive
+from textual.worker import get_current_worker
 
-from youtube_api import YouTubeAPI, YouTubeAPIError
+from youtube_api import YouTubeAPI, YouTubeAPIError, OfflineResult
+from account_manager import AccountManager
+from all_accounts import AllAccountsFeed
+from scheduler import Priority, request_priority
+from cancellation import CancelToken, RequestCancelled, DeadlineExceeded
+from snapshot_store import SnapshotStore, describe_age
+from ui.loading import LoadState, freshness
+from ui.video_table import VideoTableView, setup_video_table, filter_input
 
 
 class SubscriptionsScreen(Static):
     """Subscriptions screen widget."""
 
-    mode: reactive[str] = reactive("videos")  # "channels" or "videos"
+    TITLE = "📺 Your Subscriptions - Latest Videos"
+
+    mode: reactive[str] = reactive("videos")  # "channels", "videos" or "all" (every account's videos)
     subscriptions: reactive[list] = reactive([])
     videos: reactive[list] = reactive([])
 
-    def __init__(self, youtube_api: YouTubeAPI):
+    def __init__(self, youtube_api: YouTubeAPI, account_manager: Optional[AccountManager] = None):
         """Initialize subscriptions screen."""
         super().__init__()
         self.youtube = youtube_api
+        self.account_manager = account_manager
+        self.load_state = LoadState()
+        self.snapshots = SnapshotStore()
+        self.loaded_at: Optional[float] = None
+        self.view = VideoTableView()
 
     def compose(self) -> ComposeResult:
         """Compose the subscriptions screen."""
         with Vertical():
-            yield Static("📺 Your Subscriptions - Latest Videos", classes="info")
-            yield Button("Show Channels", variant="primary", id="toggle-mode")
+            yield Static(self.TITLE, id="screen-title", classes="info")
+            with Horizontal(classes="mode-buttons"):
+                yield Button("Show Channels", variant="primary", id="toggle-mode")
+                yield Button("All Accounts", id="toggle-all")
+            yield filter_input()
             yield DataTable(id="subscriptions-table")
 
     def on_mount(self) -> None:
-        """Set up the data table and load subscriptions."""
+        """Set up the data table, show the last snapshot and revalidate it."""
+        self.view.watched = self.app.is_watched
+        self.update_account_buttons()
         self.setup_videos_view()
+        self.show_snapshot()
         self.refresh_data()
 
+    def update_account_buttons(self) -> None:
+        """Offer the all-accounts feed only when there is more than one account."""
+        several = self.account_manager is not None and len(self.account_manager.get_all_accounts()) > 1
+        self.query_one("#toggle-all", Button).display = several
+
+    def snapshot_key(self, mode: Optional[str] = None) -> str:
+        """Get the snapshot key for a mode (the current one by default) and the current account."""
+        mode = mode or self.mode
+        if mode == "all":
+            return "subscriptions-all"
+        return f"subscriptions-{mode}-{self.youtube.account_id or 'default'}"
+
+    def show_snapshot(self) -> None:
+        """Show the last rows loaded for the current mode and account, if any were saved."""
+        self.subscriptions = []
+        self.videos = []
+        self.loaded_at = None
+        self.view.set_videos([])
+        self.view.new_ids = set()
+        self.query_one(DataTable).clear()
+        self.set_status()
+
+        snapshot = self.snapshots.load(self.snapshot_key())
+        if snapshot is None:
+            return
+
+        rows, saved_at = snapshot
+        if self.mode == "channels":
+            self.show_channels(rows, saved_at=saved_at)
+        else:
+            self.show_videos(rows, saved_at=saved_at)
+
+    def set_status(self, *parts: str) -> None:
+        """Show how fresh the table is next to the screen title."""
+        self.query_one("#screen-title", Static).update(" · ".join((self.TITLE,) + parts))
+
+    def shown_rows(self) -> list:
+        """Get the rows loaded for the current mode."""
+        return self.subscriptions if self.mode == "channels" else self.videos
+
+    def item_at(self, row_index: int) -> Optional[dict]:
+        """Get the channel or video shown in a row."""
+        if self.mode != "channels":
+            return self.view.video_at(row_index)
+        if 0 <= row_index < len(self.subscriptions):
+            return self.subscriptions[row_index]
+        return None
+
     def setup_channels_view(self) -> None:
         """Set up table for channels view."""
         table = self.query_one(DataTable)
@@ -42,35 +114,53 @@ class SubscriptionsScreen(Static):
 
     def setup_videos_view(self) -> None:
         """Set up table for videos view."""
-        table = self.query_one(DataTable)
-        table.clear(columns=True)
-        table.cursor_type = "row"
-        table.zebra_stripes = True
-        table.add_columns("Title", "Channel", "Duration", "Views", "Published")
+        setup_video_table(self.query_one(DataTable))
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Handle button press to toggle between views."""
         if event.button.id == "toggle-mode":
-            if self.mode == "channels":
-                self.mode = "videos"
-                event.button.label = "Show Channels"
-                self.setup_videos_view()
-                self.load_videos()
-            else:
-                self.mode = "channels"
-                event.button.label = "Show Latest Videos"
-                self.setup_channels_view()
-                self.load_channels()
+            self.switch_mode("videos" if self.mode == "channels" else "channels")
+        elif event.button.id == "toggle-all":
+            self.switch_mode("videos" if self.mode == "all" else "all")
+
+    def switch_mode(self, mode: str) -> None:
+        """Show another view, starting from its snapshot."""
+        self.mode = mode
+        self.query_one("#toggle-mode", Button).label = (
+            "Show Latest Videos" if mode == "channels" else "Show Channels"
+        )
+        self.query_one("#toggle-all", Button).label = "This Account" if mode == "all" else "All Accounts"
+
+        if mode == "channels":
+            self.setup_channels_view()
+        else:
+            self.setup_videos_view()
+        self.show_snapshot()
+        self.refresh_data()
 
     def refresh_data(self) -> None:
         """Refresh current view."""
         if self.mode == "channels":
             self.load_channels()
+        elif self.mode == "all":
+            self.load_all_accounts()
         else:
             self.load_videos()
 
     def load_channels(self) -> None:
-        """Load subscribed channels."""
+        """Load subscribed channels, keeping any shown until the new ones arrive."""
+        if self.subscriptions:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refreshing...")
+        else:
+            table = self.query_one(DataTable)
+            table.clear()
+            table.add_row("Loading subscriptions...", "", "")
+
+        self.fetch_channels(self.load_state.begin(), self.snapshot_key("channels"))
+
+    @work(thread=True, exclusive=True, group="load")
+    def fetch_channels(self, token: CancelToken, snapshot_key: str) -> None:
+        """Fetch subscribed channels off the UI thread, saving them under snapshot_key."""
         import logging
         from pathlib import Path
 
@@ -85,51 +175,94 @@ class SubscriptionsScreen(Static):
         logger = logging.getLogger(__name__)
 
         logger.info("=== LOAD SUBSCRIPTION CHANNELS ===")
-
-        table = self.query_one(DataTable)
-        table.clear()
-        table.add_row("Loading subscriptions...", "", "")
+        worker = get_current_worker()
 
         try:
             logger.info("Calling get_subscriptions(max_results=50)...")
-            results = self.youtube.get_subscriptions(max_results=50)
+            with request_priority(Priority.VISIBLE), self.load_state.running(token):
+                results = self.youtube.get_subscriptions(max_results=50)
             logger.info(f"Got {len(results)} subscriptions")
-            self.subscriptions = results
-
-            table.clear()
-
-            if not results:
-                logger.warning("No subscriptions found")
-                table.add_row("No subscriptions found", "", "")
-                return
 
             for i, sub in enumerate(results):
                 logger.info(f"Subscription {i+1}: {sub['title'][:40]}")
-                table.add_row(
-                    sub['title'][:40],
-                    sub['description'][:80],
-                    sub['published_at']
-                )
+
+            if not worker.is_cancelled and not token.cancelled:
+                if not isinstance(results, OfflineResult):
+                    self.snapshots.save(snapshot_key, results)
+                self.app.call_from_thread(self.show_channels, results)
 
             logger.info(f"Successfully loaded {len(results)} subscriptions")
             logger.info("===================\n")
 
+        except DeadlineExceeded:
+            logger.error("Load timed out")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, "Error: Timed out loading subscriptions")
+        except RequestCancelled:
+            logger.info("Load cancelled")
         except YouTubeAPIError as e:
             logger.error(f"YouTubeAPIError: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            table.clear()
-            table.add_row(f"Error: {e}", "", "")
-            table.add_row("Note: You need to be authenticated to view subscriptions", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(
+                    self.show_error,
+                    f"Error: {e}",
+                    "Note: You need to be authenticated to view subscriptions"
+                )
         except Exception as e:
             logger.error(f"Unexpected error: {type(e).__name__}: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            table.clear()
-            table.add_row(f"Unexpected error: {e}", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Unexpected error: {e}")
+
+    def show_channels(self, results: list, saved_at: Optional[float] = None) -> None:
+        """
+        Populate the table with subscribed channels.
+
+        Args:
+            results: Subscriptions to show
+            saved_at: When they were loaded, if they come from a snapshot
+        """
+        if isinstance(results, OfflineResult):
+            saved_at = results.synced_at
+
+        if self.mode != "channels":
+            return
+
+        table = self.query_one(DataTable)
+        self.subscriptions = results
+        self.loaded_at = time.time() if saved_at is None else saved_at
+        table.clear()
+
+        self.set_status(*freshness(results, saved_at))
+
+        if not results:
+            table.add_row("No subscriptions found", "", "")
+            return
+
+        for sub in results:
+            table.add_row(
+                sub['title'][:40],
+                sub['description'][:80],
+                sub['published_at']
+            )
 
     def load_videos(self) -> None:
-        """Load recent videos from subscriptions."""
+        """Load recent videos from subscriptions, keeping any shown until the new ones arrive."""
+        if self.videos:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refreshing...")
+        else:
+            table = self.query_one(DataTable)
+            table.clear()
+            table.add_row("Loading videos from subscriptions...", "", "", "", "")
+
+        self.fetch_videos(self.load_state.begin(), self.snapshot_key("videos"))
+
+    @work(thread=True, exclusive=True, group="load")
+    def fetch_videos(self, token: CancelToken, snapshot_key: str) -> None:
+        """Fetch recent subscription videos off the UI thread, saving them under snapshot_key."""
         import logging
         from pathlib import Path
 
@@ -144,67 +277,197 @@ class SubscriptionsScreen(Static):
         logger = logging.getLogger(__name__)
 
         logger.info("=== LOAD SUBSCRIPTION VIDEOS ===")
-
-        table = self.query_one(DataTable)
-        table.clear()
-        table.add_row("Loading videos from subscriptions...", "", "", "", "")
+        worker = get_current_worker()
 
         try:
             logger.info("Calling get_subscription_videos(max_results=50)...")
-            results = self.youtube.get_subscription_videos(max_results=50)
+            with request_priority(Priority.VISIBLE), self.load_state.running(token):
+                results = self.youtube.get_subscription_videos(max_results=50)
             logger.info(f"Got {len(results)} videos")
-            self.videos = results
-
-            table.clear()
 
             if not results:
                 logger.warning("No videos found in results")
-                table.add_row("No videos found", "", "", "", "")
-                return
 
             for i, video in enumerate(results):
                 logger.info(f"Video {i+1}: {video['title'][:40]} - {video['channel']}")
-                table.add_row(
-                    video['title'][:60],
-                    video['channel'][:30],
-                    video['duration'],
-                    video['view_count'],
-                    video['published_at']
-                )
+
+            if not worker.is_cancelled and not token.cancelled:
+                if not isinstance(results, OfflineResult):
+                    self.snapshots.save(snapshot_key, results)
+                self.app.call_from_thread(self.show_videos, results)
 
             logger.info(f"Successfully loaded {len(results)} videos")
             logger.info("===================\n")
 
+        except DeadlineExceeded:
+            logger.error("Load timed out")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, "Error: Timed out loading subscription videos")
+        except RequestCancelled:
+            logger.info("Load cancelled")
         except YouTubeAPIError as e:
             logger.error(f"YouTubeAPIError: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            table.clear()
-            table.add_row(f"Error: {e}", "", "", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Error: {e}")
         except Exception as e:
             logger.error(f"Unexpected error: {type(e).__name__}: {e}")
             import traceback
             logger.error(traceback.format_exc())
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Unexpected error: {e}")
+
+    def load_all_accounts(self) -> None:
+        """Load every account's recent videos into one feed, keeping any shown until they arrive."""
+        if self.videos:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refreshing...")
+        else:
+            table = self.query_one(DataTable)
             table.clear()
-            table.add_row(f"Unexpected error: {e}", "", "", "", "")
+            table.add_row("Loading videos from all accounts...", "", "", "", "")
+
+        self.fetch_all_accounts(self.load_state.begin(), self.snapshot_key("all"))
+
+    @work(thread=True, exclusive=True, group="load")
+    def fetch_all_accounts(self, token: CancelToken, snapshot_key: str) -> None:
+        """Fetch the feed of every account off the UI thread, showing it as accounts finish."""
+        worker = get_current_worker()
+        results = []
+        try:
+            with request_priority(Priority.VISIBLE), self.load_state.running(token):
+                apis = []
+                for account in self.account_manager.get_all_accounts():
+                    api = self.account_manager.get_api(account, self.youtube)
+                    if api is not None:
+                        apis.append(api)
+
+                feed = AllAccountsFeed(apis, max_results=50)
+                for results in feed.phases():
+                    if worker.is_cancelled or token.cancelled:
+                        return
+                    self.app.call_from_thread(self.show_videos, results)
+                    if feed.pending:
+                        self.app.call_from_thread(
+                            self.set_status, f"{len(apis) - feed.pending}/{len(apis)} accounts", "loading..."
+                        )
+        except DeadlineExceeded:
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, "Error: Timed out loading videos from all accounts")
+            return
+        except RequestCancelled:
+            return
+        except Exception as e:
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Error: {e}")
+            return
+
+        if worker.is_cancelled or token.cancelled:
+            return
+        if not results:
+            self.app.call_from_thread(self.show_videos, results)
+        self.snapshots.save(snapshot_key, results)
+        if feed.failed_accounts:
+            self.app.call_from_thread(
+                self.app.notify, f"{len(feed.failed_accounts)} account(s) could not be loaded", severity="warning"
+            )
+
+    def show_videos(self, results: list, saved_at: Optional[float] = None) -> None:
+        """
+        Populate the table with subscription videos.
+
+        Args:
+            results: Videos to show
+            saved_at: When they were loaded, if they come from a snapshot
+        """
+        if isinstance(results, OfflineResult):
+            saved_at = results.synced_at
+
+        if self.mode == "channels":
+            return
+
+        table = self.query_one(DataTable)
+        self.videos = results
+        self.loaded_at = time.time() if saved_at is None else saved_at
+        self.view.new_ids = self.app.new_videos(results, self.view.new_ids)
+        self.view.replace_videos(table, results)
+
+        if not results:
+            table.add_row("No videos found", "", "", "", "")
+
+        self.set_status(*freshness(results, saved_at))
+        if saved_at is not None or self.mode == "all":
+            return
+
+        failed = len(self.youtube.last_failed_channels)
+        if failed:
+            self.app.notify(f"{failed} channel(s) could not be loaded", severity="warning")
+
+    def apply_background_refresh(self, new_videos: list) -> int:
+        """
+        Merge uploads found in the background into the shown feed.
+
+        Args:
+            new_videos: Newly uploaded videos
+
+        Returns:
+            How many of them were added
+        """
+        if self.mode != "videos" or self.load_state.token is not None or not new_videos:
+            return 0
+
+        shown_ids = {video['id'] for video in self.videos}
+        added = [video for video in new_videos if video['id'] not in shown_ids]
+        if not added:
+            return 0
+
+        merged = sorted(added + list(self.videos), key=lambda x: x['published_at'], reverse=True)[:50]
+        self.videos = merged
+        self.view.new_ids = self.app.new_videos(merged, self.view.new_ids)
+        self.view.replace_videos(self.query_one(DataTable), merged)
+        self.snapshots.save(self.snapshot_key(), merged)
+        return len(added)
+
+    def show_error(self, *lines: str) -> None:
+        """Report an error, keeping any rows already shown."""
+        if self.shown_rows():
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refresh failed")
+            self.app.notify(" ".join(lines), severity="error")
+            return
+
+        table = self.query_one(DataTable)
+        blanks = [""] * (len(table.columns) - 1)
+        table.clear()
+        for line in lines:
+            table.add_row(line, *blanks)
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Narrow the loaded videos as the filter text changes."""
+        if event.input.id == "filter-input":
+            self.view.set_filter(event.value)
+            if self.mode != "channels" and self.videos:
+                self.view.render(self.query_one(DataTable))
+
+    def on_data_table_header_selected(self, event: DataTable.HeaderSelected) -> None:
+        """Sort the loaded videos by the clicked column."""
+        if self.mode == "channels":
+            return
+        self.view.toggle_sort(event.column_key.value)
+        if self.videos:
+            self.view.render(self.query_one(DataTable))
 
     def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
         """Handle row selection."""
         row_index = event.cursor_row
 
-        if self.mode == "videos":
+        if self.mode != "channels":
             # Open video
-            if not self.videos or row_index >= len(self.videos):
+            video = self.view.video_at(row_index)
+            if not video:
                 return
 
-            video = self.videos[row_index]
-            url = video['url']
-
-            try:
-                webbrowser.open(url)
-                self.app.notify(f"Opening: {video['title'][:50]}...")
-            except Exception as e:
-                self.app.notify(f"Failed to open browser: {e}", severity="error")
+            self.app.open_video(video)
+            self.view.refresh_row(event.data_table, row_index)
         else:
             # Open channel
             if not self.subscriptions or row_index >= len(self.subscriptions):
@@ -212,9 +475,4 @@ class SubscriptionsScreen(Static):
 
             channel = self.subscriptions[row_index]
             url = f"https://www.youtube.com/channel/{channel['channel_id']}"
-
-            try:
-                webbrowser.open(url)
-                self.app.notify(f"Opening: {channel['title'][:50]}...")
-            except Exception as e:
-                self.app.notify(f"Failed to open browser: {e}", severity="error")
+            self.app.open_page(url, channel['title'])
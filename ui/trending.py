@@ -1,84 +1,272 @@
 """Trending videos screen."""
-import webbrowser
+import time
+from typing import Optional
+
+from textual import work
 from textual.app import ComposeResult
-from textual.containers import Vertical
-from textual.widgets import Static, DataTable
+from textual.containers import Horizontal, Vertical
+from textual.widgets import Static, DataTable, Input, Select
 from textual.reactive import reactive
+from textual.worker import get_current_worker
 
-from youtube_api import YouTubeAPI, YouTubeAPIError
+from youtube_api import YouTubeAPI, YouTubeAPIError, OfflineResult
+from scheduler import Priority, request_priority
+from cancellation import CancelToken, RequestCancelled, DeadlineExceeded, cancel_scope
+from config import load_config
+from snapshot_store import SnapshotStore, describe_age
+from trending_charts import TrendingCharts, Chart, CATEGORY_NAMES
+from ui.loading import LoadState, freshness
+from ui.video_table import VideoTableView, setup_video_table, filter_input
 
 
 class TrendingScreen(Static):
     """Trending videos screen widget."""
 
+    TITLE = "🔥 Trending Videos"
+
+    DEFAULT_CSS = """
+    TrendingScreen .chart-bar {
+        height: auto;
+    }
+
+    TrendingScreen .chart-bar Select {
+        width: 32;
+        margin-right: 1;
+    }
+    """
+
     videos: reactive[list] = reactive([])
 
     def __init__(self, youtube_api: YouTubeAPI):
         """Initialize trending screen."""
         super().__init__()
         self.youtube = youtube_api
+        self.load_state = LoadState()
+        self.snapshots = SnapshotStore()
+        self.loaded_at: Optional[float] = None
+        self.view = VideoTableView()
+        self.prefetch_token: Optional[CancelToken] = None
+
+        config = load_config()
+        self.regions = config["trending_regions"] or ["US"]
+        self.categories = config["trending_categories"] or [""]
+        self.chart: Chart = (self.regions[0], self.categories[0])
+        self.charts = TrendingCharts(
+            max_results=config["trending_max_results"],
+            chart_ttl=config["trending_chart_ttl"],
+            category_ttl=config["trending_category_ttl"]
+        )
 
     def compose(self) -> ComposeResult:
         """Compose the trending screen."""
         with Vertical():
-            yield Static("🔥 Trending Videos", classes="info")
+            yield Static(self.TITLE, id="screen-title", classes="info")
+            with Horizontal(classes="chart-bar"):
+                yield Select(
+                    [(region, region) for region in self.regions],
+                    value=self.chart[0], allow_blank=False, id="trending-region"
+                )
+                yield Select(
+                    [(CATEGORY_NAMES.get(category, category), category) for category in self.categories],
+                    value=self.chart[1], allow_blank=False, id="trending-category"
+                )
+            yield filter_input()
             yield DataTable(id="trending-table")
 
     def on_mount(self) -> None:
-        """Set up the data table and load trending videos."""
+        """Set up the data table, show the last snapshot and revalidate it."""
         table = self.query_one(DataTable)
-        table.cursor_type = "row"
-        table.zebra_stripes = True
-        table.add_columns("Title", "Channel", "Duration", "Views", "Published")
+        setup_video_table(table)
+        self.view.watched = self.app.is_watched
 
+        self.show_snapshot()
         self.refresh_data()
 
+    def all_charts(self) -> list:
+        """Get every chart offered, the selected one first."""
+        charts = [(region, category) for region in self.regions for category in self.categories]
+        charts.remove(self.chart)
+        return [self.chart] + charts
+
+    def snapshot_key(self, chart: Optional[Chart] = None) -> str:
+        """Get the snapshot key for a chart (the selected one by default) and the current account."""
+        region, category = chart or self.chart
+        return f"trending-{self.youtube.account_id or 'default'}-{region}-{category or 'all'}"
+
+    def show_snapshot(self) -> None:
+        """Show the last videos loaded for the selected chart and current account, if any were saved."""
+        snapshot = self.snapshots.load(self.snapshot_key())
+        if snapshot is None:
+            self.videos = []
+            self.loaded_at = None
+            self.view.set_videos([])
+            self.query_one(DataTable).clear()
+            self.set_status()
+            return
+
+        videos, saved_at = snapshot
+        self.show_videos(videos, saved_at=saved_at)
+
+    def set_status(self, *parts: str) -> None:
+        """Show how fresh the table is next to the screen title."""
+        self.query_one("#screen-title", Static).update(" · ".join((self.TITLE,) + parts))
+
+    def on_select_changed(self, event: Select.Changed) -> None:
+        """Switch charts, straight from cache when it holds the chart."""
+        if event.select.id == "trending-region":
+            chart = (event.value, self.chart[1])
+        elif event.select.id == "trending-category":
+            chart = (self.chart[0], event.value)
+        else:
+            return
+        if chart == self.chart:
+            return
+
+        self.chart = chart
+        cached = self.charts.cached(self.youtube, chart)
+        if cached is not None:
+            self.load_state.cancel(resume=False)
+            videos, fetched_at = cached
+            self.show_videos(videos, saved_at=fetched_at)
+            return
+
+        self.show_snapshot()
+        self.load_chart(force=False)
+
     def refresh_data(self) -> None:
-        """Load trending videos."""
-        table = self.query_one(DataTable)
-        table.clear()
-        table.add_row("Loading trending videos...", "", "", "", "")
+        """Reload the selected chart, keeping any videos shown until the new ones arrive."""
+        self.load_chart(force=True)
 
-        try:
-            results = self.youtube.get_trending_videos(max_results=25)
-            self.videos = results
+    def load_chart(self, force: bool) -> None:
+        """
+        Load the selected chart, then warm the cache with the other charts.
 
+        Args:
+            force: Fetch the selected chart even if it is cached
+        """
+        if self.videos:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refreshing...")
+        else:
+            table = self.query_one(DataTable)
             table.clear()
+            table.add_row("Loading trending videos...", "", "", "", "")
 
-            if not results:
-                table.add_row("No trending videos found", "", "", "", "")
-                return
-
-            for video in results:
-                table.add_row(
-                    video['title'][:60],
-                    video['channel'][:30],
-                    video['duration'],
-                    video['view_count'],
-                    video['published_at']
-                )
+        if force:
+            self.charts.invalidate(self.youtube, self.chart)
+        if self.prefetch_token is not None:
+            self.prefetch_token.cancel()
+        self.prefetch_token = CancelToken()
+        self.fetch_videos(self.load_state.begin(), self.prefetch_token, self.chart)
+
+    @work(thread=True, exclusive=True, group="load")
+    def fetch_videos(self, token: CancelToken, prefetch_token: CancelToken, chart: Chart) -> None:
+        """
+        Fetch a trending chart off the UI thread, then the other charts in the background.
 
+        The other charts are fetched under their own token, with no deadline,
+        which the next load cancels.
+        """
+        worker = get_current_worker()
+
+        try:
+            with request_priority(Priority.VISIBLE), self.load_state.running(token):
+                results = self.charts.fetch(self.youtube, chart)
+        except DeadlineExceeded:
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, "Error: Timed out loading trending videos")
+            return
+        except RequestCancelled:
+            return
         except YouTubeAPIError as e:
-            table.clear()
-            table.add_row(f"Error: {e}", "", "", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Error: {e}")
+            return
         except Exception as e:
-            table.clear()
-            table.add_row(f"Unexpected error: {e}", "", "", "", "")
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.show_error, f"Unexpected error: {e}")
+            return
 
-    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
-        """Handle row selection - open video in browser."""
-        if not self.videos:
+        if worker.is_cancelled or token.cancelled:
             return
+        if not isinstance(results, OfflineResult):
+            self.snapshots.save(self.snapshot_key(chart), results)
+        self.app.call_from_thread(self.show_chart, chart, results)
+
+        # Fetch the charts not shown yet, so switching to them is instant
+        others = [other for other in self.all_charts() if other != chart]
+        try:
+            with request_priority(Priority.PREFETCH), cancel_scope(prefetch_token):
+                self.charts.fetch_all(self.youtube, others)
+        except RequestCancelled:
+            pass
+        except Exception:
+            # The visible chart is shown; warming the others is only a nicety
+            pass
+
+    def show_chart(self, chart: Chart, results: list) -> None:
+        """Show a loaded chart, if it is still the one selected."""
+        if chart == self.chart:
+            self.show_videos(results)
+
+    def show_videos(self, results: list, saved_at: Optional[float] = None) -> None:
+        """
+        Populate the table with loaded videos.
+
+        Args:
+            results: Videos to show
+            saved_at: When they were loaded, if they come from a snapshot or cache
+        """
+        if isinstance(results, OfflineResult):
+            saved_at = results.synced_at
+
+        table = self.query_one(DataTable)
+        self.videos = results
+        self.loaded_at = time.time() if saved_at is None else saved_at
+        self.view.replace_videos(table, results)
 
-        row_index = event.cursor_row
-        if row_index >= len(self.videos):
+        if not results:
+            table.add_row("No trending videos found", "", "", "", "")
+
+        self.set_status(*freshness(results, saved_at))
+
+    def apply_background_refresh(self, results: list) -> None:
+        """Take the chart refreshed in the background: the one shown first (see refresher_options)."""
+        chart = (self.regions[0], self.categories[0])
+        self.charts.store(self.youtube, chart, results)
+        self.snapshots.save(self.snapshot_key(chart), results)
+        if chart == self.chart and self.load_state.token is None:
+            self.show_videos(results)
+
+    def show_error(self, *lines: str) -> None:
+        """Report an error, keeping any videos already shown."""
+        if self.videos:
+            self.set_status(f"from {describe_age(self.loaded_at)}", "refresh failed")
+            self.app.notify(" ".join(lines), severity="error")
             return
 
-        video = self.videos[row_index]
-        url = video['url']
+        table = self.query_one(DataTable)
+        table.clear()
+        for line in lines:
+            table.add_row(line, "", "", "", "")
 
-        try:
-            webbrowser.open(url)
-            self.app.notify(f"Opening: {video['title'][:50]}...")
-        except Exception as e:
-            self.app.notify(f"Failed to open browser: {e}", severity="error")
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Narrow the loaded videos as the filter text changes."""
+        if event.input.id == "filter-input":
+            self.view.set_filter(event.value)
+            if self.videos:
+                self.view.render(self.query_one(DataTable))
+
+    def on_data_table_header_selected(self, event: DataTable.HeaderSelected) -> None:
+        """Sort the loaded videos by the clicked column."""
+        self.view.toggle_sort(event.column_key.value)
+        if self.videos:
+            self.view.render(self.query_one(DataTable))
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        """Handle row selection - open video in browser."""
+        video = self.view.video_at(event.cursor_row)
+        if not video:
+            return
+
+        self.app.open_video(video)
+        self.view.refresh_row(event.data_table, event.cursor_row)
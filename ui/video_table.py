@@ -0,0 +1,163 @@
+"""Shared helpers for screens that show a list of videos in a DataTable."""
+from typing import Callable, List, Dict, Optional, Set, Any
+
+from textual.coordinate import Coordinate
+from textual.widgets import DataTable, Input
+
+from video_index import VideoIndex, DESCENDING_BY_DEFAULT
+
+VIDEO_COLUMNS = [
+    ("Title", "title"),
+    ("Channel", "channel"),
+    ("Duration", "duration"),
+    ("Views", "views"),
+    ("Published", "published"),
+]
+
+# Prefix of the titles of videos already watched
+WATCHED_MARK = "✓ "
+
+# Prefix of the titles of videos shown for the first time
+NEW_MARK = "● "
+
+
+def setup_video_table(table: DataTable) -> None:
+    """Reset a table to the standard video columns."""
+    table.clear(columns=True)
+    table.cursor_type = "row"
+    table.zebra_stripes = True
+    for label, key in VIDEO_COLUMNS:
+        table.add_column(label, key=key)
+
+
+def video_row(video: Dict[str, Any], watched: bool = False, new: bool = False) -> tuple:
+    """Get the display cells for a video, its title marked if it was watched or is new."""
+    title = video['title']
+    if watched:
+        title = WATCHED_MARK + title
+    elif new:
+        title = NEW_MARK + title
+    return (
+        title[:60],
+        video['channel'][:30],
+        video['duration'],
+        video['view_count'],
+        video['published_at']
+    )
+
+
+def filter_input() -> Input:
+    """Create the filter bar shown above a video table."""
+    return Input(placeholder="Filter loaded results...", id="filter-input", classes="filter-bar")
+
+
+class VideoTableView:
+    """Filter and sort state for a table of loaded videos."""
+
+    def __init__(self, watched: Optional[Callable[[str], bool]] = None):
+        """
+        Initialize with no videos.
+
+        Args:
+            watched: Tells whether a video ID was watched, to mark its row
+        """
+        self.watched = watched
+        # Videos to badge as new, chosen by the screen
+        self.new_ids: Set[str] = set()
+        self.index = VideoIndex([])
+        self.filter_text = ""
+        self.sort_column: Optional[str] = None
+        self.reverse = False
+        self.visible: List[Dict[str, Any]] = []
+
+    def row(self, video: Dict[str, Any]) -> tuple:
+        """Get the display cells for a video, marked if it was watched or is new."""
+        return video_row(
+            video,
+            watched=self.watched is not None and self.watched(video['id']),
+            new=video['id'] in self.new_ids
+        )
+
+    def set_videos(self, videos: List[Dict[str, Any]]) -> None:
+        """Replace the loaded videos and rebuild the index."""
+        self.index = VideoIndex(videos)
+
+    def set_filter(self, text: str) -> None:
+        """Set the filter text."""
+        self.filter_text = text
+
+    def toggle_sort(self, column: str) -> None:
+        """Sort by column, flipping direction if it is already the sort column."""
+        if self.sort_column == column:
+            self.reverse = not self.reverse
+        else:
+            self.sort_column = column
+            self.reverse = column in DESCENDING_BY_DEFAULT
+
+    def render(self, table: DataTable) -> None:
+        """Fill the table with the videos matching the current filter and sort."""
+        self.visible = self.index.query(self.filter_text, self.sort_column, self.reverse)
+
+        table.clear()
+        if not self.visible and len(self.index):
+            table.add_row("No loaded videos match the filter", "", "", "", "")
+            return
+        table.add_rows(self.row(video) for video in self.visible)
+
+    def update_videos(self, table: DataTable, videos: List[Dict[str, Any]]) -> None:
+        """
+        Swap in updated copies of loaded videos, changing only cells that differ.
+
+        Videos are matched by ID; loaded videos without an update are kept.
+        If the table is sorted, the order may change, so it is re-rendered.
+        """
+        updates = {video['id']: video for video in videos}
+        self.index = VideoIndex([updates.get(video['id'], video) for video in self.index.videos])
+
+        if self.sort_column is not None:
+            self.render(table)
+            return
+
+        for row, video in enumerate(self.visible):
+            updated = updates.get(video['id'])
+            if updated is None:
+                continue
+            for column, (old, new) in enumerate(zip(self.row(video), self.row(updated))):
+                if old != new:
+                    table.update_cell_at(Coordinate(row, column), new)
+            self.visible[row] = updated
+
+    def refresh_row(self, table: DataTable, row_index: int) -> None:
+        """Redraw the title of a row, e.g. after its video was watched."""
+        video = self.video_at(row_index)
+        if video is not None:
+            table.update_cell_at(Coordinate(row_index, 0), self.row(video)[0])
+
+    def replace_videos(self, table: DataTable, videos: List[Dict[str, Any]]) -> None:
+        """
+        Show a fresh load in place of the loaded videos.
+
+        If it holds the same videos in the same order, only the cells that
+        changed are redrawn. Otherwise the table is re-rendered, keeping the
+        cursor on the same video where it is still present.
+        """
+        loaded_ids = [video['id'] for video in self.index.videos]
+        if loaded_ids and loaded_ids == [video['id'] for video in videos]:
+            self.update_videos(table, videos)
+            return
+
+        current = self.video_at(table.cursor_row)
+        self.set_videos(videos)
+        self.render(table)
+
+        if current is not None:
+            for row, video in enumerate(self.visible):
+                if video['id'] == current['id']:
+                    table.move_cursor(row=row)
+                    break
+
+    def video_at(self, row_index: int) -> Optional[Dict[str, Any]]:
+        """Get the video shown at a table row."""
+        if 0 <= row_index < len(self.visible):
+            return self.visible[row_index]
+        return None
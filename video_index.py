@@ -0,0 +1,128 @@
+"""In-memory filter and sort index over a loaded list of videos."""
+import re
+from bisect import bisect_left
+from typing import List, Dict, Optional, Any, Set
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Sort keys per table column, using the raw values from YouTubeAPI._parse_video
+# rather than the formatted display strings ("1.2M", "4:05").
+SORT_KEYS = {
+    'title': lambda video: video.get('title', '').casefold(),
+    'channel': lambda video: video.get('channel', '').casefold(),
+    'duration': lambda video: video.get('duration_seconds', 0),
+    'views': lambda video: video.get('views', 0),
+    'published': lambda video: video.get('published_ts', 0.0),
+}
+
+# Columns where the natural first click is "biggest / newest first"
+DESCENDING_BY_DEFAULT = {'duration', 'views', 'published'}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class VideoIndex:
+    """Prebuilt token index and sort orders over a list of videos.
+
+    Every word of a video's title and channel is indexed once, so filtering
+    is a few set intersections instead of a scan over every row. Each query
+    term matches any indexed word it is a prefix of, which makes the filter
+    behave naturally while the user is still typing.
+    """
+
+    def __init__(self, videos: List[Dict[str, Any]]):
+        """Build the index for a list of video dictionaries."""
+        self.videos = list(videos)
+
+        postings: Dict[str, Set[int]] = {}
+        for position, video in enumerate(self.videos):
+            text = f"{video.get('title', '')} {video.get('channel', '')}"
+            for token in set(tokenize(text)):
+                postings.setdefault(token, set()).add(position)
+
+        self._postings = postings
+        self._tokens = sorted(postings)
+        self._term_cache: Dict[str, Set[int]] = {}
+        self._orders: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.videos)
+
+    def _term_matches(self, term: str) -> Set[int]:
+        """Get positions of videos with a word starting with term."""
+        cached = self._term_cache.get(term)
+        if cached is not None:
+            return cached
+
+        matches: Set[int] = set()
+        tokens = self._tokens
+        i = bisect_left(tokens, term)
+        while i < len(tokens) and tokens[i].startswith(term):
+            matches |= self._postings[tokens[i]]
+            i += 1
+
+        self._term_cache[term] = matches
+        return matches
+
+    def match(self, query: str) -> Optional[Set[int]]:
+        """
+        Get positions of videos matching every term of query.
+
+        Returns:
+            Set of positions, or None if the query has no terms (match all)
+        """
+        terms = tokenize(query)
+        if not terms:
+            return None
+
+        sets = sorted((self._term_matches(term) for term in set(terms)), key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+
+    def _order(self, column: str) -> List[int]:
+        """Get all positions sorted ascending by column (computed once)."""
+        order = self._orders.get(column)
+        if order is None:
+            key = SORT_KEYS[column]
+            keys = [key(video) for video in self.videos]
+            order = sorted(range(len(self.videos)), key=keys.__getitem__)
+            self._orders[column] = order
+        return order
+
+    def query(self, text: str = "", sort: Optional[str] = None,
+              reverse: bool = False) -> List[Dict[str, Any]]:
+        """
+        Filter and sort the indexed videos.
+
+        Args:
+            text: Filter text; empty matches everything
+            sort: Column name from SORT_KEYS, or None for load order
+            reverse: Sort descending
+
+        Returns:
+            List of matching video dictionaries
+        """
+        matches = self.match(text)
+
+        if sort in SORT_KEYS:
+            order = self._order(sort)
+        else:
+            order = range(len(self.videos))
+
+        if matches is None:
+            positions = list(order)
+        else:
+            positions = [i for i in order if i in matches]
+
+        if reverse:
+            positions.reverse()
+
+        videos = self.videos
+        return [videos[i] for i in positions]
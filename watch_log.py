@@ -0,0 +1,159 @@
+"""Local log of the videos opened in the app, standing in for YouTube's watch history."""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import WATCH_LOG_FILE
+
+# Video fields kept in the log, enough to show a row without asking YouTube
+LOGGED_FIELDS = ('id', 'title', 'channel', 'channel_id', 'duration', 'duration_seconds',
+                 'view_count', 'views', 'published_at', 'published_ts', 'thumbnail', 'url')
+
+# The log is rewritten on load once it holds this many times more lines than videos
+COMPACT_RATIO = 4
+
+
+class WatchLog:
+    """
+    Append-only log of opened videos, indexed in memory.
+
+    Each open is one JSON line. On load the log is replayed into an index
+    per account: video ID to its latest open, ordered by when it was
+    opened. Looking up whether a video was watched is a dict lookup, and a
+    page of history is a slice from the newest end. Re-opening a video
+    appends a line; once old lines dominate, the log is compacted.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize the log, replaying the file if it exists.
+
+        Args:
+            path: Log file, defaults to WATCH_LOG_FILE
+        """
+        self.path = Path(path) if path is not None else WATCH_LOG_FILE
+        self._lock = threading.Lock()
+        # Account -> video ID -> entry, least recently opened first
+        self._index: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._lines = 0
+        self._load()
+
+    def _account(self, account_id: Optional[str]) -> str:
+        return account_id or 'default'
+
+    def _load(self) -> None:
+        """Replay the log into the index; unreadable lines are skipped."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._index_entry(entry['account'], entry)
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    self._lines += 1
+        except OSError:
+            return
+
+        if self._lines > COMPACT_RATIO * max(1, self._count_all()):
+            self._compact()
+
+    def _index_entry(self, account: str, entry: Dict[str, Any]) -> None:
+        watched = self._index.setdefault(account, OrderedDict())
+        video_id = entry['video']['id']
+        watched.pop(video_id, None)
+        watched[video_id] = entry
+
+    def _count_all(self) -> int:
+        return sum(len(watched) for watched in self._index.values())
+
+    def _compact(self) -> None:
+        """Rewrite the log with only the latest open of each video, atomically."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    entries = sorted(
+                        (entry for watched in self._index.values() for entry in watched.values()),
+                        key=lambda entry: entry['at']
+                    )
+                    for entry in entries:
+                        f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            return
+        self._lines = self._count_all()
+
+    def record(self, account_id: Optional[str], video: Dict[str, Any],
+               at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Log that a video was opened.
+
+        Args:
+            account_id: Account it was opened under
+            video: Video dictionary; only LOGGED_FIELDS are kept
+            at: When it was opened, defaults to now
+
+        Returns:
+            The log entry: account, at (Unix timestamp) and video
+        """
+        entry = {
+            'account': self._account(account_id),
+            'at': time.time() if at is None else at,
+            'video': {field: video[field] for field in LOGGED_FIELDS if field in video},
+        }
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+
+        with self._lock:
+            self._index_entry(entry['account'], entry)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                self._lines += 1
+            except OSError:
+                # Still marked watched for this session
+                pass
+        return entry
+
+    def watched(self, account_id: Optional[str], video_id: str) -> bool:
+        """Whether a video was ever opened under an account."""
+        return video_id in self._index.get(self._account(account_id), ())
+
+    def watched_at(self, account_id: Optional[str], video_id: str) -> Optional[float]:
+        """When a video was last opened under an account, or None."""
+        entry = self._index.get(self._account(account_id), {}).get(video_id)
+        return entry['at'] if entry is not None else None
+
+    def count(self, account_id: Optional[str]) -> int:
+        """Number of distinct videos opened under an account."""
+        return len(self._index.get(self._account(account_id), ()))
+
+    def page(self, account_id: Optional[str], offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Get a page of an account's history, most recently opened first.
+
+        Args:
+            account_id: Account whose history to read
+            offset: Videos to skip from the most recent
+            limit: Maximum number of videos to return
+
+        Returns:
+            Video dictionaries, each with watched_at set to when it was last opened
+        """
+        with self._lock:
+            watched = self._index.get(self._account(account_id))
+            if not watched:
+                return []
+            entries = list(islice(reversed(watched.values()), offset, offset + limit))
+        return [dict(entry['video'], watched_at=entry['at']) for entry in entries]
@@ -1,22 +1,142 @@
 """YouTube API wrapper with methods for each feature."""
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator
 from datetime import datetime
+import copy
+import functools
+import html
+import inspect
 import re
+import threading
+import time
 
+from google.auth.exceptions import GoogleAuthError, TransportError
 from googleapiclient.errors import HttpError
 
+from cancellation import RequestCancelled, DeadlineExceeded, current_token
+from connectivity import NETWORK, QUOTA
+from library import playlist_items_resource
+from playlist_stats import aggregate
+from ratelimit import error_reason
+from scheduler import DEFERRABLE, current_priority
+from singleflight import request_key
+from transport import request_timeout
+
+# Reasons that mean retrying any further request today is pointless
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+# Most videos YouTube keeps in a mostPopular chart
+TRENDING_CHART_LIMIT = 200
+
+
+def trending_listing(region_code: str, category_id: Optional[str] = None) -> str:
+    """Get the library listing name a trending chart is saved under."""
+    if category_id:
+        return f"trending:{region_code}:{category_id}"
+    return f"trending:{region_code}"
+
 
 class YouTubeAPIError(Exception):
     """Custom exception for YouTube API errors."""
     pass
 
 
-class YouTubeAPI:
-    """Wrapper for YouTube Data API v3."""
+class OfflineResult(list):
+    """Results served from local data while offline."""
 
-    def __init__(self, service):
-        """Initialize with authenticated service."""
-        self.service = service
+    def __init__(self, items=(), synced_at: Optional[float] = None):
+        """
+        Initialize the results.
+
+        Args:
+            items: The videos, playlists or subscriptions
+            synced_at: When they were last fetched from YouTube, if known
+        """
+        super().__init__(items)
+        self.synced_at = synced_at
+
+
+def _deferrable() -> bool:
+    """
+    Whether the current thread's requests may be held back by the scheduler.
+
+    Part of every single-flight key, so a caller somebody is waiting on
+    never joins a call that is queued behind deferred work.
+    """
+    return current_priority() in DEFERRABLE
+
+
+def _single_flight(method):
+    """Share one execution of a listing method between identical concurrent calls."""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.single_flight is None:
+            return method(self, *args, **kwargs)
+
+        # Bind so f(50), f(max_results=50) and f() (defaulting to 50) share a flight
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple((name, value) for name, value in bound.arguments.items() if name != 'self')
+        key = (method.__name__, self.account_id, _deferrable(), arguments)
+        try:
+            result, shared = self.single_flight.do(key, lambda: method(self, *args, **kwargs))
+        except RequestCancelled:
+            # The caller we were sharing with gave up; that is no reason for us to
+            if current_token().cancelled:
+                raise
+            result, shared = method(self, *args, **kwargs), False
+        if shared:
+            self._count('deduplicated_calls')
+        # Each caller gets its own list so none can mutate another's result
+        return copy.copy(result)
+    return wrapper
+
+
+def _offline_fallback(local):
+    """
+    Serve a listing method from local data while offline.
+
+    The method named local is used instead of the network while offline,
+    and when a call finds the network unreachable or the quota spent (which
+    also takes the app offline). If there is no local data, the original
+    error is raised.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.connectivity is None:
+                return method(self, *args, **kwargs)
+            if self.connectivity.offline:
+                return getattr(self, local)(*args, **kwargs)
+
+            try:
+                return method(self, *args, **kwargs)
+            except (YouTubeAPIError, HttpError, OSError, TransportError) as e:
+                if not self._fall_back(e):
+                    raise
+                try:
+                    return getattr(self, local)(*args, **kwargs)
+                except YouTubeAPIError:
+                    raise e
+        return wrapper
+    return decorator
+
+
+class YouTubeParser:
+    """Parsing of YouTube Data API responses into the dictionaries the UI shows."""
+
+    search_index = None
+
+    def _remember(self, videos: List[Dict[str, Any]]) -> None:
+        """Add parsed videos to the local search index, if there is one."""
+        if self.search_index is None or not videos:
+            return
+        try:
+            self.search_index.upsert(videos)
+        except Exception:
+            # The local index is a convenience; never fail an API call over it
+            pass
 
     def _parse_duration(self, duration: str) -> str:
         """Parse ISO 8601 duration to readable format."""
@@ -38,6 +158,15 @@ class YouTubeAPI:
         except:
             return "Unknown"
 
+    def _duration_seconds(self, duration: str) -> int:
+        """Parse ISO 8601 duration to a number of seconds."""
+        match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration or '')
+        if not match:
+            return 0
+
+        hours, minutes, seconds = (int(value) if value else 0 for value in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+
     def _format_number(self, num: int) -> str:
         """Format large numbers to readable format."""
         if num >= 1_000_000_000:
@@ -57,6 +186,356 @@ class YouTubeAPI:
         except:
             return date_str
 
+    def _parse_timestamp(self, date_str: str) -> float:
+        """Parse ISO date to a POSIX timestamp (0.0 if unparseable)."""
+        try:
+            return datetime.fromisoformat(date_str.replace('Z', '+00:00')).timestamp()
+        except (AttributeError, ValueError):
+            return 0.0
+
+    def _parse_search_result(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a search result into a video dict with only snippet fields known."""
+        snippet = item['snippet']
+        video_id = item['id']['videoId']
+        thumbnails = snippet.get('thumbnails', {})
+        thumbnail = thumbnails.get('high', thumbnails.get('default', {})).get('url', '')
+
+        return {
+            'id': video_id,
+            # Search snippets HTML-escape titles, videos().list does not
+            'title': html.unescape(snippet['title']),
+            'channel': html.unescape(snippet['channelTitle']),
+            'channel_id': snippet['channelId'],
+            'description': html.unescape(snippet.get('description', ''))[:200],
+            'thumbnail': thumbnail,
+            'published_at': self._parse_date(snippet['publishedAt']),
+            'duration': '…',
+            'view_count': '…',
+            'like_count': '…',
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'duration_seconds': 0,
+            'views': 0,
+            'likes': 0,
+            'published_ts': self._parse_timestamp(snippet['publishedAt'])
+        }
+
+    def _parse_video(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse video item from API response."""
+        snippet = item['snippet']
+        statistics = item.get('statistics', {})
+        content_details = item.get('contentDetails', {})
+
+        views = int(statistics.get('viewCount', 0))
+        likes = int(statistics.get('likeCount', 0))
+
+        return {
+            'id': item['id'],
+            'title': snippet['title'],
+            'channel': snippet['channelTitle'],
+            'channel_id': snippet['channelId'],
+            'description': snippet.get('description', '')[:200],
+            'thumbnail': snippet['thumbnails']['high']['url'] if 'high' in snippet['thumbnails'] else snippet['thumbnails']['default']['url'],
+            'published_at': self._parse_date(snippet['publishedAt']),
+            'duration': self._parse_duration(content_details.get('duration', '')),
+            'view_count': self._format_number(views),
+            'like_count': self._format_number(likes),
+            'url': f"https://www.youtube.com/watch?v={item['id']}",
+            # Raw values for sorting; the fields above are display strings
+            'duration_seconds': self._duration_seconds(content_details.get('duration', '')),
+            'views': views,
+            'likes': likes,
+            'published_ts': self._parse_timestamp(snippet['publishedAt'])
+        }
+
+    def _parse_subscription(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse subscription item from API response."""
+        snippet = item['snippet']
+        return {
+            'channel_id': snippet['resourceId']['channelId'],
+            'title': snippet['title'],
+            'description': snippet['description'][:200] if snippet.get('description') else '',
+            'thumbnail': snippet['thumbnails']['default']['url'],
+            'published_at': self._parse_date(snippet['publishedAt'])
+        }
+
+    def _parse_playlist(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse playlist item from API response."""
+        snippet = item['snippet']
+        return {
+            'id': item['id'],
+            'title': snippet['title'],
+            'description': snippet.get('description', '')[:200],
+            'thumbnail': snippet['thumbnails']['default']['url'],
+            'video_count': item['contentDetails']['itemCount'],
+            'published_at': self._parse_date(snippet['publishedAt']),
+            # Changes whenever the playlist does, so its stats know when to update
+            'etag': item.get('etag')
+        }
+
+    def _activity_video_id(self, item: Dict[str, Any]) -> Optional[str]:
+        """Get the video an activity item refers to, if any."""
+        content = item.get('contentDetails', {})
+        if 'upload' in content:
+            return content['upload']['videoId']
+        if 'recommendation' in content:
+            return content['recommendation']['resourceId']['videoId']
+        return None
+
+
+class YouTubeAPI(YouTubeParser):
+    """Wrapper for YouTube Data API v3."""
+
+    def __init__(self, service, search_index=None, scheduler=None, account_id: Optional[str] = None,
+                 rate_limiter=None, retry_policy=None, single_flight=None,
+                 endpoint_timeouts: Optional[Dict[str, float]] = None, library=None,
+                 connectivity=None, video_details_ttl: Optional[float] = None):
+        """
+        Initialize with authenticated service.
+
+        Args:
+            service: YouTube Data API service object
+            search_index: Optional LocalSearchIndex that every parsed video is added to
+            scheduler: Optional RequestScheduler that every request is run through
+            account_id: ID of the account this service is authenticated as
+            rate_limiter: Optional TokenBucket taken from before every request
+            retry_policy: Optional RetryPolicy for transient failures; without one
+                each request is attempted once
+            single_flight: Optional SingleFlight shared by identical concurrent requests
+            endpoint_timeouts: Per-request timeout in seconds by resource name
+                ("search", "videos", ...); others use the transport default
+            library: Optional Library that subscriptions and playlists are synced into
+            connectivity: Optional Connectivity; when offline, listings are served
+                from the library and search index
+            video_details_ttl: Seconds before video details stored in the
+                library are looked up again (for current view counts); None
+                keeps them until the video leaves the library
+        """
+        self.service = service
+        self.search_index = search_index
+        self.scheduler = scheduler
+        self.account_id = account_id
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.single_flight = single_flight
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self.library = library
+        self.connectivity = connectivity
+        self.video_details_ttl = video_details_ttl
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'throttled': 0,
+            'throttle_wait': 0.0,
+            'failed': 0,
+            'deduplicated_calls': 0,
+            'deduplicated_requests': 0,
+            'cancelled': 0,
+            'timed_out': 0,
+            'not_modified': 0,
+        }
+        self.last_failed_channels: List[str] = []
+
+    def for_account(self, service, account_id: Optional[str]) -> 'YouTubeAPI':
+        """Create a wrapper for another account sharing this one's index, scheduler and limits."""
+        return YouTubeAPI(
+            service,
+            search_index=self.search_index,
+            scheduler=self.scheduler,
+            account_id=account_id,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            single_flight=self.single_flight,
+            endpoint_timeouts=self.endpoint_timeouts,
+            library=self.library,
+            connectivity=self.connectivity,
+            video_details_ttl=self.video_details_ttl
+        )
+
+    def close(self) -> None:
+        """Close this account's pooled connections; shared stores stay open."""
+        if self.service is not None:
+            self.service.close()
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        """Add to an instrumentation counter."""
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get a snapshot of the request, retry and throttle counters."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _is_quota_error(self, error: HttpError) -> bool:
+        """Check whether an error means the daily quota is used up."""
+        return error_reason(error) in QUOTA_REASONS
+
+    def _execute(self, request) -> Dict[str, Any]:
+        """
+        Execute an API request.
+
+        Identical requests for the same account that are already in flight
+        (same endpoint and parameters, in any order) share that execution
+        instead of going to the network again.
+        """
+        if self.single_flight is None:
+            return self._execute_with_retry(request)
+
+        key = (self.account_id, _deferrable()) + request_key(request)
+        try:
+            response, shared = self.single_flight.do(key, lambda: self._execute_with_retry(request))
+        except RequestCancelled:
+            # The caller we were sharing with gave up; that is no reason for us to
+            if current_token().cancelled:
+                raise
+            response, shared = self._execute_with_retry(request), False
+        if shared:
+            self._count('deduplicated_requests')
+        return response
+
+    def _fall_back(self, error: Exception) -> bool:
+        """
+        Go offline if error means YouTube is unreachable or out of quota.
+
+        Returns:
+            True if local data should be served instead
+        """
+        if isinstance(error, YouTubeAPIError):
+            # Listing methods wrap the HttpError that caused the failure
+            error = error.__context__
+        if isinstance(error, HttpError):
+            reason = QUOTA if self._is_quota_error(error) else None
+        elif isinstance(error, (OSError, TransportError)):
+            reason = NETWORK
+        else:
+            reason = None
+
+        if reason is None:
+            return False
+        self.connectivity.go_offline(reason)
+        return True
+
+    def _offline_result(self, items: List[Dict[str, Any]], resource: str) -> OfflineResult:
+        """
+        Wrap locally saved items for a listing.
+
+        Raises:
+            YouTubeAPIError: If the listing was never saved.
+        """
+        synced_at = self.library.synced_at(self.account_id, resource) if self.library is not None else None
+        if synced_at is None and not items:
+            raise YouTubeAPIError("Offline, and this has not been loaded before.")
+        return OfflineResult(items, synced_at)
+
+    def probe(self) -> bool:
+        """
+        Check with a one-unit request whether YouTube is usable again.
+
+        Returns:
+            True if it is, in which case the app goes back online
+        """
+        try:
+            self._execute(self.service.i18nRegions().list(part="snippet"))
+        except (HttpError, OSError, TransportError):
+            return False
+        return self.connectivity.go_online()
+
+    def _execute_if_changed(self, request, etag: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Execute an API request unless its response still has the given ETag.
+
+        Returns:
+            The response, or None if YouTube answered 304 Not Modified
+        """
+        if etag:
+            request.headers['If-None-Match'] = etag
+        try:
+            return self._execute(request)
+        except HttpError as e:
+            if e.resp.status == 304:
+                self._count('not_modified')
+                return None
+            raise
+
+    def _request_timeout(self, request, token) -> Optional[float]:
+        """Get the timeout for one attempt: the endpoint's, capped by the token's deadline."""
+        method_id = getattr(request, 'methodId', None) or ''
+        parts = method_id.split('.')
+        timeout = self.endpoint_timeouts.get(parts[1]) if len(parts) > 2 else None
+
+        remaining = token.remaining()
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _execute_with_retry(self, request) -> Dict[str, Any]:
+        """
+        Execute an API request on the network.
+
+        Each attempt first takes a token from the rate limiter. With a
+        scheduler, the attempt is queued at the calling thread's priority
+        (see scheduler.request_priority) and this call blocks until it has
+        run. Retryable failures are retried with backoff on the calling
+        thread, so waiting never holds a scheduler slot.
+
+        The calling thread's cancel token (see cancellation.cancel_scope) is
+        checked before every attempt, including after waiting in the
+        scheduler queue, and its deadline caps each attempt's timeout and
+        backoff.
+        """
+        token = current_token()
+
+        def attempt_request():
+            token.check()
+            with request_timeout(self._request_timeout(request, token)):
+                return request.execute()
+
+        attempt = 0
+        while True:
+            try:
+                token.check()
+            except DeadlineExceeded:
+                self._count('timed_out')
+                raise
+            except RequestCancelled:
+                self._count('cancelled')
+                raise
+
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire()
+                if waited > 0:
+                    self._count('throttled')
+                    self._count('throttle_wait', waited)
+
+            self._count('requests')
+            try:
+                if self.scheduler is None:
+                    return attempt_request()
+                return self.scheduler.run(attempt_request, account=self.account_id)
+            except (HttpError, OSError) as e:
+                if isinstance(e, HttpError) and e.resp.status == 304:
+                    # Not Modified answers a conditional request; it is not a failure
+                    raise
+
+                policy = self.retry_policy
+                if (policy is None or attempt + 1 >= policy.max_attempts
+                        or not policy.is_retryable(e)):
+                    self._count('failed')
+                    raise
+
+                delay = policy.delay(attempt, e)
+                remaining = token.remaining()
+                if remaining is not None and delay >= remaining:
+                    self._count('timed_out')
+                    raise DeadlineExceeded("Request timed out")
+
+                self._count('retries')
+                time.sleep(delay)
+                attempt += 1
+
+    @_single_flight
     def search_videos(self, query: str, max_results: int = 25) -> List[Dict[str, Any]]:
         """
         Search for videos.
@@ -68,6 +547,52 @@ class YouTubeAPI:
         Returns:
             List of video dictionaries with metadata
         """
+        results: List[Dict[str, Any]] = []
+        for results in self.search_videos_progressive(query, max_results=max_results):
+            pass
+        return results
+
+    def search_videos_progressive(self, query: str, max_results: int = 25) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Search for videos, yielding results as soon as each phase is ready.
+
+        The first list comes straight from the search snippets, with duration,
+        views and likes not yet known. The second has the same videos in the
+        same order, enriched from videos().list. Rows can be shown after the
+        first round trip and filled in after the second. While offline, the
+        local search index answers in a single OfflineResult instead.
+
+        Args:
+            query: Search query string
+            max_results: Maximum number of results to return
+
+        Yields:
+            Snippet-only video list, then the enriched video list
+        """
+        if self.connectivity is not None and self.connectivity.offline:
+            yield self._local_search_videos(query, max_results)
+            return
+
+        shown = False
+        try:
+            for results in self._search_phases(query, max_results):
+                yield results
+                shown = True
+        except (YouTubeAPIError, HttpError, OSError, TransportError) as e:
+            if self.connectivity is None or not self._fall_back(e):
+                raise
+            # Snippets already shown are better than local matches
+            if not shown:
+                yield self._local_search_videos(query, max_results)
+
+    def _local_search_videos(self, query: str, max_results: int = 25) -> OfflineResult:
+        """Search the local index in place of YouTube."""
+        if self.search_index is None:
+            raise YouTubeAPIError("Offline, and there is no local search index.")
+        return OfflineResult(self.search_local(query, max_results=max_results))
+
+    def _search_phases(self, query: str, max_results: int) -> Iterator[List[Dict[str, Any]]]:
+        """Search YouTube; see search_videos_progressive."""
         try:
             request = self.service.search().list(
                 part="snippet",
@@ -76,62 +601,112 @@ class YouTubeAPI:
                 maxResults=max_results,
                 order="relevance"
             )
-            response = request.execute()
+            response = self._execute(request)
 
-            # Get video IDs to fetch additional details
-            video_ids = [item['id']['videoId'] for item in response.get('items', [])]
+            snippets = [
+                self._parse_search_result(item)
+                for item in response.get('items', [])
+                if item.get('id', {}).get('videoId')
+            ]
+            yield snippets
 
-            if not video_ids:
-                return []
+            if not snippets:
+                return
 
             # Get video details (duration, view count, etc.)
             videos_request = self.service.videos().list(
                 part="snippet,contentDetails,statistics",
-                id=','.join(video_ids)
+                id=','.join(video['id'] for video in snippets)
             )
-            videos_response = videos_request.execute()
+            videos_response = self._execute(videos_request)
 
-            results = []
+            details = {}
             for item in videos_response.get('items', []):
-                results.append(self._parse_video(item))
+                video = self._parse_video(item)
+                details[video['id']] = video
+
+            # Keep relevance order; videos removed in between keep their snippet
+            results = [details.get(video['id'], video) for video in snippets]
 
-            return results
+            self._remember(list(details.values()))
+            yield results
 
         except HttpError as e:
             if e.resp.status == 403:
                 raise YouTubeAPIError("API quota exceeded. Please try again later.")
             raise YouTubeAPIError(f"Search failed: {e}")
 
-    def get_subscriptions(self, max_results: int = 50) -> List[Dict[str, Any]]:
+    def search_local(self, query: str, max_results: int = 25) -> List[Dict[str, Any]]:
         """
-        Get user's subscriptions.
+        Search videos the app has already seen, without any API call.
 
         Args:
+            query: Search query string
             max_results: Maximum number of results to return
 
         Returns:
-            List of subscription dictionaries
+            List of video dictionaries, best match first
         """
+        if self.search_index is None:
+            raise YouTubeAPIError("Local search index is not available.")
+
         try:
-            request = self.service.subscriptions().list(
-                part="snippet,contentDetails",
-                mine=True,
-                maxResults=max_results,
-                order="alphabetical"
-            )
-            response = request.execute()
+            return self.search_index.search(query, max_results=max_results)
+        except Exception as e:
+            raise YouTubeAPIError(f"Local search failed: {e}")
+
+    def _local_subscriptions(self, max_results: Optional[int] = 50) -> OfflineResult:
+        """Get the saved subscriptions in place of YouTube's."""
+        subscriptions = self.library.subscriptions(self.account_id) if self.library is not None else []
+        return self._offline_result(subscriptions[:max_results], 'subscriptions')
+
+    @_single_flight
+    @_offline_fallback('_local_subscriptions')
+    def get_subscriptions(self, max_results: Optional[int] = 50) -> List[Dict[str, Any]]:
+        """
+        Get user's subscriptions, in alphabetical order.
 
+        Pages of 50 are read (one quota unit each) until max_results are
+        found. With a library, a listing that fits in one page is
+        re-requested with its ETag and read from the library if unchanged.
+
+        Args:
+            max_results: Maximum number of results to return, or None for all of them
+
+        Returns:
+            List of subscription dictionaries
+        """
+        resource = 'subscriptions'
+        try:
             subscriptions = []
-            for item in response.get('items', []):
-                snippet = item['snippet']
-                subscriptions.append({
-                    'channel_id': snippet['resourceId']['channelId'],
-                    'title': snippet['title'],
-                    'description': snippet['description'][:200] if snippet.get('description') else '',
-                    'thumbnail': snippet['thumbnails']['default']['url'],
-                    'published_at': self._parse_date(snippet['publishedAt'])
-                })
+            page_token = None
+            while True:
+                params = {'pageToken': page_token} if page_token else {}
+                request = self.service.subscriptions().list(
+                    part="snippet,contentDetails",
+                    mine=True,
+                    maxResults=50 if max_results is None else min(50, max_results - len(subscriptions)),
+                    order="alphabetical",
+                    **params
+                )
+                if self.library is None or page_token:
+                    response = self._execute(request)
+                else:
+                    response = self._execute_if_changed(request, self.library.etag(self.account_id, resource))
+                    if response is None:
+                        return self.library.subscriptions(self.account_id)[:max_results]
+                    # Only a listing read whole from one page can be revalidated by its ETag
+                    etag = response.get('etag') if not response.get('nextPageToken') else None
+
+                for item in response.get('items', []):
+                    subscriptions.append(self._parse_subscription(item))
+
+                page_token = response.get('nextPageToken')
+                if not page_token or (max_results is not None and len(subscriptions) >= max_results):
+                    break
 
+            if self.library is not None:
+                self.library.save_subscriptions(self.account_id, subscriptions, resource, etag)
             return subscriptions
 
         except HttpError as e:
@@ -139,6 +714,13 @@ class YouTubeAPI:
                 raise YouTubeAPIError("API quota exceeded or insufficient permissions.")
             raise YouTubeAPIError(f"Failed to get subscriptions: {e}")
 
+    def _local_subscription_videos(self, max_results: int = 50) -> OfflineResult:
+        """Get the saved subscription feed in place of YouTube's."""
+        videos = self.library.listing(self.account_id, 'feed') if self.library is not None else []
+        return self._offline_result(videos[:max_results], 'feed')
+
+    @_single_flight
+    @_offline_fallback('_local_subscription_videos')
     def get_subscription_videos(self, max_results: int = 50) -> List[Dict[str, Any]]:
         """
         Get recent videos from subscribed channels.
@@ -163,7 +745,7 @@ class YouTubeAPI:
                     maxResults=50,
                     pageToken=page_token
                 )
-                subs_response = subs_request.execute()
+                subs_response = self._execute(subs_request)
 
                 for item in subs_response.get('items', []):
                     all_subscriptions.append({
@@ -179,6 +761,7 @@ class YouTubeAPI:
                 return []
 
             video_ids = set()
+            failed_channels = []
 
             # Get 1-2 recent videos from each channel until we have enough
             # Process channels in order, getting recent uploads from each
@@ -198,7 +781,7 @@ class YouTubeAPI:
                         maxResults=2,  # Get 2 most recent videos per channel
                         publishedAfter=(datetime.now() - timedelta(days=30)).isoformat() + 'Z'  # Last 30 days
                     )
-                    search_response = search_request.execute()
+                    search_response = self._execute(search_request)
 
                     for item in search_response.get('items', []):
                         if len(video_ids) >= max_results:
@@ -207,30 +790,24 @@ class YouTubeAPI:
                         if video_id not in video_ids:
                             video_ids.add(video_id)
 
-                except HttpError:
-                    # Skip channels that error out
+                except HttpError as e:
+                    # Transient errors were already retried; a spent quota
+                    # fails every remaining channel too, so stop here
+                    if self._is_quota_error(e):
+                        raise
+                    failed_channels.append(channel_id)
                     continue
 
-            if video_ids:
-                # Get full video details for all collected video IDs in batches
-                videos = []
-                video_ids_list = list(video_ids)
-
-                # API allows up to 50 IDs per request
-                for i in range(0, len(video_ids_list), 50):
-                    batch = video_ids_list[i:i+50]
-                    videos_request = self.service.videos().list(
-                        part="snippet,contentDetails,statistics",
-                        id=','.join(batch)
-                    )
-                    videos_response = videos_request.execute()
+            self.last_failed_channels = failed_channels
 
-                    for item in videos_response.get('items', []):
-                        videos.append(self._parse_video(item))
+            if video_ids:
+                videos = self._video_details(list(video_ids))
 
                 # Sort by published date (most recent first)
                 videos.sort(key=lambda x: x['published_at'], reverse=True)
 
+                if self.library is not None:
+                    self.library.save_listing(self.account_id, 'feed', videos[:max_results])
                 return videos[:max_results]
 
             return []
@@ -240,6 +817,101 @@ class YouTubeAPI:
                 raise YouTubeAPIError("API quota exceeded or insufficient permissions.")
             raise YouTubeAPIError(f"Failed to get subscription videos: {e}")
 
+    def _video_details(self, video_ids: List[str]) -> List[Dict[str, Any]]:
+        """Look up full details of videos, 50 IDs per request, and remember them."""
+        videos = []
+        for i in range(0, len(video_ids), 50):
+            batch = video_ids[i:i+50]
+            videos_request = self.service.videos().list(
+                part="snippet,contentDetails,statistics",
+                id=','.join(batch)
+            )
+            videos_response = self._execute(videos_request)
+
+            for item in videos_response.get('items', []):
+                videos.append(self._parse_video(item))
+
+        self._remember(videos)
+        return videos
+
+    def get_videos(self, video_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get full details of videos by ID (one quota unit per 50 videos).
+
+        Args:
+            video_ids: IDs of the videos
+
+        Returns:
+            List of video dictionaries; deleted or private videos are left out
+        """
+        try:
+            return self._video_details(list(video_ids))
+        except HttpError as e:
+            if self.connectivity is not None:
+                self._fall_back(e)
+            if e.resp.status == 403:
+                raise YouTubeAPIError("API quota exceeded or insufficient permissions.")
+            raise YouTubeAPIError(f"Failed to get videos: {e}")
+
+    def get_channel_uploads(self, channel_id: str, max_results: int = 5,
+                            if_changed: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get a channel's latest uploads, cheaply enough to poll.
+
+        Reads the channel's uploads playlist (one quota unit) instead of
+        searching (a hundred), re-requested with the ETag it had last time.
+
+        Args:
+            channel_id: Channel to check
+            max_results: Number of most recent uploads to return
+            if_changed: Return None when nothing changed since the last
+                call with if_changed; otherwise always return the uploads
+
+        Returns:
+            Dicts with each upload's 'id' and 'published_ts', newest first,
+            or None if if_changed and nothing changed
+        """
+        resource = f"uploads:{channel_id}"
+        try:
+            request = self.service.playlistItems().list(
+                part="contentDetails",
+                # Every channel's uploads playlist is its ID with UC swapped for UU
+                playlistId="UU" + channel_id[2:],
+                maxResults=max_results
+            )
+            if self.library is None or not if_changed:
+                response = self._execute(request)
+            else:
+                response = self._execute_if_changed(request, self.library.etag(self.account_id, resource))
+                if response is None:
+                    return None
+                self.library.save_etag(self.account_id, resource, response.get('etag'))
+
+            uploads = []
+            for item in response.get('items', []):
+                details = item['contentDetails']
+                published = details.get('videoPublishedAt')
+                uploads.append({
+                    'id': details['videoId'],
+                    'published_ts': self._parse_timestamp(published) if published else 0.0
+                })
+            uploads.sort(key=lambda upload: upload['published_ts'], reverse=True)
+            return uploads
+
+        except HttpError as e:
+            if self.connectivity is not None:
+                self._fall_back(e)
+            if e.resp.status == 403:
+                raise YouTubeAPIError("API quota exceeded or insufficient permissions.")
+            raise YouTubeAPIError(f"Failed to get uploads of {channel_id}: {e}")
+
+    def _local_watch_history(self, max_results: int = 50) -> OfflineResult:
+        """Get the saved activity feed in place of YouTube's."""
+        videos = self.library.listing(self.account_id, 'history') if self.library is not None else []
+        return self._offline_result(videos[:max_results], 'history')
+
+    @_single_flight
+    @_offline_fallback('_local_watch_history')
     def get_watch_history(self, max_results: int = 50) -> List[Dict[str, Any]]:
         """
         Get user's watch history.
@@ -260,28 +932,29 @@ class YouTubeAPI:
                 mine=True,
                 maxResults=max_results
             )
-            response = request.execute()
+            response = self._execute(request)
 
             videos = []
             video_ids = []
 
             for item in response.get('items', []):
-                content = item.get('contentDetails', {})
-                if 'upload' in content:
-                    video_ids.append(content['upload']['videoId'])
-                elif 'recommendation' in content:
-                    video_ids.append(content['recommendation']['resourceId']['videoId'])
+                video_id = self._activity_video_id(item)
+                if video_id:
+                    video_ids.append(video_id)
 
             if video_ids:
                 videos_request = self.service.videos().list(
                     part="snippet,contentDetails,statistics",
                     id=','.join(video_ids[:50])  # API limit
                 )
-                videos_response = videos_request.execute()
+                videos_response = self._execute(videos_request)
 
                 for item in videos_response.get('items', []):
                     videos.append(self._parse_video(item))
 
+            self._remember(videos)
+            if self.library is not None:
+                self.library.save_listing(self.account_id, 'history', videos)
             return videos
 
         except HttpError as e:
@@ -289,6 +962,13 @@ class YouTubeAPI:
                 raise YouTubeAPIError("Watch history not available. This may require special API access.")
             raise YouTubeAPIError(f"Failed to get watch history: {e}")
 
+    def _local_playlists(self, max_results: int = 50) -> OfflineResult:
+        """Get the saved playlists in place of YouTube's."""
+        playlists = self.library.playlists(self.account_id) if self.library is not None else []
+        return self._offline_result(playlists[:max_results], f"playlists:{max_results}")
+
+    @_single_flight
+    @_offline_fallback('_local_playlists')
     def get_playlists(self, max_results: int = 50) -> List[Dict[str, Any]]:
         """
         Get user's playlists.
@@ -299,26 +979,26 @@ class YouTubeAPI:
         Returns:
             List of playlist dictionaries
         """
+        resource = f"playlists:{max_results}"
         try:
             request = self.service.playlists().list(
                 part="snippet,contentDetails",
                 mine=True,
                 maxResults=max_results
             )
-            response = request.execute()
+            if self.library is None:
+                response = self._execute(request)
+            else:
+                response = self._execute_if_changed(request, self.library.etag(self.account_id, resource))
+                if response is None:
+                    return self.library.playlists(self.account_id)
 
             playlists = []
             for item in response.get('items', []):
-                snippet = item['snippet']
-                playlists.append({
-                    'id': item['id'],
-                    'title': snippet['title'],
-                    'description': snippet.get('description', '')[:200],
-                    'thumbnail': snippet['thumbnails']['default']['url'],
-                    'video_count': item['contentDetails']['itemCount'],
-                    'published_at': self._parse_date(snippet['publishedAt'])
-                })
+                playlists.append(self._parse_playlist(item))
 
+            if self.library is not None:
+                self.library.save_playlists(self.account_id, playlists, resource, response.get('etag'))
             return playlists
 
         except HttpError as e:
@@ -326,6 +1006,13 @@ class YouTubeAPI:
                 raise YouTubeAPIError("API quota exceeded or insufficient permissions.")
             raise YouTubeAPIError(f"Failed to get playlists: {e}")
 
+    def _local_playlist_videos(self, playlist_id: str, max_results: int = 50) -> OfflineResult:
+        """Get a playlist's saved videos in place of YouTube's."""
+        videos = self.library.playlist_videos(playlist_id) if self.library is not None else []
+        return self._offline_result(videos[:max_results], playlist_items_resource(playlist_id, max_results))
+
+    @_single_flight
+    @_offline_fallback('_local_playlist_videos')
     def get_playlist_videos(self, playlist_id: str, max_results: int = 50) -> List[Dict[str, Any]]:
         """
         Get videos from a playlist.
@@ -336,88 +1023,183 @@ class YouTubeAPI:
 
         Returns:
             List of video dictionaries
+
+        With a library, an unchanged playlist is read from it, and a changed
+        one only fetches details for videos the library does not have yet.
+        Either way, details older than video_details_ttl are looked up
+        again so view counts stay current.
         """
+        resource = playlist_items_resource(playlist_id, max_results)
         try:
             request = self.service.playlistItems().list(
                 part="snippet,contentDetails",
                 playlistId=playlist_id,
                 maxResults=max_results
             )
-            response = request.execute()
+            if self.library is None:
+                response = self._execute(request)
+            else:
+                response = self._execute_if_changed(request, self.library.etag(self.account_id, resource))
+                if response is None:
+                    if self.video_details_ttl is not None:
+                        stale = self.library.stale_playlist_videos(playlist_id, self.video_details_ttl)
+                        self.library.save_videos(self._video_details(stale))
+                    return self.library.playlist_videos(playlist_id)
 
             video_ids = []
             for item in response.get('items', []):
                 video_id = item['contentDetails']['videoId']
                 video_ids.append(video_id)
 
-            if not video_ids:
-                return []
-
-            videos_request = self.service.videos().list(
-                part="snippet,contentDetails,statistics",
-                id=','.join(video_ids)
-            )
-            videos_response = videos_request.execute()
+            known = self.library.known_videos(video_ids, self.video_details_ttl) if self.library is not None else {}
+            fetched = self._video_details([video_id for video_id in video_ids if video_id not in known])
+            if self.library is None:
+                return fetched
 
-            videos = []
-            for item in videos_response.get('items', []):
-                videos.append(self._parse_video(item))
+            self.library.save_videos(fetched)
+            self.library.save_playlist_items(self.account_id, playlist_id, video_ids, resource, response.get('etag'))
 
-            return videos
+            # Deleted and private videos have no details and are left out
+            details = {**known, **{video['id']: video for video in fetched}}
+            return [details[video_id] for video_id in video_ids if video_id in details]
 
         except HttpError as e:
             if e.resp.status == 403:
                 raise YouTubeAPIError("API quota exceeded or insufficient permissions.")
             raise YouTubeAPIError(f"Failed to get playlist videos: {e}")
 
-    def get_trending_videos(self, max_results: int = 25, region_code: str = "US") -> List[Dict[str, Any]]:
+    def _local_playlist_stats(self, playlist_id: str, etag: Optional[str] = None,
+                              max_items: int = 1000, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Get a playlist's stored stats, however old, in place of working them out."""
+        stored = self.library.playlist_stats(self.account_id, playlist_id) if self.library is not None else None
+        if stored is None:
+            raise YouTubeAPIError("Offline, and this has not been loaded before.")
+        return stored
+
+    @_single_flight
+    @_offline_fallback('_local_playlist_stats')
+    def get_playlist_stats(self, playlist_id: str, etag: Optional[str] = None,
+                           max_items: int = 1000, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get aggregate statistics of every video in a playlist.
+
+        With a library, stats are stored with the playlist's ETag (from
+        get_playlists) and returned without any request while it is
+        unchanged and they are younger than max_age. Otherwise every page
+        of items is read (one quota unit per 50), and only videos the
+        library has not seen, or saw longer than video_details_ttl ago,
+        are looked up, 50 per request. While offline the stored stats are
+        returned, however old.
+
+        Args:
+            playlist_id: ID of the playlist
+            etag: The playlist's current ETag, if known
+            max_items: Most items read from a very long playlist
+            max_age: Recompute stored stats older than this many seconds,
+                so view counts keep up even when the playlist is unchanged
+
+        Returns:
+            The stats (see playlist_stats.aggregate), plus 'items' (items
+            read), 'view_count' (total views, formatted) and 'etag'
+        """
+        if self.library is not None and etag:
+            stored = self.library.playlist_stats(self.account_id, playlist_id, max_age)
+            if stored is not None and stored.get('etag') == etag:
+                return stored
+
+        try:
+            video_ids = []
+            page_token = None
+            while len(video_ids) < max_items:
+                params = {'pageToken': page_token} if page_token else {}
+                request = self.service.playlistItems().list(
+                    part="contentDetails",
+                    playlistId=playlist_id,
+                    maxResults=min(50, max_items - len(video_ids)),
+                    **params
+                )
+                response = self._execute(request)
+                video_ids.extend(item['contentDetails']['videoId'] for item in response.get('items', []))
+
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+
+            known = self.library.known_videos(video_ids, self.video_details_ttl) if self.library is not None else {}
+            fetched = self._video_details([video_id for video_id in dict.fromkeys(video_ids) if video_id not in known])
+            if self.library is not None:
+                self.library.save_videos(fetched)
+
+            # Deleted and private videos have no details and are left out
+            details = {**known, **{video['id']: video for video in fetched}}
+            stats = aggregate([details[video_id] for video_id in video_ids if video_id in details])
+            stats.update(items=len(video_ids), etag=etag, view_count=self._format_number(stats['total_views']))
+            if self.library is not None:
+                self.library.save_playlist_stats(self.account_id, playlist_id, stats)
+            return stats
+
+        except HttpError as e:
+            if e.resp.status == 403:
+                raise YouTubeAPIError("API quota exceeded or insufficient permissions.")
+            raise YouTubeAPIError(f"Failed to get playlist stats: {e}")
+        except (OSError, GoogleAuthError) as e:
+            # A dropped connection or failed token refresh, after retries
+            raise YouTubeAPIError(f"Failed to get playlist stats: {e}")
+
+    def _local_trending_videos(self, max_results: int = 25, region_code: str = "US",
+                               category_id: Optional[str] = None) -> OfflineResult:
+        """Get the saved trending chart in place of YouTube's."""
+        name = trending_listing(region_code, category_id)
+        videos = self.library.listing(self.account_id, name) if self.library is not None else []
+        return self._offline_result(videos[:max_results], name)
+
+    @_single_flight
+    @_offline_fallback('_local_trending_videos')
+    def get_trending_videos(self, max_results: int = 25, region_code: str = "US",
+                            category_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get trending videos (no authentication required).
 
         Args:
-            max_results: Maximum number of results to return
+            max_results: Maximum number of results to return; YouTube's
+                charts hold up to 200, fetched 50 per page
             region_code: ISO 3166-1 alpha-2 country code
+            category_id: Video category to chart, or None for all
 
         Returns:
             List of video dictionaries
         """
         try:
-            request = self.service.videos().list(
-                part="snippet,contentDetails,statistics",
-                chart="mostPopular",
-                regionCode=region_code,
-                maxResults=max_results
-            )
-            response = request.execute()
-
             videos = []
-            for item in response.get('items', []):
-                videos.append(self._parse_video(item))
+            page_token = None
+            while len(videos) < min(max_results, TRENDING_CHART_LIMIT):
+                params = {}
+                if category_id:
+                    params['videoCategoryId'] = category_id
+                if page_token:
+                    params['pageToken'] = page_token
+                request = self.service.videos().list(
+                    part="snippet,contentDetails,statistics",
+                    chart="mostPopular",
+                    regionCode=region_code,
+                    maxResults=min(50, max_results - len(videos)),
+                    **params
+                )
+                response = self._execute(request)
+
+                for item in response.get('items', []):
+                    videos.append(self._parse_video(item))
+
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
 
+            self._remember(videos)
+            if self.library is not None:
+                self.library.save_listing(self.account_id, trending_listing(region_code, category_id), videos)
             return videos
 
         except HttpError as e:
             if e.resp.status == 403:
                 raise YouTubeAPIError("API quota exceeded.")
             raise YouTubeAPIError(f"Failed to get trending videos: {e}")
-
-
-    def _parse_video(self, item: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse video item from API response."""
-        snippet = item['snippet']
-        statistics = item.get('statistics', {})
-        content_details = item.get('contentDetails', {})
-
-        return {
-            'id': item['id'],
-            'title': snippet['title'],
-            'channel': snippet['channelTitle'],
-            'channel_id': snippet['channelId'],
-            'description': snippet.get('description', '')[:200],
-            'thumbnail': snippet['thumbnails']['high']['url'] if 'high' in snippet['thumbnails'] else snippet['thumbnails']['default']['url'],
-            'published_at': self._parse_date(snippet['publishedAt']),
-            'duration': self._parse_duration(content_details.get('duration', '')),
-            'view_count': self._format_number(int(statistics.get('viewCount', 0))),
-            'like_count': self._format_number(int(statistics.get('likeCount', 0))),
-            'url': f"https://www.youtube.com/watch?v={item['id']}"
-        }